@@ -1,20 +1,43 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Header
+from fastapi.responses import FileResponse, StreamingResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from gridfs.errors import FileExists
+from bson import ObjectId
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Callable
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date, timedelta
+from zoneinfo import ZoneInfo
 import httpx
 from playwright.async_api import async_playwright
 import asyncio
 import json
-from openpyxl import load_workbook
+import hashlib
+import unicodedata
+import heapq
+import time
+import re
+import mimetypes
+import socket
+import sys
+from array import array
+from collections import Counter
+from itertools import chain
+from bisect import bisect_left
+from types import MappingProxyType
+from urllib.parse import urlparse, urljoin, quote
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import numpy as np
+from openpyxl import load_workbook, Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
 
 
 ROOT_DIR = Path(__file__).parent
@@ -25,6 +48,225 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Pattern of the list filters in the configuration table (type.name='...')
+LIST_TYPE_PATTERN = re.compile(r"type\.name\s*=\s*['\"]([^'\"]+)['\"]")
+
+# Above this number of rows, row verdicts (incremental revalidation) and row fingerprints (delta import) are not kept
+MAX_INCREMENTAL_ROWS = int(os.environ.get('MAX_INCREMENTAL_ROWS', '300000'))
+
+# Estimated size of a document of cached row verdicts or fingerprints (MongoDB refuses documents above 16 MB)
+ROW_CACHE_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Number of error groups returned in a validation report (all groups remain downloadable)
+MAX_ERROR_GROUPS_IN_REPORT = 200
+
+# Highlight of invalid cells in the annotated workbook
+ERROR_CELL_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+
+# Path segments too generic to identify a column ("civility.title.fr" -> "civility")
+GENERIC_PATH_SEGMENTS = {"title", "fr", "en", "name", "label", "value", "code", "id"}
+
+# Default synonyms of path segments found in French headers, extended per format in MongoDB
+DEFAULT_HEADER_SYNONYMS = {
+    "civility": ["civilité"],
+    "function": ["fonction"],
+    "department": ["direction", "département"],
+    "company": ["société"],
+    "internalexternal": ["interne", "externe", "groupe", "hors groupe"]
+}
+
+# Reference lists shared by the validations: (tenant, list type) -> ReferenceList
+# In-memory copy of the lists kept in MongoDB (reference_lists), so every server can search them
+REFERENCE_LISTS = {}
+
+# Minimum similarity (Dice coefficient over trigrams) of a suggested list value
+MIN_SUGGESTION_SCORE = 0.3
+
+# Empty trigram posting of the reference list search index
+EMPTY_POSITIONS = np.array([], dtype=np.int32)
+
+# Number of values of each list sent to the frontend by /connection/fetch-lists
+LIST_SAMPLE_SIZE = 20
+
+# Type validation: headers of the configuration table and words of its type column
+CONFIG_TYPE_HEADERS = {"type", "type de donnee", "type de donnees"}
+CONFIG_LENGTH_HEADERS = {"longueur", "longueur max", "longueur maximale", "taille", "taille max", "taille maximale"}
+# A type is matched on its whole words ("Int64" -> "int"); a text word wins, so "Texte long" stays a text
+CONFIG_TYPE_WORDS = {
+    "date": {"date", "datetime", "timestamp"},
+    "integer": {"entier", "integer", "int", "long", "short"},
+    "number": {"decimal", "double", "float", "nombre", "number", "numeric", "montant"},
+    "boolean": {"booleen", "boolean", "bool"}
+}
+CONFIG_TEXT_WORDS = {"texte", "text", "chaine", "string", "varchar", "char", "caractere", "caracteres", "clob", "memo"}
+CONFIG_TYPE_WORD_PATTERN = re.compile(r"[a-z]+")
+CONFIG_LENGTH_PATTERN = re.compile(r"(\d+)")
+
+# Value parsers compiled once, not per cell
+ISO_DATE_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?$")
+FR_DATE_PATTERN = re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4})$")
+INTEGER_PATTERN = re.compile(r"^[+-]?\d+(?:\.0+)?$")
+NUMBER_PATTERN = re.compile(r"^[+-]?(?:\d+(?:[.,]\d*)?|[.,]\d+)(?:[eE][+-]?\d+)?$")
+BOOLEAN_VALUES = {"oui", "non", "true", "false", "vrai", "faux", "1", "0", "yes", "no"}
+
+# Number of imports run at the same time by the worker pool
+IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', '2'))
+
+# Fields of an import job returned by the API (credentials and paths stay server-side)
+IMPORT_JOB_PUBLIC_FIELDS = {"_id": 0, "params": 0, "file_path": 0, "items.params": 0, "items.file_path": 0}
+
+# Legisway credentials of a job or schedule, removed once they are no longer needed
+IMPORT_CREDENTIAL_FIELDS = {"params.password": "", "params.system_password": ""}
+
+# Percentage in the progress label of the Legisway import page
+PROGRESS_PERCENT_PATTERN = re.compile(r"(\d+(?:[.,]\d+)?)\s*%")
+
+# Maximum duration of an import on Legisway
+IMPORT_MAX_WAIT_SECONDS = 3600
+
+# The import page pushes its progress; it is only checked directly when silent for this long
+IMPORT_WATCHDOG_SECONDS = 60
+
+# Push-based watcher of the import page (not verified on every Legisway version): when disabled,
+# or when the page does not answer within IMPORT_WATCHER_START_SECONDS, the page is polled
+# every IMPORT_POLL_SECONDS as before
+IMPORT_WATCHER = os.environ.get('IMPORT_WATCHER', 'true').lower() in ("1", "true", "yes")
+IMPORT_WATCHER_START_SECONDS = 10
+IMPORT_POLL_SECONDS = 5
+
+# Watcher injected in the import page: a MutationObserver that reports progress label changes
+# and the end of the import (result file link or completion message) to autoImportNotify
+IMPORT_WATCHER_SCRIPT = """
+() => {
+    if (window.__autoImportWatcher) {
+        return;
+    }
+    let lastProgress = null;
+    let scheduled = false;
+    const check = () => {
+        scheduled = false;
+        const label = document.querySelector('mat-progress-bar + label');
+        const progress = label ? label.textContent.trim() : null;
+        if (progress !== lastProgress) {
+            lastProgress = progress;
+            window.autoImportNotify('progress', progress);
+        }
+        const text = document.body.textContent;
+        const finished = document.querySelector('a[href*="result_file"]') ? 'result_file'
+            : text.includes('Import terminé') ? 'Import terminé'
+            : text.includes("Échec de l'import") ? "Échec de l'import"
+            : null;
+        if (finished) {
+            window.__autoImportWatcher.disconnect();
+            window.__autoImportWatcher = null;
+            window.autoImportNotify('done', finished);
+        }
+    };
+    window.__autoImportWatcher = new MutationObserver(() => {
+        // Bursts of mutations are checked once
+        if (!scheduled) {
+            scheduled = true;
+            setTimeout(check, 200);
+        }
+    });
+    window.__autoImportWatcher.observe(document.body, {
+        subtree: true, childList: true, characterData: true, attributes: true, attributeFilter: ['href', 'aria-valuenow']
+    });
+    window.autoImportNotify('ready', null);
+    check();
+}
+"""
+
+# Close the browser once an import is launched and collect its result later from the import history
+IMPORT_DETACH = os.environ.get('IMPORT_DETACH', 'false').lower() in ("1", "true", "yes")
+
+# Interval between two checks of a detached import
+IMPORT_REATTACH_INTERVAL_SECONDS = int(os.environ.get('IMPORT_REATTACH_INTERVAL_SECONDS', '120'))
+
+# Rows of the import history of the "Import de données" page
+IMPORT_HISTORY_ROW_SELECTOR = 'tr, mat-row, [role="row"]'
+
+# A detached import still missing from the import history after this long is failed
+IMPORT_HISTORY_MISSING_SECONDS = 600
+
+# Validation progress of an import job is published every N rows
+VALIDATION_PROGRESS_INTERVAL = 5000
+
+# Comment sent on idle event streams so proxies keep the connection open
+SSE_KEEPALIVE_SECONDS = 15
+
+# Imports running at the same time on one Legisway tenant (all jobs and parts of a chunked import)
+IMPORT_TENANT_CONCURRENCY = int(os.environ.get('IMPORT_TENANT_CONCURRENCY', '2'))
+
+# Maximum number of parts of a chunked import
+IMPORT_MAX_CHUNKS = 10
+
+# Column of the merged result workbooks with the row number in the imported file
+RESULT_ORIGIN_HEADER = "Ligne d'origine"
+
+# Result workbook columns (normalized header words) and statuses (normalized word prefixes)
+RESULT_STATUS_HEADERS = ("statut", "status", "resultat", "result", "etat")
+RESULT_MESSAGE_HEADERS = ("message", "erreur", "error", "commentaire", "motif", "detail")
+RESULT_ERROR_WORDS = ("erreur", "error", "echec", "echoue", "failed", "rejet", "ko", "invalide")
+RESULT_WARNING_WORDS = ("avertissement", "warning", "attention")
+
+# Limits of a result summary: source rows kept per error group, error groups kept
+RESULT_SUMMARY_MAX_ROWS = 100
+RESULT_SUMMARY_MAX_GROUPS = 200
+
+# Import slots per tenant
+TENANT_IMPORT_SLOTS = {}
+
+# Cron fields (name, minimum, maximum) and aliases accepted by the import scheduler
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+CRON_ALIASES = {"@hourly": "0 * * * *", "@daily": "0 0 * * *", "@weekly": "0 0 * * 0", "@monthly": "0 0 1 * *"}
+
+# Time zone of the schedule cron expressions, and interval between two checks of the due schedules
+SCHEDULER_TIMEZONE = ZoneInfo(os.environ.get('SCHEDULER_TIMEZONE', 'Europe/Paris'))
+SCHEDULER_TICK_SECONDS = 30
+
+# A scheduled run postponed by the tenant limits is skipped after this many minutes (default)
+SCHEDULE_DEFAULT_WINDOW_MINUTES = 60
+
+# Imports per tenant and per hour allowed to scheduled runs (0: no limit)
+IMPORT_MAX_PER_HOUR = int(os.environ.get('IMPORT_MAX_PER_HOUR', '0'))
+
+# Fields of a schedule returned by the API
+IMPORT_SCHEDULE_PUBLIC_FIELDS = {"_id": 0, "params": 0, "file_path": 0}
+
+# Block size of the streamed downloads
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# GridFS bucket of the content-addressed file store, and the size of its chunks
+FILE_STORE_BUCKET = "files"
+FILE_STORE_CHUNK_SIZE = 1024 * 1024
+
+# Stored and local files unused for this many days are deleted, checked every hour
+FILE_RETENTION_DAYS = int(os.environ.get('FILE_RETENTION_DAYS', '30'))
+FILE_RETENTION_CHECK_SECONDS = 3600
+
+# Single byte range of a Range header ("bytes=start-end", "bytes=start-" or "bytes=-suffix")
+RANGE_HEADER_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Shared HTTP client (connection pool) for the downloads from Legisway, created on first use
+http_client = None
+
+# Import jobs waiting for a worker, and the workers started with the app
+import_queue = asyncio.Queue()
+import_workers = []
+
+# Owner of the jobs claimed by this server; their lease is renewed while they run, so
+# another server only resumes a running job once its lease has expired
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+IMPORT_JOB_LEASE_SECONDS = int(os.environ.get('IMPORT_JOB_LEASE_SECONDS', '120'))
+IMPORT_JOB_HEARTBEAT_SECONDS = 30
+
+# Jobs run by the workers of this server, whose lease is renewed
+running_job_ids = set()
+
+# Set to check the detached imports without waiting for the next interval
+reattach_requested = asyncio.Event()
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -99,7 +341,17 @@ class FetchListsRequest(BaseModel):
 class ListFieldInfo(BaseModel):
     field_path: str
     list_type: str
-    values: List[str]
+    values: List[str]  # Sample of the values, the full list is searched with /lists/{list_type}/search
+    total_count: int = 0
+    fingerprint: str = ""  # Fingerprint of the full list
+
+class ValidationOptions(BaseModel):
+    max_errors: Optional[int] = None  # Stop after N errors in total
+    max_errors_per_column: Optional[int] = None  # Stop reporting a column after N errors
+    fail_fast_on_missing_columns: bool = False  # Fail when a key or list column is not in the header
+
+class HeaderSynonyms(BaseModel):
+    synonyms: Dict[str, List[str]]  # Path segment -> words found in Excel headers
 
 class FetchListsResult(BaseModel):
     success: bool
@@ -315,6 +567,21 @@ async def navigate_to_admin(connection_data: ConnectionTest):
 async def extract_import_formats(connection_data: ConnectionTest):
     """
     Extract all import formats from the admin page with pagination
+    Identical concurrent requests (same tenant and credentials) share one browser session
+    """
+    return await single_flight.run(
+        build_flight_key(
+            "extract-formats",
+            connection_data.site_url,
+            connection_data.login,
+            connection_data.password
+        ),
+        lambda: scrape_import_formats(connection_data)
+    )
+
+async def scrape_import_formats(connection_data: ConnectionTest) -> ImportFormatsList:
+    """
+    Log in with a headless browser and read every page of the import formats table
     """
     try:
         async with async_playwright() as p:
@@ -847,32 +1114,13 @@ async def extract_format_table(request: SelectFormatRequest):
 async def fetch_reference_lists(request: FetchListsRequest):
     """
     Fetch reference list values from Legisway API after table extraction
-    This allows users to see valid values before uploading their file
+    Only counts and samples are returned, users search the full lists with /lists/{list_type}/search
     """
     try:
         logger.info("Extraction des champs avec listes de référence...")
         
         # Extract fields with list filters from table_config
-        list_fields_info = []
-        table_config = request.table_config
-        
-        for row in table_config.rows:
-            cells = row.cells if hasattr(row, 'cells') else row.get('cells', [])
-            
-            if len(cells) >= 3:
-                field_path = cells[0]  # Chemin (path)
-                filter_value = cells[2]  # Filtre
-                
-                # Check if filter contains type.name='...'
-                if filter_value and "type.name=" in filter_value:
-                    import re
-                    match = re.search(r"type\.name\s*=\s*['\"]([^'\"]+)['\"]", filter_value)
-                    if match:
-                        list_type = match.group(1)
-                        list_fields_info.append({
-                            "field_path": field_path,
-                            "list_type": list_type
-                        })
+        list_fields_info = extract_list_fields(request.table_config)
         
         logger.info(f"Champs avec listes trouvés: {len(list_fields_info)}")
         
@@ -902,18 +1150,22 @@ async def fetch_reference_lists(request: FetchListsRequest):
             )
         
         # Build response with field info and values
+        tenant_key = get_tenant_key(request.site_url)
         result_list_fields = []
         for field_info in list_fields_info:
             list_type = field_info['list_type']
-            values = list_values_response['lists'].get(list_type, [])
+            reference_list = store_reference_list(tenant_key, list_type, list_values_response['lists'].get(list_type, []))
+            await persist_reference_list(tenant_key, reference_list)
             
             result_list_fields.append(ListFieldInfo(
                 field_path=field_info['field_path'],
                 list_type=list_type,
-                values=values
+                values=list(reference_list[:LIST_SAMPLE_SIZE]),
+                total_count=len(reference_list),
+                fingerprint=reference_list.fingerprint
             ))
         
-        total_values = sum(len(field.values) for field in result_list_fields)
+        total_values = sum(field.total_count for field in result_list_fields)
         
         return FetchListsResult(
             success=True,
@@ -929,598 +1181,2637 @@ async def fetch_reference_lists(request: FetchListsRequest):
             list_fields=[]
         )
 
-@api_router.post("/import/execute")
-async def execute_import(
+@api_router.get("/lists/{list_type}/search")
+async def search_reference_list(list_type: str, site_url: str, q: str = "", limit: int = 20, offset: int = 0):
+    """
+    Search the values of a reference list fetched for a tenant (accent and case-insensitive)
+    Results are paginated with offset and limit
+    """
+    reference_list = await get_reference_list(get_tenant_key(site_url), list_type)
+    if reference_list is None:
+        raise HTTPException(status_code=404, detail=f"Liste '{list_type}' non récupérée pour ce site")
+    
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    matches = reference_list.search(q)
+    
+    return {
+        "list_type": list_type,
+        "query": q,
+        "total": len(matches),
+        "offset": offset,
+        "limit": limit,
+        "values": matches[offset:offset + limit]
+    }
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """
+    Runtime metrics of the backend (shared reference lists, coalesced requests)
+    """
+    return {
+        "reference_lists": reference_list_metrics(),
+        "single_flight": single_flight.metrics()
+    }
+
+@api_router.get("/mapping/synonyms/{format_name}")
+async def get_format_synonyms(format_name: str):
+    """
+    Get the header synonyms used to map the columns of a format (defaults included)
+    """
+    return {
+        "format_name": format_name,
+        "synonyms": await get_header_synonyms(format_name)
+    }
+
+@api_router.put("/mapping/synonyms/{format_name}")
+async def update_format_synonyms(format_name: str, request: HeaderSynonyms):
+    """
+    Configure the header synonyms of a format, added to the default synonyms
+    Cached column mappings of the format are recomputed on the next upload
+    """
+    await db.header_synonyms.replace_one(
+        {"format_name": format_name},
+        {
+            "format_name": format_name,
+            "synonyms": request.synonyms,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        },
+        upsert=True
+    )
+    return {
+        "success": True,
+        "message": f"Synonymes enregistrés pour le format '{format_name}'",
+        "synonyms": await get_header_synonyms(format_name)
+    }
+
+@api_router.post("/import/validate")
+async def validate_import(
     file: UploadFile = File(...),
     file_format: str = Form(...),
     site_url: str = Form(...),
     login: str = Form(...),
-    password: str = Form(...),
     system_password: str = Form(...),
     selected_format: str = Form(...),
     table_config: str = Form(...),
-    reference_lists: str = Form(None)
+    reference_lists: str = Form(None),
+    validation_options: str = Form(None)
 ):
     """
-    Execute the import with the uploaded file (Excel only for now)
-    Now accepts pre-fetched reference_lists to avoid re-fetching during validation
+    Validate the uploaded file without launching the Legisway import
+    Returns the validation report and a token that /import/execute accepts to skip re-validation
+    validation_options (max_errors, max_errors_per_column, fail_fast_on_missing_columns)
+    allow a quick answer on very large files with systematic errors
     """
     try:
-        # Parse JSON strings
         selected_format_data = json.loads(selected_format)
         table_config_data = json.loads(table_config)
         reference_lists_data = json.loads(reference_lists) if reference_lists else None
+        options = ValidationOptions(**json.loads(validation_options)) if validation_options else None
         
-        # Save uploaded file temporarily with timestamp to avoid cache
-        upload_dir = Path("/tmp/uploads")
-        upload_dir.mkdir(exist_ok=True)
-        
-        # Add timestamp to filename to ensure uniqueness
-        import time
-        timestamp = int(time.time() * 1000)
-        file_stem = Path(file.filename).stem
-        file_extension = Path(file.filename).suffix
-        unique_filename = f"{file_stem}_{timestamp}{file_extension}"
-        
-        file_path = upload_dir / unique_filename
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        
-        logger.info(f"File uploaded: {file.filename} ({file_format})")
-        logger.info(f"Table config: {table_config_data['total_rows']} rows")
-        logger.info(f"Selected format: {selected_format_data['name']}")
-        
-        if file_format != 'excel':
-            return {
-                "success": False,
-                "message": "Seul le format Excel est supporté pour le moment"
-            }
-        
-        # Read Excel file
-        logger.info("Lecture du fichier Excel...")
-        excel_data = read_excel_file(str(file_path))
-        
-        if not excel_data['success']:
-            return {
-                "success": False,
-                "message": excel_data['message']
-            }
-        
-        logger.info(f"Excel lu: {len(excel_data['headers'])} colonnes, {len(excel_data['rows'])} lignes")
-        
-        # Validate key columns
-        validation_result = validate_key_columns(excel_data, table_config_data)
-        
-        if not validation_result['success']:
-            return {
-                "success": False,
-                "message": validation_result['message'],
-                "missing_keys": validation_result.get('missing_keys', [])
-            }
-        
-        logger.info("Validation des clés réussie")
+        file_path = await save_uploaded_file(file)
+        logger.info(f"File uploaded for validation: {file.filename} ({file_format})")
         
-        # Validate list values
-        logger.info("Validation des valeurs de listes...")
-        list_validation_result = await validate_list_values(
-            excel_data=excel_data,
+        report = await run_import_validation(
+            file_path=str(file_path),
+            file_format=file_format,
+            selected_format=selected_format_data,
             table_config=table_config_data,
             site_url=site_url,
             login=login,
             system_password=system_password,
-            pre_fetched_lists=reference_lists_data
+            reference_lists=reference_lists_data,
+            options=options
         )
         
-        if not list_validation_result['success']:
-            return {
-                "success": False,
-                "message": list_validation_result['message'],
-                "invalid_values": list_validation_result.get('invalid_values', [])
-            }
-        
-        logger.info("Validation des listes réussie")
-        
-        # Import data to Legisway
-        result = await import_to_legisway(
-            site_url=site_url,
-            login=login,
-            password=password,
-            selected_format=selected_format_data,
-            excel_file_path=str(file_path),
-            excel_data=excel_data,
-            table_config=table_config_data
+        validation_token = compute_validation_token(
+            file_hash=await asyncio.to_thread(compute_file_hash, str(file_path)),
+            config_fingerprint=compute_config_fingerprint(selected_format_data, table_config_data),
+            lists_fingerprint=compute_lists_fingerprint(reference_lists_data),
+            options_fingerprint=compute_options_fingerprint(options)
         )
+        await save_validation_report(validation_token, report, str(file_path))
         
-        return result
+        return build_validation_response(report, validation_token)
         
     except Exception as e:
-        logger.error(f"Import error: {str(e)}")
+        logger.error(f"Validation endpoint error: {str(e)}")
         return {
             "success": False,
-            "message": f"Erreur lors de l'import: {str(e)}"
+            "message": f"Erreur lors de la validation: {str(e)}"
         }
 
-@api_router.get("/import/download-result/{filename}")
-async def download_result_file(filename: str):
+@api_router.post("/import/validate/stream")
+async def validate_import_stream(
+    file: UploadFile = File(...),
+    file_format: str = Form(...),
+    site_url: str = Form(...),
+    login: str = Form(...),
+    system_password: str = Form(...),
+    selected_format: str = Form(...),
+    table_config: str = Form(...),
+    reference_lists: str = Form(None),
+    validation_options: str = Form(None)
+):
     """
-    Download the result file from Legisway import
+    Validate the uploaded file and stream every error as NDJSON while rows are read
+    One {"type": "error", ...} line per invalid cell, then a final {"type": "summary", ...} line
+    Errors are not aggregated nor kept in memory, so the server memory stays flat
     """
     try:
-        downloads_dir = Path("/tmp/downloads")
-        file_path = downloads_dir / filename
+        selected_format_data = json.loads(selected_format)
+        table_config_data = json.loads(table_config)
+        reference_lists_data = json.loads(reference_lists) if reference_lists else None
+        options = ValidationOptions(**json.loads(validation_options)) if validation_options else None
         
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="Fichier non trouvé")
+        file_path = await save_uploaded_file(file)
+        logger.info(f"File uploaded for streamed validation: {file.filename} ({file_format})")
         
-        return FileResponse(
-            path=str(file_path),
-            filename=filename,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        context = await prepare_validation(
+            file_path=str(file_path),
+            file_format=file_format,
+            selected_format=selected_format_data,
+            table_config=table_config_data,
+            site_url=site_url,
+            login=login,
+            system_password=system_password,
+            reference_lists=reference_lists_data,
+            incremental=False,
+            options=options
         )
-        
     except Exception as e:
-        logger.error(f"Download error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"Streamed validation endpoint error: {str(e)}")
+        # Same answer as /import/validate, as the single summary line of the stream
+        context = {"failure": {"success": False, "message": f"Erreur lors de la validation: {str(e)}"}}
+    
+    def iter_ndjson():
+        if context['failure']:
+            yield json.dumps({"type": "summary", **context['failure']}, ensure_ascii=False) + "\n"
+            return
+        
+        stats = {}
+        suggestions_cache = {}
+        try:
+            for row_number, error in iter_validation_errors(
+                context['excel_rows'],
+                context['key_columns'],
+                context['list_columns'],
+                options=context['options'],
+                stats=stats,
+                collect_verdicts=False,
+                type_columns=context['type_columns']
+            ):
+                if error['rule'] == "invalid_list_value":
+                    error = {
+                        **error,
+                        "suggestions": suggest_list_values(context['lists'], error['list_type'], error['value'], suggestions_cache)
+                    }
+                yield json.dumps({"type": "error", "row": row_number, **error}, ensure_ascii=False) + "\n"
+            
+            summary = {
+                "type": "summary",
+                "success": stats['error_count'] == 0,
+                "message": (
+                    f"Fichier valide: {stats['total_rows']} lignes" if stats['error_count'] == 0
+                    else f"{stats['error_count']} erreurs trouvées ({stats['total_rows']} lignes analysées)"
+                ),
+                "total_rows": stats['total_rows'],
+                "error_count": stats['error_count'],
+                "errors_by_column": stats['column_counts'],
+                "truncated": stats['truncated']
+            }
+        except Exception as e:
+            logger.error(f"Streamed validation error: {str(e)}")
+            summary = {"type": "summary", "success": False, "message": f"Erreur validation: {str(e)}"}
+        finally:
+            context['excel_rows'].close()
+        
+        yield json.dumps(summary, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(iter_ndjson(), media_type="application/x-ndjson")
 
-def read_excel_file(file_path: str) -> Dict:
+@api_router.post("/import/execute")
+async def execute_import(
+    file: UploadFile = File(...),
+    file_format: str = Form(...),
+    site_url: str = Form(...),
+    login: str = Form(...),
+    password: str = Form(...),
+    system_password: str = Form(...),
+    selected_format: str = Form(...),
+    table_config: str = Form(...),
+    reference_lists: str = Form(None),
+    validation_token: str = Form(None),
+    validation_options: str = Form(None),
+    import_chunks: int = Form(None),
+    import_mode: str = Form("full")
+):
     """
-    Read Excel file and extract headers and rows
+    Queue the import of the uploaded file (Excel only for now) and return the job id immediately
+    The job validates the file, skipped when the validation_token from /import/validate matches
+    the file, the configuration and the reference lists, then runs the Legisway import
+    import_chunks > 1 splits the file into that many parts imported concurrently
+    import_mode "delta" only imports the rows new or changed since the last successful import of the format
+    Follow the job with GET /import/jobs/{job_id}
     """
     try:
-        workbook = load_workbook(filename=file_path, read_only=True)
-        sheet = workbook.active
+        # Parse JSON strings
+        selected_format_data = json.loads(selected_format)
+        table_config_data = json.loads(table_config)
+        reference_lists_data = json.loads(reference_lists) if reference_lists else None
+        options_data = json.loads(validation_options) if validation_options else None
+        if options_data:
+            ValidationOptions(**options_data)
+        if import_mode not in ("full", "delta"):
+            return {
+                "success": False,
+                "message": f"Mode d'import inconnu: {import_mode} (attendu: full ou delta)"
+            }
         
-        rows_data = []
-        headers = []
+        file_path = await save_uploaded_file(file)
         
-        for idx, row in enumerate(sheet.iter_rows(values_only=True)):
-            if idx == 0:
-                # First row = headers
-                headers = [str(cell) if cell is not None else "" for cell in row]
-            else:
-                # Data rows
-                row_data = [str(cell) if cell is not None else "" for cell in row]
-                if any(row_data):  # Skip empty rows
-                    rows_data.append(row_data)
+        logger.info(f"File uploaded: {file.filename} ({file_format})")
+        logger.info(f"Table config: {table_config_data['total_rows']} rows")
+        logger.info(f"Selected format: {selected_format_data['name']}")
         
-        workbook.close()
+        job = await create_import_job(
+            file_name=file.filename,
+            file_path=str(file_path),
+            params={
+                "file_format": file_format,
+                "site_url": site_url,
+                "login": login,
+                "password": password,
+                "system_password": system_password,
+                "selected_format": selected_format_data,
+                "table_config": table_config_data,
+                "reference_lists": reference_lists_data,
+                "validation_token": validation_token,
+                "validation_options": options_data,
+                "import_chunks": min(import_chunks, IMPORT_MAX_CHUNKS) if import_chunks else None,
+                "import_mode": import_mode
+            }
+        )
         
         return {
             "success": True,
-            "headers": headers,
-            "rows": rows_data,
-            "total_rows": len(rows_data)
+            "message": "Import mis en file d'attente",
+            "job_id": job['job_id'],
+            "status": job['status']
         }
         
     except Exception as e:
-        logger.error(f"Error reading Excel: {str(e)}")
+        logger.error(f"Import error: {str(e)}")
         return {
             "success": False,
-            "message": f"Erreur lecture Excel: {str(e)}",
-            "headers": [],
-            "rows": [],
-            "total_rows": 0
+            "message": f"Erreur lors de l'import: {str(e)}"
         }
 
-def validate_key_columns(excel_data: Dict, table_config: Dict) -> Dict:
+@api_router.post("/import/batch")
+async def execute_batch_import(
+    files: List[UploadFile] = File(...),
+    file_format: str = Form(...),
+    site_url: str = Form(...),
+    login: str = Form(...),
+    password: str = Form(...),
+    system_password: str = Form(...),
+    imports: str = Form(...),
+    lanes: int = Form(1)
+):
     """
-    Validate that key columns (Clé = Oui) are filled in all rows
+    Queue the import of several files in one job, each with its own format
+    imports is a JSON list with one entry per file, in the same order:
+    {"selected_format", "table_config", "reference_lists", "validation_token", "validation_options"}
+    The files are validated concurrently then imported with a single Legisway login,
+    on up to `lanes` pages of that session at the same time
+    Follow the job with GET /import/jobs/{job_id}; its items give the result of each file
     """
     try:
-        # Extract key fields from table_config
-        # table_config has headers and rows
-        # Column index 0 = Chemin (path), Column index 1 = Clé (key indicator)
-        
-        key_fields = []
-        
-        # Find which fields are marked as keys
-        for row in table_config['rows']:
-            # row is a dict with 'cells' key
-            cells = row.get('cells', []) if isinstance(row, dict) else row.cells
-            
-            if len(cells) >= 2:
-                field_path = cells[0]  # Chemin (path)
-                is_key = cells[1]      # Clé (Oui/Non)
-                
-                if is_key == "Oui":
-                    key_fields.append(field_path)
-        
-        logger.info(f"Champs clés trouvés: {key_fields}")
-        
-        if not key_fields:
-            logger.warning("Aucun champ clé défini dans la configuration")
-            return {
-                "success": True,
-                "message": "Aucun champ clé à valider"
-            }
-        
-        # Map Excel headers to key fields
-        excel_headers = excel_data['headers']
-        key_column_indices = []
-        
-        for key_field in key_fields:
-            # Try to find matching column in Excel
-            found = False
-            for idx, header in enumerate(excel_headers):
-                if header.strip() == key_field.strip() or key_field.strip() in header.strip():
-                    key_column_indices.append((idx, key_field))
-                    found = True
-                    break
-            
-            if not found:
-                logger.warning(f"Colonne clé '{key_field}' non trouvée dans Excel")
-        
-        if not key_column_indices:
+        imports_data = json.loads(imports)
+        if not isinstance(imports_data, list) or len(imports_data) != len(files):
             return {
                 "success": False,
-                "message": "Aucune colonne clé trouvée dans le fichier Excel"
+                "message": f"Une configuration d'import est attendue par fichier ({len(files)} fichiers)"
             }
         
-        logger.info(f"Colonnes clés à valider: {[f[1] for f in key_column_indices]}")
-        
-        # Validate that key columns are filled in all rows
-        missing_keys = []
-        
-        for row_idx, row in enumerate(excel_data['rows'], start=2):  # Start at 2 (after header)
-            for col_idx, key_field in key_column_indices:
-                if col_idx < len(row):
-                    value = row[col_idx].strip()
-                    if not value or value == "":
-                        missing_keys.append({
-                            "row": row_idx,
-                            "column": key_field,
-                            "column_index": col_idx + 1
-                        })
-        
-        if missing_keys:
-            # Group by column
-            missing_by_column = {}
-            for missing in missing_keys:
-                col = missing['column']
-                if col not in missing_by_column:
-                    missing_by_column[col] = []
-                missing_by_column[col].append(missing['row'])
-            
-            error_msg = "Colonnes clés manquantes:\n"
-            for col, rows in missing_by_column.items():
-                rows_str = ", ".join([str(r) for r in rows[:5]])
-                if len(rows) > 5:
-                    rows_str += f" ... (+{len(rows) - 5} autres)"
-                error_msg += f"- '{col}': lignes {rows_str}\n"
-            
-            return {
-                "success": False,
-                "message": error_msg,
-                "missing_keys": missing_keys
-            }
+        items = []
+        for file, import_data in zip(files, imports_data):
+            if import_data.get('validation_options'):
+                ValidationOptions(**import_data['validation_options'])
+            file_path = await save_uploaded_file(file)
+            items.append({
+                "file_name": file.filename,
+                "file_path": str(file_path),
+                "format_name": import_data['selected_format']['name'],
+                "params": {
+                    "selected_format": import_data['selected_format'],
+                    "table_config": import_data['table_config'],
+                    "reference_lists": import_data.get('reference_lists'),
+                    "validation_token": import_data.get('validation_token'),
+                    "validation_options": import_data.get('validation_options')
+                }
+            })
+        logger.info("Import groupé: " + ", ".join(f"{item['file_name']} ({item['format_name']})" for item in items))
+        
+        job = await create_import_job(
+            file_name=f"{len(items)} fichiers",
+            file_path=None,
+            params={
+                "file_format": file_format,
+                "site_url": site_url,
+                "login": login,
+                "password": password,
+                "system_password": system_password,
+                "lanes": max(1, min(lanes, IMPORT_TENANT_CONCURRENCY))
+            },
+            items=items
+        )
         
         return {
             "success": True,
-            "message": f"Toutes les colonnes clés sont remplies ({len(key_column_indices)} colonnes validées)"
+            "message": f"Import groupé de {len(items)} fichiers mis en file d'attente",
+            "job_id": job['job_id'],
+            "status": job['status']
         }
         
     except Exception as e:
-        logger.error(f"Validation error: {str(e)}")
+        logger.error(f"Batch import endpoint error: {str(e)}")
         return {
             "success": False,
-            "message": f"Erreur validation: {str(e)}"
+            "message": f"Erreur lors de l'import groupé: {str(e)}"
         }
 
-async def validate_list_values(
-    excel_data: Dict,
-    table_config: Dict,
-    site_url: str,
-    login: str,
-    system_password: str,
-    pre_fetched_lists: Optional[Dict] = None
-) -> Dict:
+@api_router.post("/import/schedules")
+async def create_import_schedule(
+    file: UploadFile = File(...),
+    file_format: str = Form(...),
+    site_url: str = Form(...),
+    login: str = Form(...),
+    password: str = Form(...),
+    system_password: str = Form(...),
+    selected_format: str = Form(...),
+    table_config: str = Form(...),
+    cron: str = Form(...),
+    reference_lists: str = Form(None),
+    validation_token: str = Form(None),
+    validation_options: str = Form(None),
+    import_chunks: int = Form(None),
+    import_mode: str = Form("full"),
+    name: str = Form(None),
+    window_minutes: int = Form(SCHEDULE_DEFAULT_WINDOW_MINUTES),
+    run_once: bool = Form(True)
+):
     """
-    Validate that list values in Excel match allowed values from Legisway
-    Now accepts pre_fetched_lists to avoid re-fetching during validation
+    Program the import of the uploaded file (same fields as /import/execute) for off-peak hours
+    cron gives the start times (minute hour day month weekday, in SCHEDULER_TIMEZONE); a run is
+    postponed while the tenant limits are reached and skipped after window_minutes
+    run_once (default) runs the import at the next matching time only
     """
     try:
-        # Extract fields with filters from table_config
-        # Column index 0 = Chemin (path), Column index 2 = Filtre (filter)
-        
-        list_fields = []
-        
-        for row in table_config['rows']:
-            # row is a dict with 'cells' key
-            cells = row.get('cells', []) if isinstance(row, dict) else row.cells
-            
-            if len(cells) >= 3:
-                field_path = cells[0]  # Chemin (path)
-                filter_value = cells[2]  # Filtre
-                
-                # Check if filter contains type.name='...'
-                if filter_value and "type.name=" in filter_value:
-                    # Extract the list type name
-                    import re
-                    match = re.search(r"type\.name\s*=\s*['\"]([^'\"]+)['\"]", filter_value)
-                    if match:
-                        list_type = match.group(1)
-                        list_fields.append({
-                            "field_path": field_path,
-                            "list_type": list_type,
-                            "filter": filter_value
-                        })
-        
-        logger.info(f"Champs avec listes trouvés: {len(list_fields)}")
-        
-        if not list_fields:
+        next_run_at = compute_next_run(cron, time.time())
+    except ValueError as e:
+        return {
+            "success": False,
+            "message": str(e)
+        }
+    
+    try:
+        selected_format_data = json.loads(selected_format)
+        table_config_data = json.loads(table_config)
+        options_data = json.loads(validation_options) if validation_options else None
+        if options_data:
+            ValidationOptions(**options_data)
+        if import_mode not in ("full", "delta"):
             return {
-                "success": True,
-                "message": "Aucune liste à valider"
+                "success": False,
+                "message": f"Mode d'import inconnu: {import_mode} (attendu: full ou delta)"
             }
         
-        # Use pre-fetched lists if available, otherwise fetch from Legisway
-        if pre_fetched_lists and pre_fetched_lists.get('success') and pre_fetched_lists.get('list_fields'):
-            logger.info("Utilisation des listes pré-récupérées")
-            # Convert list_fields format to lists format
-            list_values_cache = {
-                'success': True,
-                'lists': {}
-            }
-            for list_field in pre_fetched_lists['list_fields']:
-                list_values_cache['lists'][list_field['list_type']] = list_field['values']
-            
-            logger.info(f"Listes pré-récupérées: {len(list_values_cache['lists'])}")
-            for list_name, list_vals in list_values_cache['lists'].items():
-                logger.info(f"  - {list_name}: {len(list_vals)} valeurs")
-        else:
-            # Fetch list values from Legisway
-            logger.info("Récupération des listes depuis Legisway...")
-            list_values_cache = await fetch_list_values_from_legisway(
-                site_url=site_url,
-                login=login,
-                system_password=system_password,
-                list_types=[field['list_type'] for field in list_fields]
-            )
-            
-            if not list_values_cache['success']:
-                return {
-                    "success": False,
-                    "message": f"Erreur récupération des listes: {list_values_cache['message']}"
-                }
-            
-            logger.info(f"Listes récupérées: {len(list_values_cache['lists'])}")
-            for list_name, list_vals in list_values_cache['lists'].items():
-                logger.info(f"  - {list_name}: {len(list_vals)} valeurs")
+        file_path = await save_uploaded_file(file)
+        schedule = {
+            "schedule_id": str(uuid.uuid4()),
+            "name": name or f"{selected_format_data['name']} - {file.filename}",
+            "cron": cron,
+            "window_minutes": max(1, window_minutes),
+            "run_once": run_once,
+            "enabled": True,
+            "tenant": get_tenant_key(site_url),
+            "file_name": file.filename,
+            "file_path": str(file_path),
+            "file_id": await store_file(str(file_path), "upload"),
+            "params": {
+                "file_format": file_format,
+                "site_url": site_url,
+                "login": login,
+                "password": password,
+                "system_password": system_password,
+                "selected_format": selected_format_data,
+                "table_config": table_config_data,
+                "reference_lists": json.loads(reference_lists) if reference_lists else None,
+                "validation_token": validation_token,
+                "validation_options": options_data,
+                "import_chunks": min(import_chunks, IMPORT_MAX_CHUNKS) if import_chunks else None,
+                "import_mode": import_mode
+            },
+            "next_run_at": next_run_at,
+            "last_run_at": None,
+            "last_status": None,
+            "last_message": None,
+            "last_job_id": None,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await db.import_schedules.insert_one(schedule)
         
-        # Map Excel headers to list fields
-        excel_headers = excel_data['headers']
-        logger.info(f"En-têtes Excel: {excel_headers}")
-        list_column_indices = []
+        next_run = datetime.fromtimestamp(next_run_at, SCHEDULER_TIMEZONE)
+        logger.info(f"Import programmé {schedule['schedule_id']} ({cron}), prochaine exécution {next_run.isoformat()}")
+        return {
+            "success": True,
+            "message": f"Import programmé, prochaine exécution le {next_run.strftime('%d/%m/%Y à %H:%M')}",
+            "schedule_id": schedule['schedule_id'],
+            "next_run_at": next_run_at
+        }
         
-        for list_field in list_fields:
-            field_path = list_field['field_path']
-            list_type = list_field['list_type']
-            logger.info(f"Recherche colonne pour: {field_path} (type: {list_type})")
+    except Exception as e:
+        logger.error(f"Schedule endpoint error: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Erreur lors de la programmation de l'import: {str(e)}"
+        }
+
+@api_router.get("/import/schedules")
+async def list_import_schedules(enabled: Optional[bool] = None):
+    """
+    Import schedules, next run first
+    """
+    query = {"enabled": enabled} if enabled is not None else {}
+    return await db.import_schedules.find(query, IMPORT_SCHEDULE_PUBLIC_FIELDS).sort("next_run_at", 1).to_list(None)
+
+@api_router.delete("/import/schedules/{schedule_id}")
+async def delete_import_schedule(schedule_id: str):
+    """
+    Delete a schedule; jobs already queued by it are not affected
+    """
+    deleted = await db.import_schedules.delete_one({"schedule_id": schedule_id})
+    if not deleted.deleted_count:
+        raise HTTPException(status_code=404, detail="Programmation non trouvée")
+    return {
+        "success": True,
+        "message": "Programmation supprimée"
+    }
+
+@api_router.get("/import/jobs/{job_id}")
+async def get_import_job(job_id: str):
+    """
+    Status of an import job: stage, progress, time spent per stage and result (result file name)
+    """
+    job = await db.import_jobs.find_one({"job_id": job_id}, IMPORT_JOB_PUBLIC_FIELDS)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job d'import non trouvé")
+    return job
+
+@api_router.get("/import/jobs/{job_id}/result-summary")
+async def get_import_result_summary(job_id: str):
+    """
+    Outcome of every row of the Legisway result file of a job: counts per outcome and status,
+    and errors grouped by message with their source rows
+    """
+    job = await db.import_jobs.find_one({"job_id": job_id}, {"_id": 0, "result": 1})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job d'import non trouvé")
+    result = job.get('result') or {}
+    if not result.get('result_file_id'):
+        raise HTTPException(status_code=404, detail="Pas de fichier de résultat pour ce job")
+    
+    return await get_result_summary(result['result_file_id'], result['result_file_path'])
+
+@api_router.get("/import/jobs/{job_id}/events")
+async def stream_import_job_events(job_id: str):
+    """
+    Server-Sent Events of an import job: a snapshot of the job, then its progress
+    (stage transitions, validated rows, import percentage) and a final "done" event
+    """
+    # Subscribe before reading the job so no event is lost in between
+    queue = progress_broker.subscribe(job_id)
+    job = await db.import_jobs.find_one({"job_id": job_id}, IMPORT_JOB_PUBLIC_FIELDS)
+    if not job:
+        progress_broker.unsubscribe(job_id, queue)
+        raise HTTPException(status_code=404, detail="Job d'import non trouvé")
+    
+    async def iter_events():
+        try:
+            yield format_sse_event("snapshot", job)
+            if job['status'] in ("succeeded", "failed"):
+                yield format_sse_event("done", job)
+                return
             
-            # Find matching column in Excel
-            # Try multiple matching strategies
-            for idx, header in enumerate(excel_headers):
-                header_clean = header.strip().lower()
-                field_clean = field_path.strip().lower()
-                
-                # Strategy 1: Exact match
-                if header_clean == field_clean:
-                    allowed_vals = list_values_cache['lists'].get(list_type, [])
-                    logger.info(f"  -> Trouvé (exact) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                    list_column_indices.append({
-                        "col_idx": idx,
-                        "field_path": field_path,
-                        "list_type": list_type,
-                        "allowed_values": allowed_vals
-                    })
-                    break
-                
-                # Strategy 2: Field path in header
-                if field_clean in header_clean:
-                    allowed_vals = list_values_cache['lists'].get(list_type, [])
-                    logger.info(f"  -> Trouvé (contenu) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                    list_column_indices.append({
-                        "col_idx": idx,
-                        "field_path": field_path,
-                        "list_type": list_type,
-                        "allowed_values": allowed_vals
-                    })
-                    break
-                
-                # Strategy 3: Extract last part after dot (e.g., "title.fr" from "internalExternal.title.fr")
-                # and check if it's in the header
-                if '.' in field_clean:
-                    field_suffix = field_clean.split('.')[-1]  # Get "fr"
-                    field_last_two = '.'.join(field_clean.split('.')[-2:])  # Get "title.fr"
-                    
-                    if field_last_two in header_clean or field_suffix in header_clean:
-                        # Additional check: verify the header is related to the list type
-                        # by checking if list type name parts are in header
-                        list_type_clean = list_type.lower()
-                        # Extract base name: "internalExternalList" -> "internal", "external"
-                        if 'internal' in field_clean and 'internal' in header_clean:
-                            allowed_vals = list_values_cache['lists'].get(list_type, [])
-                            logger.info(f"  -> Trouvé (suffix+context) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                            list_column_indices.append({
-                                "col_idx": idx,
-                                "field_path": field_path,
-                                "list_type": list_type,
-                                "allowed_values": allowed_vals
-                            })
-                            break
-                        elif 'civility' in field_clean and 'civilité' in header_clean:
-                            allowed_vals = list_values_cache['lists'].get(list_type, [])
-                            logger.info(f"  -> Trouvé (civility) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                            list_column_indices.append({
-                                "col_idx": idx,
-                                "field_path": field_path,
-                                "list_type": list_type,
-                                "allowed_values": allowed_vals
-                            })
-                            break
-                        elif 'function' in field_clean and 'fonction' in header_clean:
-                            allowed_vals = list_values_cache['lists'].get(list_type, [])
-                            logger.info(f"  -> Trouvé (function) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                            list_column_indices.append({
-                                "col_idx": idx,
-                                "field_path": field_path,
-                                "list_type": list_type,
-                                "allowed_values": allowed_vals
-                            })
-                            break
-                        elif 'department' in field_clean and 'direction' in header_clean:
-                            allowed_vals = list_values_cache['lists'].get(list_type, [])
-                            logger.info(f"  -> Trouvé (department) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                            list_column_indices.append({
-                                "col_idx": idx,
-                                "field_path": field_path,
-                                "list_type": list_type,
-                                "allowed_values": allowed_vals
-                            })
-                            break
-                        elif 'company' in field_clean and 'société' in header_clean:
-                            allowed_vals = list_values_cache['lists'].get(list_type, [])
-                            logger.info(f"  -> Trouvé (company) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                            list_column_indices.append({
-                                "col_idx": idx,
-                                "field_path": field_path,
-                                "list_type": list_type,
-                                "allowed_values": allowed_vals
-                            })
-                            break
-                        elif 'internalexternal' in field_clean and ('groupe' in header_clean or 'hors' in header_clean):
-                            allowed_vals = list_values_cache['lists'].get(list_type, [])
-                            logger.info(f"  -> Trouvé (internalExternal/Groupe) à l'index {idx}, {len(allowed_vals)} valeurs autorisées")
-                            list_column_indices.append({
-                                "col_idx": idx,
-                                "field_path": field_path,
-                                "list_type": list_type,
-                                "allowed_values": allowed_vals
-                            })
-                            break
-        
-        if not list_column_indices:
-            logger.warning("Aucune colonne de liste trouvée dans Excel!")
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse_event(event['event'], event)
+                if event['event'] == "done":
+                    return
+        finally:
+            progress_broker.unsubscribe(job_id, queue)
+    
+    return StreamingResponse(
+        iter_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.post("/import/jobs/{job_id}/check")
+async def check_import_job(job_id: str):
+    """
+    Check a detached import now instead of waiting for the next scheduled check
+    """
+    result = await db.import_jobs.update_one(
+        {"job_id": job_id, "status": "detached"},
+        {"$set": {"next_check_at": time.time()}}
+    )
+    if not result.matched_count:
+        raise HTTPException(status_code=404, detail="Aucun import détaché pour ce job")
+    reattach_requested.set()
+    return {"success": True, "message": "Vérification de l'import programmée"}
+
+@api_router.get("/import/jobs")
+async def list_import_jobs(status: Optional[str] = None, limit: int = 50):
+    """
+    Most recent import jobs, optionally filtered by status (queued, running, detached, succeeded, failed)
+    """
+    query = {"status": status} if status else {}
+    return await db.import_jobs.find(query, IMPORT_JOB_PUBLIC_FIELDS).sort("created_at", -1).to_list(max(1, min(limit, 200)))
+
+@api_router.get("/import/validation-report/{validation_token}/details")
+async def download_validation_details(validation_token: str):
+    """
+    Download every validation error of a report, one record per cell, ordered by row
+    """
+    report = await get_validation_report(validation_token)
+    if not report:
+        raise HTTPException(status_code=404, detail="Rapport de validation non trouvé")
+    
+    groups = await db.validation_error_groups.find({"token": validation_token}, {"_id": 0, "token": 0}).to_list(None)
+    
+    def iter_details():
+        yield "["
+        merged = heapq.merge(*(iter_group_rows(group) for group in groups), key=lambda item: item[0])
+        for index, (_, record) in enumerate(merged):
+            yield ("," if index else "") + json.dumps(record, ensure_ascii=False)
+        yield "]"
+    
+    return StreamingResponse(
+        iter_details(),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="validation_{validation_token[:12]}.json"'}
+    )
+
+@api_router.post("/import/validation-report/{validation_token}/annotated")
+async def create_annotated_workbook(validation_token: str):
+    """
+    Build a copy of the validated workbook with invalid cells highlighted and an errors column
+    The file is then downloaded with /files/{result_file_id}
+    """
+    try:
+        report = await get_validation_report(validation_token)
+        if not report or not report.get('file_path') or not Path(report['file_path']).exists():
             return {
-                "success": True,
-                "message": "Aucune colonne de liste trouvée dans Excel"
+                "success": False,
+                "message": "Rapport de validation ou fichier source introuvable"
             }
         
-        logger.info(f"Colonnes de listes à valider: {len(list_column_indices)}")
-        
-        # Validate values
-        invalid_values = []
-        values_checked = 0
+        downloads_dir = Path("/tmp/downloads")
+        downloads_dir.mkdir(exist_ok=True)
+        result_file_name = f"{Path(report['file_path']).stem}_erreurs_{validation_token[:8]}.xlsx"
+        result_file_path = downloads_dir / result_file_name
         
-        for row_idx, row in enumerate(excel_data['rows'], start=2):  # Start at 2 (after header)
-            for list_col in list_column_indices:
-                col_idx = list_col['col_idx']
-                
-                if col_idx < len(row):
-                    value = row[col_idx].strip()
-                    
-                    # Empty values are allowed
-                    if value and value != "":
-                        values_checked += 1
-                        allowed_values = list_col['allowed_values']
-                        
-                        logger.info(f"Validation ligne {row_idx}, colonne {list_col['field_path']}: valeur='{value}', nb_autorisées={len(allowed_values)}")
-                        
-                        # Check if value is in allowed list
-                        if value not in allowed_values:
-                            logger.warning(f"  -> INVALIDE: '{value}' non trouvée dans {len(allowed_values)} valeurs autorisées")
-                            invalid_values.append({
-                                "row": row_idx,
-                                "column": list_col['field_path'],
-                                "value": value,
-                                "list_type": list_col['list_type'],
-                                "allowed_values": allowed_values[:10]  # Show first 10 for error message
-                            })
-                        else:
-                            logger.info(f"  -> VALIDE")
-        
-        logger.info(f"Validation terminée: {values_checked} valeurs vérifiées, {len(invalid_values)} invalides")
-        
-        if invalid_values:
-            # Group by column
-            invalid_by_column = {}
-            for invalid in invalid_values:
-                col = invalid['column']
-                if col not in invalid_by_column:
-                    invalid_by_column[col] = []
-                invalid_by_column[col].append({
-                    "row": invalid['row'],
-                    "value": invalid['value']
-                })
-            
-            error_msg = "Valeurs invalides dans les listes:\n"
-            for col, errors in invalid_by_column.items():
-                error_msg += f"\n- Colonne '{col}':\n"
-                for err in errors[:5]:  # Show first 5
-                    error_msg += f"  Ligne {err['row']}: '{err['value']}' (invalide)\n"
-                if len(errors) > 5:
-                    error_msg += f"  ... (+{len(errors) - 5} autres valeurs invalides)\n"
-            
-            # Show allowed values for first error
-            if invalid_values:
-                first_invalid = invalid_values[0]
-                error_msg += f"\nValeurs autorisées pour '{first_invalid['list_type']}': "
-                error_msg += ", ".join([f"'{v}'" for v in first_invalid['allowed_values'][:10]])
-                if len(first_invalid['allowed_values']) > 10:
-                    error_msg += f" ... (+{len(first_invalid['allowed_values']) - 10} autres)"
-            
-            return {
-                "success": False,
-                "message": error_msg,
-                "invalid_values": invalid_values
-            }
+        if not result_file_path.exists():
+            groups = await db.validation_error_groups.find(
+                {"token": validation_token}, {"_id": 0, "token": 0}
+            ).to_list(None)
+            await asyncio.to_thread(write_annotated_workbook, report['file_path'], str(result_file_path), groups)
+            logger.info(f"Fichier annoté généré: {result_file_path}")
         
         return {
             "success": True,
-            "message": f"Toutes les valeurs de listes sont valides ({len(list_column_indices)} colonnes validées)"
+            "message": f"Fichier annoté généré ({report.get('error_count', 0)} erreurs)",
+            "result_file_name": result_file_name,
+            "result_file_id": await store_file(str(result_file_path), "result")
         }
         
     except Exception as e:
-        logger.error(f"List validation error: {str(e)}")
+        logger.error(f"Annotated workbook error: {str(e)}")
         return {
             "success": False,
-            "message": f"Erreur validation listes: {str(e)}"
+            "message": f"Erreur génération du fichier annoté: {str(e)}"
         }
 
-async def fetch_list_values_from_legisway(
+@api_router.get("/files/{file_id}")
+async def download_stored_file(
+    file_id: str,
+    name: Optional[str] = None,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Stream a file of the store (result or upload) by its content digest
+    Supports conditional requests (ETag) and single byte ranges (resumable downloads)
+    """
+    stored = await find_stored_file(file_id)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Fichier non trouvé")
+    
+    length = stored['length']
+    etag = f'"{file_id}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # The content of an id never changes
+        "Cache-Control": "private, max-age=31536000, immutable"
+    }
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        byte_range = parse_range_header(range_header, length)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{length}"})
+    start, end = byte_range or (0, length - 1)
+    
+    download_name = Path(name or f"{file_id[:12]}.xlsx").name
+    headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{quote(download_name)}"
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    
+    await db[f"{FILE_STORE_BUCKET}.files"].update_one(
+        {"_id": stored['_id']}, {"$set": {"metadata.last_used_at": datetime.now(timezone.utc)}}
+    )
+    grid_out = await get_file_store().open_download_stream(stored['_id'])
+    
+    async def iter_content():
+        if start:
+            grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    
+    return StreamingResponse(
+        iter_content() if length else iter(()),
+        status_code=206 if byte_range else 200,
+        media_type=mimetypes.guess_type(download_name)[0] or "application/octet-stream",
+        headers=headers
+    )
+
+@api_router.get("/import/download-result/{filename}")
+async def download_result_file(filename: str):
+    """
+    Download the result file from Legisway import
+    """
+    try:
+        downloads_dir = Path("/tmp/downloads")
+        file_path = downloads_dir / filename
+        
+        if not file_path.exists():
+            raise HTTPException(status_code=404, detail="Fichier non trouvé")
+        
+        return FileResponse(
+            path=str(file_path),
+            filename=filename,
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        
+    except Exception as e:
+        logger.error(f"Download error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def get_file_store() -> AsyncIOMotorGridFSBucket:
+    """
+    GridFS bucket of the content-addressed file store (uploads and result files)
+    Files are named by the SHA-256 of their content, so a file is stored once whatever its name
+    """
+    return AsyncIOMotorGridFSBucket(db, bucket_name=FILE_STORE_BUCKET)
+
+async def find_stored_file(file_id: str) -> Optional[Dict]:
+    """
+    GridFS document of a stored file (file_id is the content digest)
+    """
+    return await db[f"{FILE_STORE_BUCKET}.files"].find_one({"filename": file_id}, sort=[("uploadDate", -1)])
+
+async def store_file(file_path: str, kind: str) -> str:
+    """
+    Add a local file to the file store and return its id (content digest)
+    Storing the same content again only refreshes its retention date
+    """
+    file_id = await asyncio.to_thread(compute_file_hash, file_path)
+    now = datetime.now(timezone.utc)
+    
+    stored = await find_stored_file(file_id)
+    if stored:
+        await db[f"{FILE_STORE_BUCKET}.files"].update_one({"_id": stored['_id']}, {"$set": {"metadata.last_used_at": now}})
+        return file_id
+    
+    # The digest is a unique index: the same content uploaded at the same time is stored once
+    object_id = ObjectId()
+    try:
+        with open(file_path, "rb") as source:
+            await get_file_store().upload_from_stream_with_id(
+                object_id,
+                file_id,
+                source,
+                chunk_size_bytes=FILE_STORE_CHUNK_SIZE,
+                metadata={"kind": kind, "last_used_at": now}
+            )
+    except (FileExists, DuplicateKeyError):
+        await db[f"{FILE_STORE_BUCKET}.chunks"].delete_many({"files_id": object_id})
+        await db[f"{FILE_STORE_BUCKET}.files"].update_one({"filename": file_id}, {"$set": {"metadata.last_used_at": now}})
+        logger.info(f"Fichier déjà stocké par un autre envoi: {Path(file_path).name} -> {file_id[:12]}")
+        return file_id
+    logger.info(f"Fichier stocké ({kind}): {Path(file_path).name} -> {file_id[:12]}")
+    return file_id
+
+async def drop_duplicate_stored_files():
+    """
+    Keep a single stored file per content digest (the latest upload), so the digest can be a unique index
+    """
+    duplicates = db[f"{FILE_STORE_BUCKET}.files"].aggregate([
+        {"$sort": {"uploadDate": -1}},
+        {"$group": {
+            "_id": "$filename",
+            "ids": {"$push": "$_id"},
+            "last_used_at": {"$max": "$metadata.last_used_at"}
+        }},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ])
+    async for duplicate in duplicates:
+        kept_id, *extra_ids = duplicate['ids']
+        await db[f"{FILE_STORE_BUCKET}.files"].update_one(
+            {"_id": kept_id}, {"$set": {"metadata.last_used_at": duplicate['last_used_at']}}
+        )
+        for extra_id in extra_ids:
+            await get_file_store().delete(extra_id)
+        logger.info(f"Copies en double du fichier {duplicate['_id'][:12]} supprimées: {len(extra_ids)}")
+
+async def ensure_local_file(file_path: str, file_id: Optional[str]) -> str:
+    """
+    Local copy of a stored file, fetched from the store when this server does not have it
+    (job queued by another replica, or after a cleanup of /tmp)
+    """
+    if Path(file_path).exists() or not file_id:
+        return file_path
+    
+    stored = await find_stored_file(file_id)
+    if not stored:
+        raise FileNotFoundError(f"Fichier {Path(file_path).name} introuvable dans le stockage")
+    
+    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+    partial_path = Path(file_path).with_name(f".{Path(file_path).name}.part")
+    try:
+        grid_out = await get_file_store().open_download_stream(stored['_id'])
+        with open(partial_path, "wb") as f:
+            while True:
+                chunk = await grid_out.readchunk()
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(partial_path, file_path)
+    finally:
+        partial_path.unlink(missing_ok=True)
+    logger.info(f"Fichier {Path(file_path).name} récupéré depuis le stockage")
+    return file_path
+
+def parse_range_header(range_header: Optional[str], length: int) -> Optional[tuple]:
+    """
+    (start, end) inclusive of a single "bytes=" range, None without a usable Range header
+    Raises ValueError when the range cannot be satisfied
+    """
+    match = RANGE_HEADER_PATTERN.match(range_header or "")
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if not match.group(1):
+        # Suffix range: the last N bytes
+        suffix = int(match.group(2))
+        if suffix == 0 or length == 0:
+            raise ValueError("plage vide")
+        return max(0, length - suffix), length - 1
+    start = int(match.group(1))
+    end = min(int(match.group(2)), length - 1) if match.group(2) else length - 1
+    if start >= length or start > end:
+        raise ValueError("plage hors du fichier")
+    return start, end
+
+async def cleanup_file_store() -> int:
+    """
+    Delete the stored files unused for FILE_RETENTION_DAYS, except those of unfinished jobs and
+    enabled schedules, and the local copies of /tmp/uploads and /tmp/downloads of the same age
+    """
+    limit = datetime.now(timezone.utc).timestamp() - FILE_RETENTION_DAYS * 86400
+    
+    active_jobs = await db.import_jobs.find(
+        {"status": {"$in": ["queued", "running", "detached"]}},
+        {"_id": 0, "file_id": 1, "file_path": 1, "items.file_id": 1, "items.file_path": 1}
+    ).to_list(None)
+    schedules = await db.import_schedules.find({"enabled": True}, {"_id": 0, "file_id": 1, "file_path": 1}).to_list(None)
+    active_files = [file for job in active_jobs for file in [job] + (job.get('items') or [])] + schedules
+    kept_ids = {file['file_id'] for file in active_files if file.get('file_id')}
+    kept_paths = {file['file_path'] for file in active_files if file.get('file_path')}
+    
+    expired = await db[f"{FILE_STORE_BUCKET}.files"].find(
+        {"metadata.last_used_at": {"$lt": datetime.fromtimestamp(limit, timezone.utc)}},
+        {"_id": 1, "filename": 1}
+    ).to_list(None)
+    deleted = 0
+    for stored in expired:
+        if stored['filename'] in kept_ids:
+            continue
+        await get_file_store().delete(stored['_id'])
+        await db.result_summaries.delete_many({"result_file_id": stored['filename']})
+        deleted += 1
+    
+    for directory in (Path("/tmp/uploads"), Path("/tmp/downloads")):
+        if not directory.exists():
+            continue
+        for local_file in directory.rglob("*"):
+            if local_file.is_file() and str(local_file) not in kept_paths and local_file.stat().st_mtime < limit:
+                local_file.unlink(missing_ok=True)
+    
+    if deleted:
+        logger.info(f"Rétention: {deleted} fichiers supprimés du stockage")
+    return deleted
+
+async def run_file_retention():
+    """
+    Apply the retention policy of the file store every FILE_RETENTION_CHECK_SECONDS
+    """
+    while True:
+        try:
+            await cleanup_file_store()
+        except Exception as e:
+            logger.error(f"Rétention des fichiers: {str(e)}")
+        await asyncio.sleep(FILE_RETENTION_CHECK_SECONDS)
+
+async def save_uploaded_file(file: UploadFile) -> Path:
+    """
+    Save an uploaded file in /tmp/uploads with a timestamp to avoid cache
+    """
+    upload_dir = Path("/tmp/uploads")
+    upload_dir.mkdir(exist_ok=True)
+    
+    # Add timestamp to filename to ensure uniqueness
+    timestamp = int(time.time() * 1000)
+    file_stem = Path(file.filename).stem
+    file_extension = Path(file.filename).suffix
+    unique_filename = f"{file_stem}_{timestamp}{file_extension}"
+    
+    file_path = upload_dir / unique_filename
+    with open(file_path, "wb") as f:
+        content = await file.read()
+        f.write(content)
+    
+    return file_path
+
+def compute_file_hash(file_path: str) -> str:
+    """
+    SHA-256 of the file content, read by chunks
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def compute_config_fingerprint(selected_format: Dict, table_config: Dict) -> str:
+    """
+    Fingerprint of the selected format and its configuration table
+    """
+    payload = {
+        "format": selected_format.get('name'),
+        "headers": table_config.get('headers', []),
+        "rows": [
+            row.get('cells', []) if isinstance(row, dict) else row.cells
+            for row in table_config.get('rows', [])
+        ]
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def compute_lists_fingerprint(reference_lists: Optional[Dict]) -> str:
+    """
+    Fingerprint of the pre-fetched reference lists (empty when lists are fetched during validation)
+    """
+    if not reference_lists or not reference_lists.get('success'):
+        return ""
+    list_fields = reference_lists.get('list_fields', [])
+    if list_fields and all(list_field.get('fingerprint') for list_field in list_fields):
+        # Payload of fetch-lists: only samples, the fingerprints identify the full lists
+        payload = sorted({(list_field['list_type'], list_field['fingerprint']) for list_field in list_fields})
+        return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+    return fingerprint_list_values({
+        list_field['list_type']: list_field['values']
+        for list_field in reference_lists.get('list_fields', [])
+    })
+
+def fingerprint_list_values(lists: Dict[str, List[str]]) -> str:
+    """
+    Fingerprint of reference list values, independent of value order
+    """
+    if not lists:
+        return ""
+    payload = sorted((list_type, sorted(values)) for list_type, values in lists.items())
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+def compute_options_fingerprint(options: Optional[ValidationOptions]) -> str:
+    """
+    Fingerprint of the validation options: a truncated or fail-fast run has its own report
+    """
+    return hashlib.sha256((options or ValidationOptions()).model_dump_json().encode("utf-8")).hexdigest()
+
+def compute_validation_token(file_hash: str, config_fingerprint: str, lists_fingerprint: str, options_fingerprint: str) -> str:
+    """
+    Token identifying a validation run of a given file against a given configuration, with given options
+    """
+    return hashlib.sha256(
+        f"{file_hash}:{config_fingerprint}:{lists_fingerprint}:{options_fingerprint}".encode("utf-8")
+    ).hexdigest()
+
+async def save_validation_report(validation_token: str, report: Dict, file_path: Optional[str] = None):
+    """
+    Store the validation report so /import/execute can reuse it
+    The error groups are stored apart, one document per group, for the detailed download
+    """
+    doc = {
+        "token": validation_token,
+        "file_path": file_path,
+        "success": report['success'],
+        "message": report['message'],
+        "total_rows": report.get('total_rows', 0),
+        "error_count": report.get('error_count', 0),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.validation_reports.replace_one({"token": validation_token}, doc, upsert=True)
+    
+    await db.validation_error_groups.delete_many({"token": validation_token})
+    groups = [{"token": validation_token, **group} for group in report.get('errors', [])]
+    for start in range(0, len(groups), 1000):
+        await db.validation_error_groups.insert_many(groups[start:start + 1000])
+
+def split_in_size_bounded_chunks(entries, entry_size: Callable, max_bytes: Optional[int] = None):
+    """
+    Group the entries into lists whose estimated size (sum of entry_size) stays under max_bytes
+    (ROW_CACHE_CHUNK_BYTES by default)
+    """
+    max_bytes = max_bytes or ROW_CACHE_CHUNK_BYTES
+    chunk = []
+    chunk_bytes = 0
+    for entry in entries:
+        size = entry_size(entry)
+        if chunk and chunk_bytes + size > max_bytes:
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(entry)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+async def save_validation_run(workflow_key: str, run_signature: Dict, valid_hashes: List[str], row_errors: Dict):
+    """
+    Keep the row verdicts of a validation for the next run of the workflow
+    The verdicts ([row hash, errors]) are stored in chunks of validation_run_verdicts; the run
+    document only holds the signature, the run id and the number of chunks
+    """
+    run_id = str(uuid.uuid4())
+    verdicts = chain(((row_hash, []) for row_hash in valid_hashes), row_errors.items())
+    chunk_count = 0
+    for chunk in split_in_size_bounded_chunks(verdicts, lambda verdict: len(verdict[0]) + len(json.dumps(verdict[1])) + 16):
+        await db.validation_run_verdicts.insert_one({
+            "run_id": run_id,
+            "chunk": chunk_count,
+            "rows": [[row_hash, errors] for row_hash, errors in chunk]
+        })
+        chunk_count += 1
+    
+    replaced_run = await db.validation_runs.find_one_and_replace(
+        {"workflow_key": workflow_key},
+        {
+            "workflow_key": workflow_key,
+            **run_signature,
+            "run_id": run_id,
+            "verdict_chunks": chunk_count,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        },
+        projection={"_id": 0, "run_id": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    if replaced_run and replaced_run.get('run_id'):
+        await db.validation_run_verdicts.delete_many({"run_id": replaced_run['run_id']})
+
+async def load_validation_run_verdicts(previous_run: Dict) -> Optional[Dict]:
+    """
+    Add the row verdicts (valid_hashes, row_errors) to the run document of the previous validation
+    Returns None when they are incomplete (run replaced meanwhile, or stored by an older version)
+    """
+    if not previous_run.get('run_id'):
+        return None
+    valid_hashes = set()
+    row_errors = {}
+    chunk_count = 0
+    async for chunk in db.validation_run_verdicts.find({"run_id": previous_run['run_id']}, {"_id": 0, "rows": 1}):
+        chunk_count += 1
+        for row_hash, errors in chunk['rows']:
+            if errors:
+                row_errors[row_hash] = errors
+            else:
+                valid_hashes.add(row_hash)
+    if chunk_count != previous_run['verdict_chunks']:
+        return None
+    return {**previous_run, "valid_hashes": valid_hashes, "row_errors": row_errors}
+
+async def get_validation_report(validation_token: str) -> Optional[Dict]:
+    """
+    Get a stored validation report by token
+    """
+    return await db.validation_reports.find_one({"token": validation_token}, {"_id": 0})
+
+def build_validation_response(report: Dict, validation_token: str) -> Dict:
+    """
+    Compact validation report returned by the API
+    Row ranges are sent as text and only the largest error groups are included,
+    the full detail is available from /import/validation-report/{token}/details
+    """
+    groups = report.get('errors', [])
+    return {
+        **report,
+        "errors": [
+            {name: value for name, value in group.items() if name != "ranges"}
+            for group in groups[:MAX_ERROR_GROUPS_IN_REPORT]
+        ],
+        "error_groups_total": len(groups),
+        "validation_token": validation_token
+    }
+
+async def run_import_validation(
+    file_path: str,
+    file_format: str,
+    selected_format: Dict,
+    table_config: Dict,
     site_url: str,
     login: str,
     system_password: str,
-    list_types: List[str]
+    reference_lists: Optional[Dict] = None,
+    incremental: bool = True,
+    options: Optional[ValidationOptions] = None,
+    on_rows: Optional[Callable] = None
 ) -> Dict:
     """
-    Fetch allowed values for reference lists from Legisway using REST API
+    Validate the uploaded file (key columns and list values) in a single pass over the rows
+    When the previous run of the same workflow used the same header, configuration and lists,
+    only the rows whose content changed are re-validated
+    options can stop the validation early (error budgets, columns missing from the header)
+    on_rows(rows_read) is called on the event loop as the rows are read
     """
+    context = await prepare_validation(
+        file_path=file_path,
+        file_format=file_format,
+        selected_format=selected_format,
+        table_config=table_config,
+        site_url=site_url,
+        login=login,
+        system_password=system_password,
+        reference_lists=reference_lists,
+        incremental=incremental,
+        options=options
+    )
+    if context['failure']:
+        return context['failure']
+    
+    thread_on_rows = None
+    if on_rows:
+        # The rows are validated in a worker thread, progress is handed back to the event loop
+        loop = asyncio.get_running_loop()
+        thread_on_rows = lambda rows_read: loop.call_soon_threadsafe(on_rows, rows_read)
+    
     try:
-        # Get base URL from site_url
-        from urllib.parse import urlparse
-        parsed = urlparse(site_url)
-        base_url = f"{parsed.scheme}://{parsed.netloc}"
+        pass_result = await asyncio.to_thread(
+            validate_excel_rows,
+            context['excel_rows'],
+            context['key_columns'],
+            context['list_columns'],
+            context['previous_run'],
+            context['options'],
+            context['type_columns'],
+            thread_on_rows
+        )
+        logger.info(
+            f"Validation terminée: {pass_result['total_rows']} lignes, "
+            f"{pass_result['rows_revalidated']} revalidées, {pass_result['rows_reused']} reprises de la validation précédente"
+        )
         
-        async with httpx.AsyncClient(verify=False, timeout=60.0) as client:
-            # Step 1: Authenticate and get JWT token using system password
-            logger.info(f"Authentication système à l'API Legisway...")
-            auth_url = f"{base_url}/resource/api/v1/auth/system"
-            
-            # System authentication uses only system password (not user password)
-            auth_payload = {
-                "password": system_password,
-                "languageCode": "fr"
+    except Exception as e:
+        logger.error(f"Validation error: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Erreur validation: {str(e)}",
+            "total_rows": 0
+        }
+    finally:
+        context['excel_rows'].close()
+    
+    if incremental and not pass_result['truncated'] and pass_result['total_rows'] <= MAX_INCREMENTAL_ROWS:
+        # The verdicts only speed up the next run, failing to keep them does not fail the validation
+        try:
+            await save_validation_run(
+                context['workflow_key'], context['run_signature'], pass_result['valid_hashes'], pass_result['row_errors']
+            )
+        except Exception as e:
+            logger.warning(f"Verdicts de validation non conservés: {str(e)}")
+    
+    key_columns = context['key_columns']
+    list_columns = context['list_columns']
+    lists = context['lists']
+    aggregator = pass_result['errors']
+    missing_key_groups = [group for group in aggregator.groups.values() if group['rule'] == "missing_key"]
+    invalid_value_groups = [group for group in aggregator.groups.values() if group['rule'] == "invalid_list_value"]
+    duplicate_key_groups = [group for group in aggregator.groups.values() if group['rule'] == "duplicate_key"]
+    type_groups = [group for group in aggregator.groups.values() if group['rule'] in ("invalid_type", "too_long")]
+    
+    # "Did you mean" suggestions, once per distinct invalid value whatever its number of rows
+    suggestions_cache = {}
+    for group in invalid_value_groups:
+        group['suggestions'] = suggest_list_values(lists, group['list_type'], group['value'], suggestions_cache)
+    
+    key_validation = {
+        "success": not missing_key_groups,
+        "message": build_missing_keys_message(missing_key_groups) if missing_key_groups else (
+            f"Toutes les colonnes clés sont remplies ({len(key_columns)} colonnes validées)"
+            if key_columns else "Aucun champ clé à valider"
+        )
+    }
+    list_validation = {
+        "success": not invalid_value_groups,
+        "message": build_invalid_values_message(invalid_value_groups, lists) if invalid_value_groups else (
+            f"Toutes les valeurs de listes sont valides ({len(list_columns)} colonnes validées)"
+            if list_columns else "Aucune liste à valider"
+        )
+    }
+    duplicate_validation = {
+        "success": not duplicate_key_groups,
+        "message": build_duplicate_keys_message(duplicate_key_groups) if duplicate_key_groups else (
+            "Aucune clé en double" if key_columns else "Aucun champ clé à valider"
+        ),
+        "duplicate_groups": len(duplicate_key_groups)
+    }
+    
+    type_validation = {
+        "success": not type_groups,
+        "message": build_type_errors_message(type_groups) if type_groups else (
+            f"Tous les types et longueurs sont valides ({len(context['type_columns'])} colonnes validées)"
+            if context['type_columns'] else "Aucun type à valider"
+        )
+    }
+    
+    validations = (key_validation, list_validation, duplicate_validation, type_validation)
+    success = all(result['success'] for result in validations)
+    if success:
+        message = f"Fichier valide: {pass_result['total_rows']} lignes"
+    else:
+        message = "\n".join(result['message'] for result in validations if not result['success'])
+        if pass_result['truncated']:
+            message += f"\nValidation interrompue après {aggregator.error_count} erreurs ({pass_result['total_rows']} lignes analysées)"
+    
+    # Allowed values are sent once per list instead of once per invalid cell
+    allowed_samples = {}
+    for group in invalid_value_groups:
+        list_type = group['list_type']
+        if list_type not in allowed_samples:
+            allowed_values = lists.get(list_type, [])
+            allowed_samples[list_type] = {
+                "values": list(allowed_values[:10]),
+                "total": len(allowed_values)
             }
-            
-            logger.info(f"Auth URL: {auth_url}")
-            
-            try:
-                # Send as form-data (application/x-www-form-urlencoded)
-                auth_response = await client.post(
-                    auth_url,
-                    data=auth_payload,
+    
+    return {
+        "success": success,
+        "message": message,
+        "total_rows": pass_result['total_rows'],
+        "key_validation": key_validation,
+        "list_validation": list_validation,
+        "duplicate_validation": duplicate_validation,
+        "type_validation": type_validation,
+        "truncated": pass_result['truncated'],
+        "error_count": aggregator.error_count,
+        "errors": aggregator.to_list(),
+        "allowed_samples": allowed_samples,
+        "column_mapping": context['column_mapping'],
+        "incremental": {
+            "reused_previous_run": context['previous_run'] is not None,
+            "rows_revalidated": pass_result['rows_revalidated'],
+            "rows_reused": pass_result['rows_reused']
+        }
+    }
+
+async def prepare_validation(
+    file_path: str,
+    file_format: str,
+    selected_format: Dict,
+    table_config: Dict,
+    site_url: str,
+    login: str,
+    system_password: str,
+    reference_lists: Optional[Dict] = None,
+    incremental: bool = True,
+    options: Optional[ValidationOptions] = None
+) -> Dict:
+    """
+    Read the Excel headers, map the configured columns and load the reference lists
+    Returns the validation context with the row stream still open, or the failure report
+    in 'failure' when the validation cannot start
+    """
+    options = options or ValidationOptions()
+    context = {"failure": None, "options": options}
+    
+    if file_format != 'excel':
+        context['failure'] = {
+            "success": False,
+            "message": "Seul le format Excel est supporté pour le moment",
+            "total_rows": 0
+        }
+        return context
+    
+    # Read Excel headers, the rows are streamed during validation
+    logger.info("Lecture du fichier Excel...")
+    excel_rows = iter_excel_rows(file_path)
+    
+    try:
+        _, excel_headers = next(excel_rows, (1, []))
+        logger.info(f"En-têtes Excel: {excel_headers}")
+        
+        # Key columns (Clé = Oui) and list columns (Filtre = type.name='...')
+        key_fields = extract_key_fields(table_config)
+        logger.info(f"Champs clés trouvés: {key_fields}")
+        list_fields = extract_list_fields(table_config)
+        logger.info(f"Champs avec listes trouvés: {len(list_fields)}")
+        
+        # Type and length rules (Type / Longueur columns of the configuration)
+        type_rules = extract_type_rules(table_config)
+        logger.info(f"Champs avec contrôle de type: {len(type_rules)}")
+        
+        workflow_key = get_workflow_key(site_url, selected_format)
+        fields = list(dict.fromkeys(
+            key_fields
+            + [list_field['field_path'] for list_field in list_fields]
+            + [type_rule['field_path'] for type_rule in type_rules]
+        ))
+        mapping = await resolve_column_mapping(excel_headers, fields, workflow_key, selected_format.get('name', ''))
+        columns = dict(mapping['columns'])
+        context['column_mapping'] = {
+            "columns": {field: excel_headers[idx] for field, idx in columns.items()},
+            "ambiguous": mapping['ambiguous'],
+            "unmapped": mapping['unmapped'],
+            "cached": mapping['cached']
+        }
+        
+        key_columns = [(columns[key_field], key_field) for key_field in key_fields if key_field in columns]
+        list_columns = [
+            {
+                "col_idx": columns[list_field['field_path']],
+                "field_path": list_field['field_path'],
+                "list_type": list_field['list_type'],
+                "allowed_values": set()
+            }
+            for list_field in list_fields if list_field['field_path'] in columns
+        ]
+        type_columns = [
+            {
+                "col_idx": columns[type_rule['field_path']],
+                "field_path": type_rule['field_path'],
+                "type": type_rule['type'],
+                "check": TYPE_VALIDATORS.get(type_rule['type']),
+                "max_length": type_rule['max_length']
+            }
+            for type_rule in type_rules if type_rule['field_path'] in columns
+        ]
+        logger.info(f"Colonnes clés à valider: {[key_field for _, key_field in key_columns]}")
+        logger.info(f"Colonnes de listes à valider: {len(list_columns)}")
+        
+        # Columns are mapped before fetching the lists so a wrong header fails immediately
+        # Only key and list columns are required, a typed column may be left out of the file
+        required_fields = set(key_fields) | {list_field['field_path'] for list_field in list_fields}
+        missing_columns = [field for field in mapping['unmapped'] if field in required_fields]
+        if options.fail_fast_on_missing_columns and missing_columns:
+            context['failure'] = {
+                "success": False,
+                "message": "Colonnes absentes du fichier Excel:\n" + "\n".join(f"- '{field}'" for field in missing_columns),
+                "total_rows": 0,
+                "missing_columns": missing_columns,
+                "column_mapping": context['column_mapping'],
+                "truncated": True
+            }
+            return context
+        
+        if key_fields and not key_columns:
+            context['failure'] = {
+                "success": False,
+                "message": "Aucune colonne clé trouvée dans le fichier Excel",
+                "total_rows": 0
+            }
+            return context
+        
+        lists = {}
+        if list_columns:
+            list_values_cache = await load_reference_lists(
+                list_fields=list_fields,
+                site_url=site_url,
+                login=login,
+                system_password=system_password,
+                pre_fetched_lists=reference_lists
+            )
+            if not list_values_cache['success']:
+                context['failure'] = {
+                    "success": False,
+                    "message": f"Erreur récupération des listes: {list_values_cache['message']}",
+                    "total_rows": 0
+                }
+                return context
+            lists = list_values_cache['lists']
+            for list_col in list_columns:
+                # Same frozenset for every column of a list type, no per-column copy
+                reference_list = lists.get(list_col['list_type'])
+                list_col['allowed_values'] = reference_list.value_set if reference_list is not None else frozenset()
+        elif list_fields:
+            logger.warning("Aucune colonne de liste trouvée dans Excel!")
+        
+        # Reuse the verdicts of the previous run when nothing but the rows changed
+        run_signature = {
+            "header_signature": compute_header_signature(excel_headers),
+            "config_fingerprint": compute_config_fingerprint(selected_format, table_config),
+            "lists_fingerprint": fingerprint_list_values(lists),
+            "mapping_fingerprint": hashlib.sha256(json.dumps(sorted(columns.items())).encode("utf-8")).hexdigest()
+        }
+        previous_run = None
+        if incremental:
+            previous_run = await db.validation_runs.find_one({"workflow_key": workflow_key}, {"_id": 0})
+            if previous_run and any(previous_run.get(name) != value for name, value in run_signature.items()):
+                logger.info("En-têtes, configuration ou listes modifiés depuis la dernière validation: validation complète")
+                previous_run = None
+            elif previous_run:
+                try:
+                    previous_run = await load_validation_run_verdicts(previous_run)
+                except Exception as e:
+                    logger.warning(f"Verdicts de la validation précédente illisibles, validation complète: {str(e)}")
+                    previous_run = None
+        
+    except Exception as e:
+        logger.error(f"Validation error: {str(e)}")
+        context['failure'] = {
+            "success": False,
+            "message": f"Erreur validation: {str(e)}",
+            "total_rows": 0
+        }
+        return context
+    finally:
+        if context['failure']:
+            excel_rows.close()
+    
+    context.update({
+        "excel_rows": excel_rows,
+        "excel_headers": excel_headers,
+        "key_columns": key_columns,
+        "list_columns": list_columns,
+        "type_columns": type_columns,
+        "lists": lists,
+        "workflow_key": workflow_key,
+        "run_signature": run_signature,
+        "previous_run": previous_run
+    })
+    return context
+
+def iter_excel_rows(file_path: str):
+    """
+    Stream the rows of the active sheet as (row number, values as strings)
+    The first row (headers) is always returned, empty data rows are skipped
+    """
+    workbook = load_workbook(filename=file_path, read_only=True)
+    try:
+        sheet = workbook.active
+        for row_number, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+            row_data = [str(cell) if cell is not None else "" for cell in row]
+            if row_number == 1 or any(row_data):
+                yield row_number, row_data
+    finally:
+        workbook.close()
+
+def read_excel_file(file_path: str) -> Dict:
+    """
+    Read Excel file and extract headers and rows
+    """
+    try:
+        rows_data = []
+        row_numbers = []
+        headers = []
+        
+        for row_number, row_data in iter_excel_rows(file_path):
+            if row_number == 1:
+                # First row = headers
+                headers = row_data
+            else:
+                # Data rows
+                rows_data.append(row_data)
+                row_numbers.append(row_number)
+        
+        return {
+            "success": True,
+            "headers": headers,
+            "rows": rows_data,
+            "row_numbers": row_numbers,
+            "total_rows": len(rows_data)
+        }
+        
+    except Exception as e:
+        logger.error(f"Error reading Excel: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Erreur lecture Excel: {str(e)}",
+            "headers": [],
+            "rows": [],
+            "row_numbers": [],
+            "total_rows": 0
+        }
+
+def extract_key_fields(table_config: Dict) -> List[str]:
+    """
+    Get the fields marked as keys (Clé = Oui) in the configuration table
+    Column index 0 = Chemin (path), Column index 1 = Clé (key indicator)
+    """
+    key_fields = []
+    
+    for row in table_config['rows']:
+        # row is a dict with 'cells' key
+        cells = row.get('cells', []) if isinstance(row, dict) else row.cells
+        
+        if len(cells) >= 2:
+            field_path = cells[0]  # Chemin (path)
+            is_key = cells[1]      # Clé (Oui/Non)
+            
+            if is_key == "Oui":
+                key_fields.append(field_path)
+    
+    return key_fields
+
+def extract_list_fields(table_config) -> List[Dict]:
+    """
+    Get the fields linked to a reference list in the configuration table
+    Column index 0 = Chemin (path), Column index 2 = Filtre (filter)
+    """
+    list_fields = []
+    rows = table_config['rows'] if isinstance(table_config, dict) else table_config.rows
+    
+    for row in rows:
+        cells = row.get('cells', []) if isinstance(row, dict) else row.cells
+        
+        if len(cells) >= 3:
+            field_path = cells[0]  # Chemin (path)
+            filter_value = cells[2]  # Filtre
+            
+            # Check if filter contains type.name='...'
+            if filter_value and "type.name=" in filter_value:
+                # Extract the list type name
+                match = LIST_TYPE_PATTERN.search(filter_value)
+                if match:
+                    list_fields.append({
+                        "field_path": field_path,
+                        "list_type": match.group(1),
+                        "filter": filter_value
+                    })
+    
+    return list_fields
+
+def normalize_text(value: str) -> str:
+    """
+    Lowercase, accent-free and whitespace-collapsed form of a text, used for matching
+    """
+    decomposed = unicodedata.normalize("NFKD", value)
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(without_accents.casefold().split())
+
+def score_header(header_norm: str, field_norm: str, synonyms: Dict[str, List[str]]) -> int:
+    """
+    Deterministic score of an Excel header (normalized) for a field path (normalized)
+    100 exact, 80 path contained in the header, 60-70 synonym of a path segment,
+    50-60 significant path segment, 0 no match
+    """
+    if header_norm == field_norm:
+        return 100
+    if field_norm in header_norm:
+        return 80
+    
+    segments = field_norm.split('.')
+    # Headers such as "Civilité (title.fr)" also carry the end of the path
+    bonus = 10 if len(segments) > 1 and '.'.join(segments[-2:]) in header_norm else 0
+    
+    best = 0
+    for segment in segments:
+        if segment in GENERIC_PATH_SEGMENTS or len(segment) < 3:
+            continue
+        if any(synonym in header_norm for synonym in synonyms.get(segment, [])):
+            best = max(best, 60 + bonus)
+        elif segment in header_norm:
+            best = max(best, 50 + bonus)
+    
+    return best
+
+async def get_header_synonyms(format_name: str) -> Dict[str, List[str]]:
+    """
+    Synonyms of path segments for a format: defaults merged with the ones configured in MongoDB
+    """
+    synonyms = {segment: list(words) for segment, words in DEFAULT_HEADER_SYNONYMS.items()}
+    doc = await db.header_synonyms.find_one({"format_name": format_name}, {"_id": 0})
+    if doc:
+        for segment, words in doc.get('synonyms', {}).items():
+            synonyms.setdefault(normalize_text(segment), []).extend(words)
+    
+    return {
+        segment: sorted({normalize_text(word) for word in words})
+        for segment, words in synonyms.items()
+    }
+
+def compute_column_mapping(excel_headers: List[str], fields: List[str], synonyms: Dict[str, List[str]]) -> Dict:
+    """
+    Map configuration fields to Excel columns
+    Candidates are assigned by decreasing score (then field order, then column order),
+    each column is used once; ties between columns are reported as ambiguous
+    """
+    headers_norm = [normalize_text(header) for header in excel_headers]
+    candidates = []
+    ambiguous = []
+    
+    for field_order, field in enumerate(fields):
+        field_norm = normalize_text(field)
+        scores = [(score_header(header_norm, field_norm, synonyms), idx) for idx, header_norm in enumerate(headers_norm)]
+        scores = [(score, idx) for score, idx in scores if score > 0]
+        if not scores:
+            continue
+        
+        top_score = max(score for score, _ in scores)
+        top_columns = [idx for score, idx in scores if score == top_score]
+        if len(top_columns) > 1:
+            ambiguous.append({
+                "field": field,
+                "score": top_score,
+                "headers": [excel_headers[idx] for idx in top_columns]
+            })
+        candidates.extend((-score, field_order, idx, field) for score, idx in scores)
+    
+    columns = {}
+    scores = {}
+    used_columns = set()
+    for negative_score, _, idx, field in sorted(candidates):
+        if field in columns or idx in used_columns:
+            continue
+        columns[field] = idx
+        scores[field] = -negative_score
+        used_columns.add(idx)
+    
+    return {
+        "columns": columns,
+        "scores": scores,
+        "ambiguous": ambiguous,
+        "unmapped": [field for field in fields if field not in columns]
+    }
+
+async def resolve_column_mapping(excel_headers: List[str], fields: List[str], workflow_key: str, format_name: str) -> Dict:
+    """
+    Mapping of configuration fields to Excel columns, persisted per (format, header signature)
+    so later uploads of the same layout resolve it with a single lookup
+    """
+    synonyms = await get_header_synonyms(format_name)
+    header_signature = compute_header_signature(excel_headers)
+    mapping_signature = hashlib.sha256(
+        json.dumps({"fields": fields, "synonyms": synonyms}, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    
+    cached = await db.header_mappings.find_one(
+        {"workflow_key": workflow_key, "header_signature": header_signature, "mapping_signature": mapping_signature},
+        {"_id": 0}
+    )
+    if cached:
+        logger.info("Correspondance des colonnes reprise du cache")
+        return {
+            **cached['mapping'],
+            "columns": dict(cached['mapping']['columns']),
+            "scores": dict(cached['mapping']['scores']),
+            "cached": True
+        }
+    
+    mapping = compute_column_mapping(excel_headers, fields, synonyms)
+    for field, idx in mapping['columns'].items():
+        logger.info(f"  {field} -> colonne {idx + 1} '{excel_headers[idx]}' (score {mapping['scores'][field]})")
+    for item in mapping['ambiguous']:
+        logger.warning(f"Correspondance ambiguë pour '{item['field']}': {item['headers']}")
+    for field in mapping['unmapped']:
+        logger.warning(f"Colonne '{field}' non trouvée dans Excel")
+    
+    await db.header_mappings.replace_one(
+        {"workflow_key": workflow_key, "header_signature": header_signature, "mapping_signature": mapping_signature},
+        {
+            "workflow_key": workflow_key,
+            "header_signature": header_signature,
+            "mapping_signature": mapping_signature,
+            # MongoDB keys cannot contain dots, the columns are stored as pairs
+            "mapping": {**mapping, "columns": list(mapping['columns'].items()), "scores": list(mapping['scores'].items())},
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        upsert=True
+    )
+    return {**mapping, "cached": False}
+
+class ReferenceList:
+    """
+    Immutable values of a reference list, held once per (tenant, list type)
+    and shared by reference by every column using the list
+    """
+    
+    __slots__ = ("list_type", "values", "value_set", "normalized", "fingerprint", "memory_bytes", "_search_index")
+    
+    def __init__(self, list_type: str, values):
+        self.list_type = list_type
+        # Interned and sorted once: a value is stored a single time across the tuple, set and map
+        self.values = tuple(sorted({sys.intern(str(value)) for value in values}))
+        self.value_set = frozenset(self.values)
+        normalized = {}
+        for value in self.values:
+            normalized.setdefault(sys.intern(normalize_text(value)), value)
+        # Accent and case-insensitive lookup: normalized text -> value
+        self.normalized = MappingProxyType(normalized)
+        self.fingerprint = hashlib.sha256("\x1f".join(self.values).encode("utf-8")).hexdigest()
+        self.memory_bytes = self._measure()
+        self._search_index = None
+    
+    def _measure(self) -> int:
+        """
+        Approximate memory footprint in bytes (containers + distinct strings)
+        """
+        strings = set(self.values) | set(self.normalized)
+        return (
+            sys.getsizeof(self.values)
+            + sys.getsizeof(self.value_set)
+            + sys.getsizeof(dict(self.normalized))
+            + sum(sys.getsizeof(string) for string in strings)
+        )
+    
+    def _get_search_index(self) -> tuple:
+        """
+        Search index built on first search: normalized values, sorted normalized values
+        for prefix lookups, trigram -> value positions and number of trigrams of each value
+        """
+        if self._search_index is None:
+            normalized_values = tuple(sys.intern(normalize_text(value)) for value in self.values)
+            prefix_order = sorted(range(len(normalized_values)), key=normalized_values.__getitem__)
+            prefix_keys = [normalized_values[idx] for idx in prefix_order]
+            postings = {}
+            trigram_counts = np.zeros(len(normalized_values), dtype=np.int32)
+            for idx, value_norm in enumerate(normalized_values):
+                value_trigrams = {value_norm[pos:pos + 3] for pos in range(len(value_norm) - 2)}
+                trigram_counts[idx] = len(value_trigrams)
+                for trigram in value_trigrams:
+                    postings.setdefault(trigram, array('i')).append(idx)
+            trigrams = {trigram: np.frombuffer(positions, dtype=np.int32) for trigram, positions in postings.items()}
+            
+            self._search_index = (normalized_values, prefix_keys, array('i', prefix_order), trigrams, trigram_counts)
+            self.memory_bytes += (
+                sys.getsizeof(normalized_values)
+                + sys.getsizeof(prefix_keys)
+                + sys.getsizeof(trigrams)
+                + sum(positions.nbytes for positions in trigrams.values())
+                + trigram_counts.nbytes
+            )
+        return self._search_index
+    
+    def search(self, query: str) -> List[str]:
+        """
+        Values matching a query, accent and case-insensitive
+        Queries under 3 characters match value prefixes, longer queries match anywhere in
+        the value (exact match first, then prefix matches, then alphabetical order)
+        """
+        query_norm = normalize_text(query)
+        if not query_norm:
+            return list(self.values)
+        
+        normalized_values, prefix_keys, prefix_order, trigrams, _ = self._get_search_index()
+        
+        if len(query_norm) < 3:
+            start = bisect_left(prefix_keys, query_norm)
+            end = bisect_left(prefix_keys, query_norm + "\uffff", start)
+            return [self.values[idx] for idx in sorted(prefix_order[start:end])]
+        
+        # Positions present in every trigram of the query, smallest posting first
+        postings = sorted(
+            (trigrams.get(query_norm[pos:pos + 3], EMPTY_POSITIONS) for pos in range(len(query_norm) - 2)),
+            key=len
+        )
+        candidates = postings[0]
+        for positions in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, positions, assume_unique=True)
+        
+        matches = [idx for idx in candidates.tolist() if query_norm in normalized_values[idx]]
+        matches.sort(key=lambda idx: (
+            normalized_values[idx] != query_norm,
+            not normalized_values[idx].startswith(query_norm),
+            idx
+        ))
+        return [self.values[idx] for idx in matches]
+    
+    def suggest(self, value: str, limit: int = 3) -> List[str]:
+        """
+        Closest values of an invalid value ("Did you mean"), ranked by Dice similarity
+        of their trigrams, shared trigrams of all values are counted at once from the index
+        """
+        value_norm = normalize_text(value)
+        if not value_norm:
+            return []
+        if len(value_norm) < 3:
+            return self.search(value_norm)[:limit]
+        
+        _, _, _, trigrams, trigram_counts = self._get_search_index()
+        value_trigrams = {value_norm[pos:pos + 3] for pos in range(len(value_norm) - 2)}
+        postings = [trigrams[trigram] for trigram in value_trigrams if trigram in trigrams]
+        if not postings:
+            return []
+        
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.values))
+        scores = 2 * shared / (len(value_trigrams) + trigram_counts)
+        candidates = np.flatnonzero(scores >= MIN_SUGGESTION_SCORE)
+        if len(candidates) > limit:
+            kth_score = np.partition(scores[candidates], -limit)[-limit]
+            candidates = candidates[scores[candidates] >= kth_score]
+        
+        # Best score first, alphabetical order between equal scores
+        order = np.lexsort((candidates, -scores[candidates]))[:limit]
+        return [self.values[idx] for idx in candidates[order].tolist()]
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def __iter__(self):
+        return iter(self.values)
+    
+    def __contains__(self, value) -> bool:
+        return value in self.value_set
+    
+    def __getitem__(self, index):
+        return self.values[index]
+
+def store_reference_list(tenant_key: str, list_type: str, values) -> ReferenceList:
+    """
+    Keep the values of a list in the shared store, the stored list is reused while its values are unchanged
+    """
+    current = REFERENCE_LISTS.get((tenant_key, list_type))
+    if current is not None and (values is current or current.value_set == frozenset(values)):
+        return current
+    
+    reference_list = ReferenceList(list_type, values)
+    REFERENCE_LISTS[(tenant_key, list_type)] = reference_list
+    return reference_list
+
+async def persist_reference_list(tenant_key: str, reference_list: ReferenceList):
+    """
+    Keep a list in MongoDB for the other servers: the values are stored once per fingerprint
+    (reference_list_values, in size-bounded chunks) and reference_lists points each
+    (tenant, list type) to its current fingerprint
+    """
+    pointer = {"tenant": tenant_key, "list_type": reference_list.list_type}
+    current = await db.reference_lists.find_one(pointer, {"_id": 0, "fingerprint": 1})
+    if current and current['fingerprint'] == reference_list.fingerprint:
+        return
+    
+    fingerprint = reference_list.fingerprint
+    if not await db.reference_list_values.count_documents({"fingerprint": fingerprint}, limit=1):
+        # An empty list still gets its (empty) chunk
+        chunks = list(split_in_size_bounded_chunks(reference_list.values, lambda value: len(value) + 16)) or [[]]
+        for chunk_number, values in enumerate(chunks):
+            await db.reference_list_values.insert_one({"fingerprint": fingerprint, "chunk": chunk_number, "values": values})
+    await db.reference_lists.replace_one(
+        pointer,
+        {**pointer, "fingerprint": fingerprint, "value_count": len(reference_list), "updated_at": datetime.now(timezone.utc).isoformat()},
+        upsert=True
+    )
+    
+    # Values of the replaced list, unless another tenant has the same list
+    if current and not await db.reference_lists.count_documents({"fingerprint": current['fingerprint']}, limit=1):
+        await db.reference_list_values.delete_many({"fingerprint": current['fingerprint']})
+
+async def get_reference_list(tenant_key: str, list_type: str, fingerprint: Optional[str] = None) -> Optional[ReferenceList]:
+    """
+    Current list of a tenant (or the list with the given fingerprint), from memory when up to date,
+    otherwise loaded from MongoDB; None when no server fetched it
+    """
+    if fingerprint is None:
+        pointer = await db.reference_lists.find_one({"tenant": tenant_key, "list_type": list_type}, {"_id": 0, "fingerprint": 1})
+        if pointer is None:
+            return REFERENCE_LISTS.get((tenant_key, list_type))
+        fingerprint = pointer['fingerprint']
+    
+    stored = REFERENCE_LISTS.get((tenant_key, list_type))
+    if stored is not None and stored.fingerprint == fingerprint:
+        return stored
+    
+    values = []
+    chunk_count = 0
+    async for chunk in db.reference_list_values.find({"fingerprint": fingerprint}, {"_id": 0, "values": 1}).sort("chunk", 1):
+        values.extend(chunk['values'])
+        chunk_count += 1
+    if not chunk_count:
+        return None
+    reference_list = store_reference_list(tenant_key, list_type, values)
+    # Chunks missing (list replaced while reading): not the requested list
+    return reference_list if reference_list.fingerprint == fingerprint else None
+
+def suggest_list_values(lists: Dict, list_type: str, value: str, cache: Dict) -> List[str]:
+    """
+    Suggestions for an invalid list value, computed once per distinct (list type, value)
+    """
+    cache_key = (list_type, value)
+    if cache_key not in cache:
+        reference_list = lists.get(list_type)
+        cache[cache_key] = reference_list.suggest(value) if reference_list is not None else []
+    return cache[cache_key]
+
+def reference_list_metrics() -> Dict:
+    """
+    Size and memory footprint of the shared reference lists
+    """
+    lists = [
+        {
+            "tenant": tenant_key,
+            "list_type": list_type,
+            "values": len(reference_list),
+            "memory_bytes": reference_list.memory_bytes
+        }
+        for (tenant_key, list_type), reference_list in sorted(REFERENCE_LISTS.items())
+    ]
+    return {
+        "count": len(lists),
+        "values": sum(item['values'] for item in lists),
+        "memory_bytes": sum(item['memory_bytes'] for item in lists),
+        "lists": lists
+    }
+
+async def load_reference_lists(
+    list_fields: List[Dict],
+    site_url: str,
+    login: str,
+    system_password: str,
+    pre_fetched_lists: Optional[Dict] = None
+) -> Dict:
+    """
+    Get the values of the reference lists used by list fields, as shared ReferenceList
+    Uses pre_fetched_lists when available to avoid re-fetching during validation: complete
+    payload values are used as is, sampled ones are taken from the shared store
+    """
+    tenant_key = get_tenant_key(site_url)
+    
+    if pre_fetched_lists and pre_fetched_lists.get('success') and pre_fetched_lists.get('list_fields'):
+        logger.info("Utilisation des listes pré-récupérées")
+        # Convert list_fields format to lists format
+        list_values_cache = {
+            'success': True,
+            'lists': {}
+        }
+        missing_list_types = []
+        for list_field in pre_fetched_lists['list_fields']:
+            list_type = list_field['list_type']
+            if len(list_field['values']) >= list_field.get('total_count', 0):
+                list_values_cache['lists'][list_type] = list_field['values']
+                continue
+            
+            stored = await get_reference_list(tenant_key, list_type, list_field.get('fingerprint') or None)
+            if stored is not None and stored.fingerprint == list_field.get('fingerprint'):
+                list_values_cache['lists'][list_type] = stored
+            else:
+                missing_list_types.append(list_type)
+        
+        if missing_list_types:
+            # Sampled lists neither in memory nor in MongoDB: fetch them again
+            logger.info(f"Listes à récupérer de nouveau: {missing_list_types}")
+            fetched = await fetch_list_values_from_legisway(
+                site_url=site_url,
+                login=login,
+                system_password=system_password,
+                list_types=missing_list_types
+            )
+            if not fetched['success']:
+                return fetched
+            list_values_cache['lists'].update(fetched['lists'])
+        
+        logger.info(f"Listes pré-récupérées: {len(list_values_cache['lists'])}")
+    else:
+        # Fetch list values from Legisway
+        logger.info("Récupération des listes depuis Legisway...")
+        list_values_cache = await fetch_list_values_from_legisway(
+            site_url=site_url,
+            login=login,
+            system_password=system_password,
+            list_types=[field['list_type'] for field in list_fields]
+        )
+        
+        if not list_values_cache['success']:
+            return list_values_cache
+        
+        logger.info(f"Listes récupérées: {len(list_values_cache['lists'])}")
+    
+    list_values_cache['lists'] = {
+        list_type: store_reference_list(tenant_key, list_type, values)
+        for list_type, values in list_values_cache['lists'].items()
+    }
+    for reference_list in list_values_cache['lists'].values():
+        await persist_reference_list(tenant_key, reference_list)
+    
+    for list_name, list_vals in list_values_cache['lists'].items():
+        logger.info(f"  - {list_name}: {len(list_vals)} valeurs")
+    
+    return list_values_cache
+
+def compute_row_hash(row_data: List[str]) -> str:
+    """
+    Short content hash of an Excel row, used to detect changed rows between uploads
+    """
+    return hashlib.blake2b("\x1f".join(row_data).encode("utf-8"), digest_size=8).hexdigest()
+
+def compute_header_signature(excel_headers: List[str]) -> str:
+    """
+    Signature of the Excel header row
+    """
+    return hashlib.sha256("\x1f".join(excel_headers).encode("utf-8")).hexdigest()
+
+def get_tenant_key(site_url: str) -> str:
+    """
+    Identify a Legisway tenant by the host of its URL
+    """
+    return urlparse(site_url).netloc.lower()
+
+def get_workflow_key(site_url: str, selected_format: Dict) -> str:
+    """
+    Identify an import workflow (tenant + import format)
+    """
+    return f"{get_tenant_key(site_url)}|{selected_format.get('name', '')}"
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: callers with the same key await one shared task
+    A cancelled caller does not cancel the task while other callers still wait for it
+    """
+    
+    def __init__(self):
+        self.calls = {}  # key -> {"task", "waiters"}
+        self.started = 0
+        self.coalesced = 0
+    
+    async def run(self, key: tuple, factory):
+        """
+        Run factory() for the first caller of a key, later callers share its result
+        """
+        call = self.calls.get(key)
+        if call is None:
+            call = {"task": asyncio.ensure_future(factory()), "waiters": 0}
+            self.calls[key] = call
+            self.started += 1
+            
+            def forget(_task, key=key, call=call):
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+            
+            call['task'].add_done_callback(forget)
+        else:
+            self.coalesced += 1
+            logger.info(f"Requête identique en cours, résultat partagé: {key[0]} {key[1]}")
+        
+        call['waiters'] += 1
+        try:
+            # shield: cancelling this caller must not cancel the shared task
+            return await asyncio.shield(call['task'])
+        finally:
+            call['waiters'] -= 1
+            if call['waiters'] == 0 and not call['task'].done():
+                # Every caller is gone, nobody needs the result anymore
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+                call['task'].cancel()
+    
+    def metrics(self) -> Dict:
+        return {
+            "in_flight": len(self.calls),
+            "started": self.started,
+            "coalesced": self.coalesced
+        }
+
+def build_flight_key(operation: str, site_url: str, *args) -> tuple:
+    """
+    Single-flight key (operation, tenant, digest of the arguments)
+    Credentials are part of the digest: different accounts never share a result
+    """
+    digest = hashlib.sha256(json.dumps(args, default=str).encode("utf-8")).hexdigest()
+    return (operation, get_tenant_key(site_url), digest)
+
+single_flight = SingleFlight()
+
+def is_valid_date(value: str) -> bool:
+    """
+    Dates as written by Excel (2024-01-31 00:00:00) or typed by users (31/01/2024, 2024-01-31)
+    """
+    match = ISO_DATE_PATTERN.match(value)
+    if match:
+        year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    else:
+        match = FR_DATE_PATTERN.match(value)
+        if not match:
+            return False
+        day, month, year = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    
+    try:
+        date(year, month, day)
+        return True
+    except ValueError:
+        return False
+
+def is_valid_integer(value: str) -> bool:
+    """
+    Integers, Excel numbers without decimals are read as "12.0"
+    """
+    return INTEGER_PATTERN.match(value) is not None
+
+def is_valid_number(value: str) -> bool:
+    """
+    Decimal numbers with a dot or a comma
+    """
+    return NUMBER_PATTERN.match(value) is not None
+
+def is_valid_boolean(value: str) -> bool:
+    """
+    Oui/Non, Vrai/Faux, True/False, 1/0
+    """
+    return value.lower() in BOOLEAN_VALUES
+
+# Type validators by type name, extend this registry to support a new type
+TYPE_VALIDATORS = {
+    "date": is_valid_date,
+    "integer": is_valid_integer,
+    "number": is_valid_number,
+    "boolean": is_valid_boolean
+}
+
+TYPE_LABELS = {
+    "date": "une date",
+    "integer": "un nombre entier",
+    "number": "un nombre",
+    "boolean": "un booléen (Oui/Non)"
+}
+
+def parse_config_type(type_value: str) -> Optional[str]:
+    """
+    Validator name for a type of the configuration table (Date, Entier, Décimal, Booléen...)
+    Text types return None, they are only checked for length
+    """
+    type_words = set(CONFIG_TYPE_WORD_PATTERN.findall(normalize_text(type_value)))
+    if type_words & CONFIG_TEXT_WORDS:
+        return None
+    for validator_name, words in CONFIG_TYPE_WORDS.items():
+        if type_words & words:
+            return validator_name
+    return None
+
+def is_text_config_type(type_value: str) -> bool:
+    """
+    Whether a type of the configuration table is a text type (Texte, String(255), Chaîne...)
+    """
+    return bool(set(CONFIG_TYPE_WORD_PATTERN.findall(normalize_text(type_value))) & CONFIG_TEXT_WORDS)
+
+def extract_type_rules(table_config: Dict) -> List[Dict]:
+    """
+    Get the type and maximum length rules of fields from the configuration table
+    The Type and Longueur columns are found by their header, a text type may also give
+    its length, e.g. "String(255)" (the digits of "Int64" or "Decimal(10,2)" are not lengths)
+    """
+    headers = [normalize_text(header) for header in table_config.get('headers', [])]
+    type_idx = next((idx for idx, header in enumerate(headers) if header in CONFIG_TYPE_HEADERS), None)
+    length_idx = next((idx for idx, header in enumerate(headers) if header in CONFIG_LENGTH_HEADERS), None)
+    
+    if type_idx is None and length_idx is None:
+        return []
+    
+    type_rules = []
+    for row in table_config['rows']:
+        cells = row.get('cells', []) if isinstance(row, dict) else row.cells
+        if not cells:
+            continue
+        
+        type_value = cells[type_idx] if type_idx is not None and type_idx < len(cells) else ""
+        length_value = cells[length_idx] if length_idx is not None and length_idx < len(cells) else ""
+        
+        validator_name = parse_config_type(type_value) if type_value else None
+        length_match = CONFIG_LENGTH_PATTERN.search(length_value)
+        if not length_match and is_text_config_type(type_value):
+            length_match = CONFIG_LENGTH_PATTERN.search(type_value)
+        max_length = int(length_match.group(1)) if length_match else None
+        
+        if validator_name or max_length:
+            type_rules.append({
+                "field_path": cells[0],
+                "type": validator_name,
+                "max_length": max_length
+            })
+    
+    return type_rules
+
+def check_row(
+    row: List[str],
+    key_columns: List[tuple],
+    list_columns: List[Dict],
+    type_columns: Optional[List[Dict]] = None
+) -> List[Dict]:
+    """
+    Run the key, list and type rules on one row
+    Returns the errors of the row, without row number so they can be reused for identical rows
+    """
+    errors = []
+    
+    for col_idx, key_field in key_columns:
+        if col_idx < len(row):
+            value = row[col_idx].strip()
+            if not value:
+                errors.append({
+                    "rule": "missing_key",
+                    "column": key_field,
+                    "column_index": col_idx + 1
+                })
+    
+    for list_col in list_columns:
+        col_idx = list_col['col_idx']
+        
+        if col_idx < len(row):
+            value = row[col_idx].strip()
+            
+            # Empty values are allowed
+            if value and value not in list_col['allowed_values']:
+                errors.append({
+                    "rule": "invalid_list_value",
+                    "column": list_col['field_path'],
+                    "column_index": col_idx + 1,
+                    "value": value,
+                    "list_type": list_col['list_type']
+                })
+    
+    for type_col in type_columns or []:
+        col_idx = type_col['col_idx']
+        
+        if col_idx < len(row):
+            value = row[col_idx].strip()
+            
+            # Empty values are allowed
+            if not value:
+                continue
+            if type_col['check'] and not type_col['check'](value):
+                errors.append({
+                    "rule": "invalid_type",
+                    "column": type_col['field_path'],
+                    "column_index": col_idx + 1,
+                    "value": value[:100],
+                    "expected_type": type_col['type']
+                })
+            elif type_col['max_length'] and len(value) > type_col['max_length']:
+                errors.append({
+                    "rule": "too_long",
+                    "column": type_col['field_path'],
+                    "column_index": col_idx + 1,
+                    "value": value[:100],
+                    "max_length": type_col['max_length']
+                })
+    
+    return errors
+
+def iter_validation_errors(
+    excel_rows,
+    key_columns: List[tuple],
+    list_columns: List[Dict],
+    previous_run: Optional[Dict] = None,
+    options: Optional[ValidationOptions] = None,
+    stats: Optional[Dict] = None,
+    collect_verdicts: bool = True,
+    type_columns: Optional[List[Dict]] = None
+):
+    """
+    Validate the data rows in a single pass and yield (row number, error) as they are found
+    Rows already validated in previous_run (same content hash) reuse their cached verdict
+    Duplicate composite keys are detected in the same pass with a hash index (64-bit key
+    digests, so memory does not depend on key length); when a key is seen again, both the
+    first row and the current row are reported
+    The pass stops early once the error budgets of options are spent
+    stats is filled with the counters of the pass (and the row verdicts when collect_verdicts)
+    """
+    options = options or ValidationOptions()
+    stats = stats if stats is not None else {}
+    stats.update({
+        "total_rows": 0,
+        "rows_revalidated": 0,
+        "error_count": 0,
+        "column_counts": {},
+        "truncated": False,
+        "valid_hashes": set(),
+        "row_errors": {}
+    })
+    column_counts = stats['column_counts']
+    type_columns = type_columns or []
+    validated_columns = (
+        {key_field for _, key_field in key_columns}
+        | {col['field_path'] for col in list_columns}
+        | {col['field_path'] for col in type_columns}
+    )
+    exhausted_columns = set()
+    
+    # Hash index of composite keys: key digest -> first row
+    key_label = " + ".join(key_field for _, key_field in key_columns)
+    if key_columns:
+        validated_columns.add(key_label)
+    key_index = {}
+    reported_keys = set()
+    previous_valid = set(previous_run['valid_hashes']) if previous_run else set()
+    previous_errors = previous_run['row_errors'] if previous_run else {}
+    
+    for row_number, row in excel_rows:
+        stats['total_rows'] += 1
+        row_hash = compute_row_hash(row) if (previous_run or collect_verdicts) else None
+        
+        if row_hash in previous_valid:
+            errors = []
+        elif row_hash in previous_errors:
+            errors = previous_errors[row_hash]
+        else:
+            errors = check_row(row, key_columns, list_columns, type_columns)
+            stats['rows_revalidated'] += 1
+        
+        if collect_verdicts:
+            if errors:
+                stats['row_errors'][row_hash] = errors
+            else:
+                stats['valid_hashes'].add(row_hash)
+        
+        row_events = [(row_number, error) for error in errors]
+        
+        # Duplicate keys depend on the other rows, they are never cached per row
+        if key_columns:
+            key_values = [row[col_idx].strip() if col_idx < len(row) else "" for col_idx, _ in key_columns]
+            if all(key_values):
+                key_digest = int.from_bytes(
+                    hashlib.blake2b("\x1f".join(key_values).encode("utf-8"), digest_size=8).digest(), "big"
+                )
+                first_row = key_index.setdefault(key_digest, row_number)
+                if first_row != row_number:
+                    duplicate = {
+                        "rule": "duplicate_key",
+                        "column": key_label,
+                        "column_index": key_columns[0][0] + 1,
+                        "value": " | ".join(key_values),
+                        "first_row": first_row
+                    }
+                    if key_digest not in reported_keys:
+                        reported_keys.add(key_digest)
+                        row_events.append((first_row, duplicate))
+                    row_events.append((row_number, duplicate))
+        
+        for event_row, error in row_events:
+            column = error['column']
+            if column in exhausted_columns:
+                stats['truncated'] = True
+                continue
+            stats['error_count'] += 1
+            column_counts[column] = column_counts.get(column, 0) + 1
+            yield event_row, error
+            if options.max_errors_per_column and column_counts[column] >= options.max_errors_per_column:
+                exhausted_columns.add(column)
+            if options.max_errors and stats['error_count'] >= options.max_errors:
+                break
+        
+        if options.max_errors and stats['error_count'] >= options.max_errors:
+            stats['truncated'] = True
+            break
+        if validated_columns and exhausted_columns >= validated_columns:
+            stats['truncated'] = True
+            break
+
+def validate_excel_rows(
+    excel_rows,
+    key_columns: List[tuple],
+    list_columns: List[Dict],
+    previous_run: Optional[Dict] = None,
+    options: Optional[ValidationOptions] = None,
+    type_columns: Optional[List[Dict]] = None,
+    on_rows: Optional[Callable] = None
+) -> Dict:
+    """
+    Validate the data rows in a single pass and aggregate the errors
+    """
+    stats = {}
+    errors_aggregator = ValidationErrorAggregator()
+    if on_rows:
+        excel_rows = iter_with_progress(excel_rows, on_rows)
+    
+    for row_number, error in iter_validation_errors(
+        excel_rows, key_columns, list_columns, previous_run, options, stats, type_columns=type_columns
+    ):
+        errors_aggregator.add(row_number, error)
+    
+    return {
+        "total_rows": stats['total_rows'],
+        "truncated": stats['truncated'],
+        "errors": errors_aggregator,
+        "valid_hashes": list(stats['valid_hashes']),
+        "row_errors": stats['row_errors'],
+        "rows_revalidated": stats['rows_revalidated'],
+        "rows_reused": stats['total_rows'] - stats['rows_revalidated']
+    }
+
+def iter_with_progress(rows, on_rows: Callable, interval: int = VALIDATION_PROGRESS_INTERVAL):
+    """
+    Pass the rows through and report the number of rows read every interval rows
+    """
+    rows_read = 0
+    for row in rows:
+        yield row
+        rows_read += 1
+        if rows_read % interval == 0:
+            on_rows(rows_read)
+
+class ValidationErrorAggregator:
+    """
+    Aggregate validation errors by (column, rule, value)
+    Rows are kept as compressed ranges, counts stay exact
+    """
+    
+    def __init__(self):
+        self.groups = {}
+        self.error_count = 0
+    
+    def add(self, row_number: int, error: Dict):
+        """
+        Add the error of a row, rows must be added in increasing order
+        """
+        key = (error['column'], error['rule'], error.get('value', ""))
+        group = self.groups.get(key)
+        if group is None:
+            group = {**error, "value": error.get('value', ""), "count": 0, "ranges": []}
+            self.groups[key] = group
+        
+        group['count'] += 1
+        self.error_count += 1
+        
+        ranges = group['ranges']
+        if ranges and ranges[-1][1] + 1 >= row_number:
+            ranges[-1][1] = row_number
+        else:
+            ranges.append([row_number, row_number])
+    
+    def to_list(self) -> List[Dict]:
+        """
+        Groups sorted by number of errors, with rows formatted as "2-1500, 1502"
+        """
+        return [
+            {**group, "rows": format_row_ranges(group['ranges'])}
+            for group in sorted(self.groups.values(), key=lambda g: (-g['count'], g['column'], g['value']))
+        ]
+
+def format_row_ranges(ranges: List[List[int]]) -> str:
+    """
+    Format row ranges as "2-1500, 1502"
+    """
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+def iter_group_rows(group: Dict):
+    """
+    Expand the row ranges of an error group into (row, error record)
+    """
+    record = {
+        name: group[name]
+        for name in (
+            "column", "rule", "value", "list_type", "column_index", "first_row", "expected_type", "max_length", "suggestions"
+        )
+        if name in group
+    }
+    for start, end in group['ranges']:
+        for row_number in range(start, end + 1):
+            yield row_number, {"row": row_number, **record}
+
+def describe_error(error: Dict) -> str:
+    """
+    Short description of a validation error for the annotated workbook
+    """
+    if error['rule'] == "missing_key":
+        return f"{error['column']}: clé obligatoire vide"
+    if error['rule'] == "invalid_list_value":
+        description = f"{error['column']}: '{error['value']}' absente de la liste {error['list_type']}"
+        if error.get('suggestions'):
+            description += f" (vouliez-vous dire {format_suggestions(error['suggestions'])} ?)"
+        return description
+    if error['rule'] == "duplicate_key":
+        return f"{error['column']}: clé '{error['value']}' en double"
+    if error['rule'] == "invalid_type":
+        return f"{error['column']}: '{error['value']}' n'est pas {TYPE_LABELS.get(error['expected_type'], error['expected_type'])}"
+    if error['rule'] == "too_long":
+        return f"{error['column']}: valeur trop longue (max {error['max_length']} caractères)"
+    return f"{error['column']}: {error['rule']}"
+
+def write_annotated_workbook(source_path: str, target_path: str, groups: List[Dict]):
+    """
+    Copy the source workbook row by row (write-only mode) with invalid cells highlighted
+    and an extra "Erreurs" column, errors are merged in row order from the error groups
+    """
+    source = load_workbook(filename=source_path, read_only=True)
+    target = Workbook(write_only=True)
+    
+    try:
+        source_sheet = source.active
+        target_sheet = target.create_sheet(title=source_sheet.title)
+        
+        errors = heapq.merge(*(iter_group_rows(group) for group in groups), key=lambda item: item[0])
+        next_error = next(errors, None)
+        
+        for row_number, row in enumerate(source_sheet.iter_rows(values_only=True), start=1):
+            if row_number == 1:
+                target_sheet.append(list(row) + ["Erreurs"])
+                continue
+            
+            row_errors = []
+            while next_error is not None and next_error[0] <= row_number:
+                if next_error[0] == row_number:
+                    row_errors.append(next_error[1])
+                next_error = next(errors, None)
+            
+            if not row_errors:
+                target_sheet.append(row)
+                continue
+            
+            invalid_columns = {error['column_index'] for error in row_errors if error.get('column_index')}
+            cells = list(row) + [None] * max(0, max(invalid_columns, default=0) - len(row))
+            out_row = []
+            for col_number, value in enumerate(cells, start=1):
+                if col_number in invalid_columns:
+                    cell = WriteOnlyCell(target_sheet, value=value)
+                    cell.fill = ERROR_CELL_FILL
+                    out_row.append(cell)
+                else:
+                    out_row.append(value)
+            out_row.append("; ".join(describe_error(error) for error in row_errors))
+            target_sheet.append(out_row)
+        
+        target.save(target_path)
+    finally:
+        source.close()
+
+def build_missing_keys_message(missing_key_groups: List[Dict]) -> str:
+    """
+    Human readable summary of empty key cells, by column
+    """
+    error_msg = "Colonnes clés manquantes:\n"
+    for group in missing_key_groups:
+        rows_str = format_row_ranges(group['ranges'][:5])
+        if len(group['ranges']) > 5:
+            rows_str += f" ... ({group['count']} lignes au total)"
+        error_msg += f"- '{group['column']}': lignes {rows_str}\n"
+    
+    return error_msg
+
+def build_duplicate_keys_message(duplicate_key_groups: List[Dict]) -> str:
+    """
+    Human readable summary of duplicate keys, one line per duplicated key
+    """
+    error_msg = f"Clés en double ({len(duplicate_key_groups)} clés):\n"
+    for group in duplicate_key_groups[:10]:
+        error_msg += f"- '{group['value']}': lignes {format_row_ranges(group['ranges'][:5])}"
+        if len(group['ranges']) > 5:
+            error_msg += f" ... ({group['count']} lignes au total)"
+        error_msg += "\n"
+    if len(duplicate_key_groups) > 10:
+        error_msg += f"... (+{len(duplicate_key_groups) - 10} autres clés en double)\n"
+    
+    return error_msg
+
+def build_type_errors_message(type_groups: List[Dict]) -> str:
+    """
+    Human readable summary of type and length errors, grouped by column
+    """
+    groups_by_column = {}
+    for group in type_groups:
+        groups_by_column.setdefault(group['column'], []).append(group)
+    
+    error_msg = "Valeurs au mauvais format:\n"
+    for col, groups in groups_by_column.items():
+        error_msg += f"\n- Colonne '{col}':\n"
+        for group in groups[:5]:  # Show first 5 distinct values
+            error_msg += f"  {describe_error(group)}: lignes {format_row_ranges(group['ranges'][:5])}"
+            if len(group['ranges']) > 5:
+                error_msg += f" ... ({group['count']} lignes au total)"
+            error_msg += "\n"
+        if len(groups) > 5:
+            error_msg += f"  ... (+{len(groups) - 5} autres valeurs invalides)\n"
+    
+    return error_msg
+
+def format_suggestions(suggestions: List[str]) -> str:
+    """
+    Format suggested values as "'A', 'B' ou 'C'"
+    """
+    quoted = [f"'{suggestion}'" for suggestion in suggestions]
+    if len(quoted) == 1:
+        return quoted[0]
+    return ", ".join(quoted[:-1]) + " ou " + quoted[-1]
+
+def build_invalid_values_message(invalid_value_groups: List[Dict], lists: Dict[str, List[str]]) -> str:
+    """
+    Human readable summary of invalid list values, grouped by column
+    """
+    invalid_by_column = {}
+    for group in invalid_value_groups:
+        invalid_by_column.setdefault(group['column'], []).append(group)
+    
+    error_msg = "Valeurs invalides dans les listes:\n"
+    for col, groups in invalid_by_column.items():
+        error_msg += f"\n- Colonne '{col}':\n"
+        for group in groups[:5]:  # Show first 5 distinct values
+            error_msg += f"  '{group['value']}' (invalide"
+            if group.get('suggestions'):
+                error_msg += f", vouliez-vous dire {format_suggestions(group['suggestions'])} ?"
+            error_msg += f"): lignes {format_row_ranges(group['ranges'][:5])}"
+            if len(group['ranges']) > 5:
+                error_msg += f" ... ({group['count']} lignes au total)"
+            error_msg += "\n"
+        if len(groups) > 5:
+            error_msg += f"  ... (+{len(groups) - 5} autres valeurs invalides)\n"
+    
+    # Show allowed values for first error
+    first_invalid = invalid_value_groups[0]
+    allowed_values = lists.get(first_invalid['list_type'], [])
+    error_msg += f"\nValeurs autorisées pour '{first_invalid['list_type']}': "
+    error_msg += ", ".join([f"'{v}'" for v in allowed_values[:10]])
+    if len(allowed_values) > 10:
+        error_msg += f" ... (+{len(allowed_values) - 10} autres)"
+    
+    return error_msg
+
+async def fetch_list_values_from_legisway(
+    site_url: str,
+    login: str,
+    system_password: str,
+    list_types: List[str]
+) -> Dict:
+    """
+    Fetch allowed values for reference lists from Legisway
+    Identical concurrent fetches (same tenant, credentials and lists) share one API burst
+    """
+    list_types = sorted(set(list_types))
+    return await single_flight.run(
+        build_flight_key("fetch-lists", site_url, system_password, list_types),
+        lambda: request_list_values_from_legisway(site_url, login, system_password, list_types)
+    )
+
+async def request_list_values_from_legisway(
+    site_url: str,
+    login: str,
+    system_password: str,
+    list_types: List[str]
+) -> Dict:
+    """
+    Fetch allowed values for reference lists from Legisway using REST API
+    """
+    try:
+        # Get base URL from site_url
+        from urllib.parse import urlparse
+        parsed = urlparse(site_url)
+        base_url = f"{parsed.scheme}://{parsed.netloc}"
+        
+        async with httpx.AsyncClient(verify=False, timeout=60.0) as client:
+            # Step 1: Authenticate and get JWT token using system password
+            logger.info(f"Authentication système à l'API Legisway...")
+            auth_url = f"{base_url}/resource/api/v1/auth/system"
+            
+            # System authentication uses only system password (not user password)
+            auth_payload = {
+                "password": system_password,
+                "languageCode": "fr"
+            }
+            
+            logger.info(f"Auth URL: {auth_url}")
+            
+            try:
+                # Send as form-data (application/x-www-form-urlencoded)
+                auth_response = await client.post(
+                    auth_url,
+                    data=auth_payload,
                     headers={
                         "Accept": "application/json"
                     }
@@ -1649,112 +3940,1888 @@ async def fetch_list_values_from_legisway(
             }
                 
     except Exception as e:
-        logger.error(f"Fetch list values error: {str(e)}")
-        return {
+        logger.error(f"Fetch list values error: {str(e)}")
+        return {
+            "success": False,
+            "message": f"Erreur récupération listes: {str(e)}",
+            "lists": {}
+        }
+
+async def click_login_button(page, browser=None):
+    """
+    Helper function to click the login button with multiple selector attempts
+    Returns True if successful, False otherwise
+    """
+    selectors_to_try = [
+        'button:has-text("Connexion")',
+        'button.button-large:has-text("Connexion")',
+        'button[data-kind="button"]:has-text("Connexion")',
+        'button.button-large-with-label',
+        'button[type="button"]:has-text("Connexion")'
+    ]
+    
+    for selector in selectors_to_try:
+        try:
+            await page.wait_for_selector(selector, timeout=3000)
+            logger.info(f"Bouton connexion trouvé avec: {selector}")
+            await asyncio.sleep(0.5)
+            await page.click(selector, timeout=5000)
+            return True
+        except Exception as e:
+            continue
+    
+    logger.error("Aucun bouton de connexion trouvé")
+    return False
+
+async def is_import_finished(page) -> bool:
+    """
+    Check once whether the import shown by the page is finished (result file link or completion message)
+    """
+    result_file = await page.query_selector('a[href*="result_file"]')
+    completion_message = await page.query_selector('div:has-text("Import terminé"), div:has-text("Échec de l\'import")')
+    return bool(result_file or completion_message)
+
+class ImportPageWatch:
+    """
+    autoImportNotify binding of a page, exposed once per page (Playwright refuses a second registration)
+    Each import run on the page gets its own queue of notifications
+    """
+    def __init__(self, page):
+        self.page = page
+        self.events = None
+        self.exposed = False
+    
+    def notify(self, source, kind: str, payload):
+        if self.events is not None:
+            self.events.put_nowait((kind, payload))
+    
+    async def start(self) -> asyncio.Queue:
+        if not self.exposed:
+            await self.page.expose_binding("autoImportNotify", self.notify)
+            self.exposed = True
+        self.events = asyncio.Queue()
+        return self.events
+
+async def poll_import_completion(page, on_progress_text: Callable, max_wait_time: int = IMPORT_MAX_WAIT_SECONDS) -> bool:
+    """
+    Wait for the end of the import by checking the page every IMPORT_POLL_SECONDS
+    Used when the watcher is disabled or cannot run in the page
+    Returns False on timeout
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait_time
+    while loop.time() < deadline:
+        if await is_import_finished(page):
+            return True
+        progress_label = await page.query_selector('mat-progress-bar + label')
+        if progress_label:
+            await on_progress_text(await progress_label.text_content())
+        await asyncio.sleep(IMPORT_POLL_SECONDS)
+    return False
+
+async def wait_for_import_completion(
+    page,
+    on_progress_text: Callable,
+    max_wait_time: int = IMPORT_MAX_WAIT_SECONDS,
+    watch: Optional[ImportPageWatch] = None
+) -> bool:
+    """
+    Wait for the end of the import shown by the page
+    A MutationObserver in the page pushes progress label changes and completion to Python as
+    they happen; the direct check every IMPORT_WATCHDOG_SECONDS only covers a lost observer
+    Without IMPORT_WATCHER, or when the watcher does not start, the page is polled instead
+    A page importing several files passes its watch, so the binding is only exposed once
+    Returns False on timeout
+    """
+    if not IMPORT_WATCHER:
+        return await poll_import_completion(page, on_progress_text, max_wait_time)
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait_time
+    try:
+        watch_events = await (watch or ImportPageWatch(page)).start()
+        await page.evaluate(IMPORT_WATCHER_SCRIPT)
+        # The watcher notifies as soon as it runs
+        first_event = await asyncio.wait_for(watch_events.get(), timeout=IMPORT_WATCHER_START_SECONDS)
+    except Exception as e:
+        logger.warning(f"Surveillance de l'import indisponible ({str(e) or type(e).__name__}), vérification périodique de la page")
+        return await poll_import_completion(page, on_progress_text, max(0, deadline - loop.time()))
+    
+    while True:
+        if first_event:
+            kind, payload = first_event
+            first_event = None
+        else:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                kind, payload = await asyncio.wait_for(watch_events.get(), timeout=min(IMPORT_WATCHDOG_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                # Watchdog: the observer may be gone if the page was re-rendered
+                if await is_import_finished(page):
+                    return True
+                await page.evaluate(IMPORT_WATCHER_SCRIPT)
+                continue
+        
+        if kind == "progress":
+            await on_progress_text(payload)
+        elif kind == "done":
+            logger.info(f"Fin de l'import détectée ({payload})")
+            return True
+
+async def open_import_page(page, site_url: str, login: str, password: str, report_progress: Optional[Callable] = None) -> Optional[str]:
+    """
+    Log in to Legisway and open the "Import de données" page
+    Returns None on success, otherwise the error message
+    """
+    # Step 1: Navigate and login
+    logger.info("Connexion à Legisway pour import...")
+    if report_progress:
+        await report_progress("login")
+    await page.goto(site_url, timeout=30000, wait_until="load")
+    await asyncio.sleep(2)
+    
+    # Check if already logged in
+    already_logged_in = await page.query_selector('.icon-user')
+    
+    if not already_logged_in:
+        logger.info("Connexion requise...")
+        await page.fill('input[name="j_username"]', login, timeout=5000)
+        await asyncio.sleep(0.5)
+        await page.fill('input[name="j_password"]', password, timeout=5000)
+        await asyncio.sleep(1)
+        
+        if not await click_login_button(page):
+            return "Bouton de connexion non trouvé"
+        
+        await page.wait_for_load_state("load", timeout=30000)
+        await asyncio.sleep(3)
+    else:
+        logger.info("Déjà connecté")
+    
+    return await navigate_to_import_page(page, report_progress)
+
+async def navigate_to_import_page(page, report_progress: Optional[Callable] = None) -> Optional[str]:
+    """
+    Open the "Import de données" page from the administration menu of a logged-in page
+    Returns None on success, otherwise the error message
+    """
+    # Step 2: Navigate to Import section
+    logger.info("Navigation vers Import de données...")
+    if report_progress:
+        await report_progress("navigation")
+    if not await click_user_icon_and_admin(page):
+        return "Impossible d'accéder au menu Administration"
+    await page.wait_for_load_state("load", timeout=30000)
+    await asyncio.sleep(3)
+    
+    if not await click_import_de_donnees(page):
+        return "Impossible d'accéder à Import de données"
+    await page.wait_for_load_state("load", timeout=30000)
+    await asyncio.sleep(3)
+    
+    return None
+
+async def reopen_import_page(page, report_progress: Optional[Callable] = None) -> Optional[str]:
+    """
+    Blank "Import de données" form in an authenticated session, for the next file of a batch
+    Returns None on success, otherwise the error message
+    """
+    if report_progress:
+        await report_progress("navigation")
+    await page.reload(wait_until="load", timeout=30000)
+    await asyncio.sleep(3)
+    try:
+        await page.wait_for_selector('kendo-combobox input.k-input-inner', timeout=10000)
+        return None
+    except Exception:
+        logger.info("Formulaire d'import absent après rechargement, navigation par le menu")
+    return await navigate_to_import_page(page)
+
+async def import_batch_in_session(
+    site_url: str,
+    login: str,
+    password: str,
+    items: List[Dict],
+    lanes: int = 1,
+    on_item_progress: Optional[Callable] = None,
+    on_item_started: Optional[Callable] = None,
+    on_item_result: Optional[Callable] = None,
+    result_file_prefix: Optional[str] = None
+) -> List[Dict]:
+    """
+    Import several files ({"selected_format", "file_path", "total_rows"}) with a single Legisway login
+    The files are imported one after the other on each lane (a page of the authenticated session);
+    the result file of an import is downloaded while the lane imports its next file
+    Callbacks: on_item_progress(index, stage, progress, detail), on_item_started(index),
+    on_item_result(index, result)
+    The result file of each file is saved under result_file_prefix and the file number
+    """
+    result_file_prefix = result_file_prefix or uuid.uuid4().hex[:8]
+    results = [None] * len(items)
+    pending = asyncio.Queue()
+    for index in range(len(items)):
+        pending.put_nowait(index)
+    downloads = []
+    
+    async def set_result(index: int, result: Dict):
+        results[index] = result
+        if on_item_result:
+            await on_item_result(index, result)
+    
+    async def collect_item_result(index: int, outcome: Dict):
+        await set_result(index, await collect_import_result(
+            outcome, items[index]['total_rows'], result_file_prefix=f"{result_file_prefix}_fichier{index + 1}"
+        ))
+    
+    async def run_lane(page, page_state: str):
+        # page_state: "blank" (empty import form), "used" (form of the previous file) or "new"
+        # The completion binding survives reloads and navigations, it is exposed once per lane
+        watch = ImportPageWatch(page)
+        while not pending.empty():
+            index = pending.get_nowait()
+            item = items[index]
+            
+            async def item_progress(stage: str, progress: Optional[float] = None, detail: Optional[str] = None):
+                if on_item_progress:
+                    await on_item_progress(index, stage, progress, detail)
+            
+            async def item_checkpoint(name: str, data: Optional[Dict] = None):
+                if name == "started" and on_item_started:
+                    await on_item_started(index)
+            
+            try:
+                async with get_tenant_import_slot(site_url):
+                    error_message = None
+                    if page_state == "used":
+                        error_message = await reopen_import_page(page, item_progress)
+                    elif page_state == "new":
+                        error_message = await open_import_page(page, site_url, login, password, item_progress)
+                    if error_message:
+                        page_state = "new"
+                        await set_result(index, {"success": False, "message": error_message})
+                        continue
+                    page_state = "used"
+                    outcome = await run_import_on_page(
+                        page, item['selected_format'], item['file_path'], item['total_rows'],
+                        item_progress, on_checkpoint=item_checkpoint, watch=watch
+                    )
+            except Exception as e:
+                logger.error(f"Import groupé: erreur sur {Path(item['file_path']).name}: {str(e)}")
+                page_state = "new"
+                await set_result(index, {"success": False, "message": f"Erreur import Legisway: {str(e)}"})
+                continue
+            
+            downloads.append(asyncio.create_task(collect_item_result(index, outcome)))
+    
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
+            try:
+                context = await browser.new_context(
+                    ignore_https_errors=True,
+                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+                )
+                # Log in once; the other lanes open their page in the same session
+                first_page = await context.new_page()
+                error_message = await open_import_page(first_page, site_url, login, password)
+                if error_message:
+                    for index in range(len(items)):
+                        await set_result(index, {"success": False, "message": error_message})
+                    return results
+                
+                lane_pages = [first_page] + [await context.new_page() for _ in range(min(lanes, len(items)) - 1)]
+                await asyncio.gather(*(run_lane(page, "blank" if page is first_page else "new") for page in lane_pages))
+            finally:
+                await browser.close()
+    except Exception as e:
+        logger.error(f"Import groupé: erreur de session Legisway: {str(e)}")
+        session_error = f"Erreur import Legisway: {str(e)}"
+    else:
+        session_error = "Import non lancé"
+    
+    # Imports already finished keep their result even when the session failed afterwards
+    await asyncio.gather(*downloads)
+    for index, result in enumerate(results):
+        if result is None:
+            await set_result(index, {"success": False, "message": session_error})
+    return results
+
+async def read_result_link(page, result_file_link) -> Dict:
+    """
+    Name and URL of the result file of an import, with the session cookies needed to download it,
+    so the download does not need the browser
+    """
+    result_file_name = (await result_file_link.text_content()).strip()
+    result_file_url = urljoin(page.url, await result_file_link.get_attribute("href"))
+    logger.info(f"Fichier de résultat: {result_file_name}")
+    
+    cookies = await page.context.cookies([result_file_url])
+    return {
+        "file_name": result_file_name,
+        "url": result_file_url,
+        "cookie_header": "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies),
+        "user_agent": await page.evaluate("navigator.userAgent")
+    }
+
+async def download_result_over_http(result_link: Dict, file_prefix: Optional[str] = None) -> Dict:
+    """
+    Stream the result file of an import into /tmp/downloads with the shared HTTP client
+    Legisway may give concurrent imports the same result file name: the local name starts with
+    file_prefix (job and part of the import), or a random one
+    """
+    downloads_dir = Path("/tmp/downloads")
+    downloads_dir.mkdir(exist_ok=True)
+    result_file_name = f"{file_prefix or uuid.uuid4().hex[:8]}_{result_link['file_name']}"
+    result_file_path = downloads_dir / result_file_name
+    partial_path = downloads_dir / f".{result_file_name}.part"
+    
+    headers = {"Cookie": result_link['cookie_header'], "User-Agent": result_link['user_agent']}
+    try:
+        async with get_http_client().stream("GET", result_link['url'], headers=headers) as response:
+            response.raise_for_status()
+            if response.headers.get("content-type", "").startswith("text/html"):
+                # Legisway answers with its login page when the session is not valid
+                raise RuntimeError("page HTML reçue au lieu du fichier (session expirée ?)")
+            with open(partial_path, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        os.replace(partial_path, result_file_path)
+    finally:
+        partial_path.unlink(missing_ok=True)
+    
+    logger.info(f"Fichier de résultat sauvegardé: {result_file_path}")
+    return {
+        "result_file_path": str(result_file_path),
+        "result_file_name": result_file_name
+    }
+
+async def click_import_de_donnees(page):
+    """
+    Helper function to click "Import de données" menu item
+    Returns True if successful, False otherwise
+    """
+    selectors = [
+        'button[data-kind="vertical-menu-item"]:has-text("Import de données")',
+        'button:has-text("Import de données")',
+        'a:has-text("Import de données")',
+        '[data-kind="vertical-menu-item"]:has-text("Import de données")'
+    ]
+    
+    for selector in selectors:
+        try:
+            await page.wait_for_selector(selector, timeout=3000)
+            await page.click(selector, timeout=5000)
+            logger.info(f"Import de données cliqué avec: {selector}")
+            return True
+        except:
+            continue
+    
+    logger.error("Bouton 'Import de données' non trouvé")
+    return False
+
+async def click_user_icon_and_admin(page):
+    """
+    Helper function to click user icon and then Administration menu
+    Returns True if successful, False otherwise
+    """
+    # Click user icon
+    user_icon_selectors = [
+        '.icon-user',
+        '.icon-user-administration-dashboard',
+        'span.icon-user',
+        '[class*="icon-user"]'
+    ]
+    
+    user_icon_clicked = False
+    for selector in user_icon_selectors:
+        try:
+            await page.wait_for_selector(selector, timeout=3000)
+            await page.click(selector, timeout=5000)
+            logger.info(f"Icône utilisateur cliquée avec: {selector}")
+            user_icon_clicked = True
+            await asyncio.sleep(1)
+            break
+        except:
+            continue
+    
+    if not user_icon_clicked:
+        logger.error("Icône utilisateur non trouvée")
+        return False
+    
+    # Click Administration menu item
+    admin_selectors = [
+        'span[data-dropdown-menu-item]:has-text("Administration")',
+        'span.cg-dropdown-list-item:has-text("Administration")',
+        'button[mat-menu-item]:has-text("Administration")',
+        'button.user-menu-item:has-text("Administration")',
+        '[data-e2e="cg-dropdown-list-item"]:has-text("Administration")'
+    ]
+    
+    for selector in admin_selectors:
+        try:
+            await page.wait_for_selector(selector, timeout=3000)
+            await page.click(selector, timeout=5000)
+            logger.info(f"Administration cliqué avec: {selector}")
+            return True
+        except:
+            continue
+    
+    logger.error("Bouton Administration non trouvé")
+    return False
+
+async def create_import_job(
+    file_name: str,
+    file_path: Optional[str],
+    params: Dict,
+    items: Optional[List[Dict]] = None,
+    file_id: Optional[str] = None,
+    schedule_id: Optional[str] = None
+) -> Dict:
+    """
+    Persist an import job and queue it for the worker pool
+    A batch job has items ({"file_name", "file_path", "params"}, one per file) instead of a file
+    The files are kept in the file store, so any server can run the job (file_id: already stored)
+    """
+    for item in items or []:
+        item.update({"file_id": await store_file(item['file_path'], "upload"), "status": "queued", "result": None})
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "kind": "batch" if items else "single",
+        "status": "queued",
+        "stage": "queued",
+        "progress": None,
+        "progress_text": None,
+        "file_name": file_name,
+        "file_path": file_path,
+        "file_id": file_id or (await store_file(file_path, "upload") if file_path else None),
+        "items": items,
+        "tenant": get_tenant_key(params['site_url']),
+        "schedule_id": schedule_id,
+        "params": params,
+        "timings": {},
+        "result": None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "started_at": None,
+        "finished_at": None
+    }
+    await db.import_jobs.insert_one(job)
+    await import_queue.put(job['job_id'])
+    logger.info(f"Job d'import {job['job_id']} en file d'attente ({file_name})")
+    return job
+
+async def import_worker(worker_id: int):
+    """
+    Run the queued import jobs one at a time
+    """
+    while True:
+        job_id = await import_queue.get()
+        try:
+            # Atomic claim: a job is run by a single worker
+            job = await db.import_jobs.find_one_and_update(
+                {"job_id": job_id, "status": "queued"},
+                {"$set": {
+                    "status": "running",
+                    "started_at": datetime.now(timezone.utc).isoformat(),
+                    "worker_id": WORKER_ID,
+                    "lease_expires_at": time.time() + IMPORT_JOB_LEASE_SECONDS
+                }},
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                continue
+            job.pop('_id', None)
+            
+            logger.info(f"Worker {worker_id}: démarrage du job {job_id}")
+            running_job_ids.add(job_id)
+            await run_import_job(job)
+        except Exception as e:
+            logger.error(f"Worker {worker_id}: erreur job {job_id}: {str(e)}")
+        finally:
+            running_job_ids.discard(job_id)
+            import_queue.task_done()
+
+class ProgressBroker:
+    """
+    In-app publish/subscribe of job events, each subscriber reads its own bounded queue
+    """
+    
+    def __init__(self, queue_size: int = 100):
+        self.subscribers = {}  # channel -> set of queues
+        self.queue_size = queue_size
+    
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(channel, set()).add(queue)
+        return queue
+    
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(channel)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[channel]
+    
+    def publish(self, channel: str, event: Dict):
+        """
+        Send an event to the subscribers of a channel, must be called from the event loop
+        """
+        for queue in self.subscribers.get(channel, ()):
+            if queue.full():
+                # Slow subscriber: drop its oldest event rather than blocking the import
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+def format_sse_event(event_name: str, data: Dict) -> str:
+    """
+    Format a Server-Sent Event
+    """
+    return f"event: {event_name}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+progress_broker = ProgressBroker()
+
+class ImportJobProgress:
+    """
+    Record the stage transitions and the progress of an import job in its document,
+    with the time spent in each stage, and publish them to the job event subscribers
+    """
+    
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.stage = None
+        self.stage_started = None
+        self.timings = {}
+    
+    @classmethod
+    def from_job(cls, job: Dict) -> "ImportJobProgress":
+        """
+        Continue recording a job started by another worker (or before a restart)
+        """
+        progress = cls(job['job_id'])
+        progress.stage = job.get('stage')
+        progress.stage_started = job.get('stage_started_at') or time.time()
+        progress.timings = dict(job.get('timings') or {})
+        return progress
+    
+    async def __call__(self, stage: str, progress: Optional[float] = None, detail: Optional[str] = None):
+        update = {"progress": progress, "progress_text": detail}
+        if stage != self.stage:
+            self._close_stage()
+            self.stage = stage
+            # Wall clock: the stage may end in another session (detached import)
+            self.stage_started = time.time()
+            update['stage'] = stage
+            update['stage_started_at'] = self.stage_started
+            update['timings'] = dict(self.timings)
+        await db.import_jobs.update_one({"job_id": self.job_id}, {"$set": update})
+        progress_broker.publish(self.job_id, {
+            "event": "progress",
+            "job_id": self.job_id,
+            "stage": stage,
+            "progress": progress,
+            "detail": detail,
+            "timings": dict(self.timings)
+        })
+    
+    def rows_validated(self, rows_read: int):
+        """
+        Publish the validation progress (not stored, the job document keeps the stage)
+        """
+        progress_broker.publish(self.job_id, {
+            "event": "progress",
+            "job_id": self.job_id,
+            "stage": "validation",
+            "progress": None,
+            "detail": f"{rows_read} lignes validées",
+            "rows_validated": rows_read,
+            "timings": dict(self.timings)
+        })
+    
+    def _close_stage(self):
+        if self.stage is not None:
+            self.timings[self.stage] = round(time.time() - self.stage_started, 2)
+    
+    async def checkpoint(self, name: str, data: Optional[Dict] = None):
+        """
+        Record a point of the import workflow the job can be resumed from after a restart
+        """
+        checkpoint = {"at": datetime.now(timezone.utc).isoformat(), **(data or {})}
+        await db.import_jobs.update_one({"job_id": self.job_id}, {"$set": {f"checkpoints.{name}": checkpoint}})
+        progress_broker.publish(self.job_id, {"event": "checkpoint", "job_id": self.job_id, "checkpoint": name})
+    
+    async def detach(self, import_state: Dict, next_check_in: float = IMPORT_REATTACH_INTERVAL_SECONDS):
+        """
+        The import runs on Legisway without a browser: wait for its result in the background
+        """
+        await self("waiting_result")
+        await db.import_jobs.update_one(
+            {"job_id": self.job_id},
+            {"$set": {
+                "status": "detached",
+                "import_state": import_state,
+                "next_check_at": time.time() + next_check_in
+            }}
+        )
+    
+    async def finish(self, status: str, result: Dict):
+        self._close_stage()
+        result = await store_result_file(result)
+        await settle_import_fingerprints(self.job_id, status == "succeeded", result)
+        # A finished job never logs in again, its credentials are not kept
+        await db.import_jobs.update_one(
+            {"job_id": self.job_id},
+            {
+                "$set": {
+                    "status": status,
+                    "result": result,
+                    "timings": self.timings,
+                    "finished_at": datetime.now(timezone.utc).isoformat()
+                },
+                "$unset": IMPORT_CREDENTIAL_FIELDS
+            }
+        )
+        progress_broker.publish(self.job_id, {
+            "event": "done",
+            "job_id": self.job_id,
+            "status": status,
+            "result": result,
+            "timings": dict(self.timings)
+        })
+
+async def run_import_job(job: Dict):
+    """
+    Validate then import the file of a job
+    """
+    if job.get('kind') == "batch":
+        await run_batch_job(job)
+        return
+    params = job['params']
+    progress = ImportJobProgress(job['job_id'])
+    
+    try:
+        job['file_path'] = await ensure_local_file(job['file_path'], job.get('file_id'))
+        await progress("validation")
+        report, current_token = await validate_before_import(job['file_path'], params, on_rows=progress.rows_validated)
+        
+        if not report['success']:
+            result = build_validation_response(report, current_token)
+        else:
+            await progress("fingerprinting")
+            delta = await prepare_differential_import(job, params)
+            import_file_path = delta['file_path'] if delta else job['file_path']
+            import_rows = len(delta['row_numbers']) if delta else report['total_rows']
+            
+            if import_rows == 0:
+                result = {
+                    "success": True,
+                    "message": "Aucune ligne nouvelle ou modifiée depuis le dernier import: rien à importer",
+                    "rows_imported": 0
+                }
+            elif (params.get('import_chunks') or 1) > 1 and import_rows > 1:
+                # Parts are imported concurrently and never detached
+                result = await import_in_chunks(
+                    params,
+                    import_file_path,
+                    import_rows,
+                    params['import_chunks'],
+                    on_progress=progress,
+                    on_checkpoint=progress.checkpoint,
+                    source_row_numbers=delta['row_numbers'] if delta else None,
+                    result_file_prefix=job['job_id'][:8]
+                )
+            else:
+                on_checkpoint = progress.checkpoint
+                if delta:
+                    async def on_checkpoint(name: str, data: Optional[Dict] = None):
+                        # The raw result rows are those of the reduced workbook: the result is only
+                        # checkpointed once mapped back to the original rows, and an import resumed
+                        # from the history keeps no fingerprints
+                        if name == "result_downloaded":
+                            return
+                        if name == "started":
+                            data = {**data, "import_state": {**data['import_state'], "delta": True}}
+                        await progress.checkpoint(name, data)
+                
+                # Import data to Legisway
+                async with get_tenant_import_slot(params['site_url']):
+                    result = await import_to_legisway(
+                        site_url=params['site_url'],
+                        login=params['login'],
+                        password=params['password'],
+                        selected_format=params['selected_format'],
+                        excel_file_path=import_file_path,
+                        total_rows=import_rows,
+                        table_config=params['table_config'],
+                        on_progress=progress,
+                        # A delta import stays attached to map its result rows back to the original file
+                        detach=IMPORT_DETACH and not delta,
+                        on_checkpoint=on_checkpoint,
+                        result_file_prefix=job['job_id'][:8]
+                    )
+                if result.get('detached'):
+                    await progress.detach(result['import_state'])
+                    return
+                if delta and result.get('success') and result.get('result_file_path'):
+                    # Result rows carry the row numbers of the original file
+                    result_file_name = f"{Path(job['file_path']).stem}_resultat.xlsx"
+                    result_file_path = str(Path(result['result_file_path']).parent / result_file_name)
+                    await asyncio.to_thread(
+                        merge_chunk_results,
+                        [{"result_file_path": result['result_file_path'], "row_numbers": delta['row_numbers']}],
+                        result_file_path
+                    )
+                    result.update({"result_file_path": result_file_path, "result_file_name": result_file_name})
+                    await progress.checkpoint("result_downloaded", {
+                        "result_file_path": result_file_path,
+                        "result_file_name": result_file_name,
+                        "rows_imported": import_rows
+                    })
+            
+            if delta:
+                result['delta'] = {
+                    "rows_total": delta['total_rows'],
+                    "rows_sent": import_rows,
+                    "rows_unchanged": delta['total_rows'] - import_rows
+                }
+    except Exception as e:
+        logger.error(f"Import error: {str(e)}")
+        result = {
             "success": False,
-            "message": f"Erreur récupération listes: {str(e)}",
-            "lists": {}
+            "message": f"Erreur lors de l'import: {str(e)}"
         }
+    
+    await progress.finish("succeeded" if result.get('success') else "failed", result)
 
-async def click_login_button(page, browser=None):
+def split_workbook_in_chunks(file_path: str, key_indexes: List[int], chunk_count: int, output_dir: Path) -> List[Dict]:
     """
-    Helper function to click the login button with multiple selector attempts
-    Returns True if successful, False otherwise
+    Split the data rows of a workbook into chunk workbooks of about the same size, each with the header
+    Rows sharing a key stay in the chunk of the first row with that key
+    Returns for each chunk its file path and the original row number of each of its rows
     """
-    selectors_to_try = [
-        'button:has-text("Connexion")',
-        'button.button-large:has-text("Connexion")',
-        'button[data-kind="button"]:has-text("Connexion")',
-        'button.button-large-with-label',
-        'button[type="button"]:has-text("Connexion")'
+    source = load_workbook(filename=file_path, read_only=True)
+    try:
+        sheet = source.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        
+        data_rows = []
+        for row_number, row in enumerate(rows, start=2):
+            if any(cell is not None and str(cell) != "" for cell in row):
+                data_rows.append((row_number, row))
+    finally:
+        source.close()
+    
+    chunk_count = max(1, min(chunk_count, len(data_rows)))
+    chunk_size = -(-len(data_rows) // chunk_count)
+    chunks = [[] for _ in range(chunk_count)]
+    key_chunks = {}
+    current_chunk = 0
+    
+    for row_number, row in data_rows:
+        key = tuple(str(row[idx]).strip() if idx < len(row) and row[idx] is not None else "" for idx in key_indexes)
+        target_chunk = key_chunks.get(key) if key_indexes and any(key) else None
+        if target_chunk is None:
+            while len(chunks[current_chunk]) >= chunk_size and current_chunk < chunk_count - 1:
+                current_chunk += 1
+            target_chunk = current_chunk
+            if key_indexes and any(key):
+                key_chunks[key] = target_chunk
+        chunks[target_chunk].append((row_number, row))
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(file_path).stem
+    chunk_files = []
+    for chunk_number, chunk_rows in enumerate(chunks, start=1):
+        if not chunk_rows:
+            continue
+        chunk_path = output_dir / f"{stem}_partie{chunk_number}.xlsx"
+        workbook = Workbook(write_only=True)
+        chunk_sheet = workbook.create_sheet()
+        chunk_sheet.append(list(header))
+        for _, row in chunk_rows:
+            chunk_sheet.append(list(row))
+        workbook.save(str(chunk_path))
+        chunk_files.append({
+            "file_path": str(chunk_path),
+            "row_numbers": [row_number for row_number, _ in chunk_rows]
+        })
+    
+    return chunk_files
+
+def merge_chunk_results(chunk_results: List[Dict], target_path: str):
+    """
+    Merge the result workbooks of the chunks into one workbook, in the order of the original
+    file, with a first column giving the original row number of each result row
+    """
+    def iter_chunk_rows(chunk: Dict):
+        workbook = load_workbook(filename=chunk['result_file_path'], read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            next(rows, None)
+            row_numbers = chunk['row_numbers']
+            for position, row in enumerate(rows):
+                if not any(cell is not None for cell in row):
+                    continue
+                # Rows beyond the chunk rows (summary lines) are kept at the end of the chunk
+                original_row = row_numbers[position] if position < len(row_numbers) else row_numbers[-1]
+                yield original_row, position, row
+        finally:
+            workbook.close()
+    
+    header = None
+    for chunk in chunk_results:
+        workbook = load_workbook(filename=chunk['result_file_path'], read_only=True)
+        try:
+            header = next(workbook.active.iter_rows(values_only=True), None)
+        finally:
+            workbook.close()
+        if header:
+            break
+    
+    target = Workbook(write_only=True)
+    target_sheet = target.create_sheet(title="Résultat")
+    target_sheet.append([RESULT_ORIGIN_HEADER] + list(header or ()))
+    for original_row, _, row in heapq.merge(*(iter_chunk_rows(chunk) for chunk in chunk_results), key=lambda item: item[:2]):
+        target_sheet.append([original_row] + list(row))
+    target.save(target_path)
+
+async def resolve_key_indexes(params: Dict, excel_headers: List[str], key_fields: List[str]) -> List[int]:
+    """
+    Indexes of the Excel columns of the key fields (fields without a column are left out)
+    """
+    mapping = await resolve_column_mapping(
+        excel_headers,
+        key_fields,
+        get_workflow_key(params['site_url'], params['selected_format']),
+        params['selected_format'].get('name', '')
+    )
+    return [mapping['columns'][field] for field in key_fields if field in mapping['columns']]
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Shared HTTP client; it never stores cookies, each request sends the cookies of its own session
+    """
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            verify=False,
+            follow_redirects=True,
+            timeout=httpx.Timeout(60.0, read=300.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        )
+    return http_client
+
+def find_result_column(headers: List[str], words: tuple) -> Optional[int]:
+    """
+    Index of the first result column whose header contains one of the words (normalized)
+    """
+    for idx, header in enumerate(headers):
+        header_norm = normalize_text(header)
+        if any(word in header_norm for word in words):
+            return idx
+    return None
+
+def classify_result_status(status: str, message: str) -> str:
+    """
+    Outcome of a result row: "error", "warning" or "success"
+    Without a status, a row with a message is counted as an error
+    """
+    status_words = re.findall(r"\w+", normalize_text(status))
+    if not status_words:
+        return "error" if message else "success"
+    if any(word.startswith(RESULT_ERROR_WORDS) for word in status_words):
+        return "error"
+    if any(word.startswith(RESULT_WARNING_WORDS) for word in status_words):
+        return "warning"
+    return "success"
+
+def iter_result_rows(rows, headers: List[str]):
+    """
+    Classify the data rows of a Legisway result workbook: (source row, status, message, outcome)
+    Source rows come from the "Ligne d'origine" column (chunked or delta import), else the row number
+    """
+    origin_col = headers.index(RESULT_ORIGIN_HEADER) if RESULT_ORIGIN_HEADER in headers else None
+    status_col = find_result_column(headers, RESULT_STATUS_HEADERS)
+    message_col = find_result_column(headers, RESULT_MESSAGE_HEADERS)
+    
+    for row_number, row in enumerate(rows, start=2):
+        if not any(cell is not None and str(cell).strip() for cell in row):
+            continue
+        status = str(row[status_col]).strip() if status_col is not None and status_col < len(row) and row[status_col] is not None else ""
+        message = str(row[message_col]).strip() if message_col is not None and message_col < len(row) and row[message_col] is not None else ""
+        source_row = row[origin_col] if origin_col is not None and origin_col < len(row) else row_number
+        yield source_row, status, message, classify_result_status(status, message)
+
+def summarize_result_workbook(file_path: str) -> Dict:
+    """
+    Read a Legisway result workbook once (streaming) and summarize it: rows per outcome and
+    per status, and errors grouped by message with the source rows they affect
+    """
+    workbook = load_workbook(filename=file_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(cell) if cell is not None else "" for cell in next(rows, None) or ()]
+        origin_col = headers.index(RESULT_ORIGIN_HEADER) if RESULT_ORIGIN_HEADER in headers else None
+        status_col = find_result_column(headers, RESULT_STATUS_HEADERS)
+        message_col = find_result_column(headers, RESULT_MESSAGE_HEADERS)
+        
+        outcomes = Counter()
+        statuses = Counter()
+        groups = {}
+        total_rows = 0
+        for source_row, status, message, outcome in iter_result_rows(rows, headers):
+            total_rows += 1
+            outcomes[outcome] += 1
+            statuses[status or "(vide)"] += 1
+            
+            if outcome == "success":
+                continue
+            group = groups.get((outcome, message))
+            if group is None:
+                group = groups[(outcome, message)] = {"outcome": outcome, "message": message or status, "count": 0, "rows": []}
+            group['count'] += 1
+            if len(group['rows']) < RESULT_SUMMARY_MAX_ROWS:
+                group['rows'].append(source_row)
+    finally:
+        workbook.close()
+    
+    error_groups = sorted(groups.values(), key=lambda group: (-group['count'], group['message']))
+    return {
+        "total_rows": total_rows,
+        "outcomes": {outcome: outcomes.get(outcome, 0) for outcome in ("success", "warning", "error")},
+        # List rather than dict: statuses are free text, not valid MongoDB keys
+        "status_counts": [{"status": status, "count": count} for status, count in statuses.most_common()],
+        "error_groups": error_groups[:RESULT_SUMMARY_MAX_GROUPS],
+        "error_groups_total": len(error_groups),
+        "columns": {
+            "status": headers[status_col] if status_col is not None else None,
+            "message": headers[message_col] if message_col is not None else None,
+            "source_row": RESULT_ORIGIN_HEADER if origin_col is not None else None
+        }
+    }
+
+def read_accepted_source_rows(file_path: str) -> Optional[set]:
+    """
+    Source rows Legisway accepted (success or warning) according to a result workbook
+    None when a row is in error: the import runs with rollback, so nothing was kept
+    """
+    workbook = load_workbook(filename=file_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(cell) if cell is not None else "" for cell in next(rows, None) or ()]
+        accepted_rows = set()
+        for source_row, _, _, outcome in iter_result_rows(rows, headers):
+            if outcome == "error":
+                return None
+            accepted_rows.add(int(source_row))
+        return accepted_rows
+    finally:
+        workbook.close()
+
+async def store_result_file(result: Dict) -> Dict:
+    """
+    Keep the result file of an import result in the file store and add its id and outcomes
+    """
+    if not result.get('result_file_path') or not Path(result['result_file_path']).exists():
+        return result
+    try:
+        result = {**result, "result_file_id": await store_file(result['result_file_path'], "result")}
+        summary = await get_result_summary(result['result_file_id'], result['result_file_path'])
+        result['result_outcomes'] = summary['outcomes']
+    except Exception as e:
+        logger.error(f"Stockage ou analyse du fichier de résultat échoué: {str(e)}")
+    return result
+
+async def get_result_summary(result_file_id: str, result_file_path: str) -> Dict:
+    """
+    Summary of a result file, parsed once per content and cached in MongoDB
+    """
+    cached = await db.result_summaries.find_one({"result_file_id": result_file_id}, {"_id": 0})
+    if cached:
+        return cached
+    
+    async def build_summary():
+        local_path = await ensure_local_file(result_file_path, result_file_id)
+        summary = {
+            "result_file_id": result_file_id,
+            **await asyncio.to_thread(summarize_result_workbook, local_path),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        await db.result_summaries.replace_one({"result_file_id": result_file_id}, summary, upsert=True)
+        summary.pop('_id', None)
+        logger.info(f"Résumé du fichier de résultat: {summary['total_rows']} lignes, {summary['outcomes']}")
+        return summary
+    
+    return await single_flight.run(("result-summary", "", result_file_id), build_summary)
+
+def get_tenant_import_slot(site_url: str) -> asyncio.Semaphore:
+    """
+    Semaphore limiting the imports running at the same time on a Legisway tenant
+    """
+    tenant_key = get_tenant_key(site_url)
+    if tenant_key not in TENANT_IMPORT_SLOTS:
+        TENANT_IMPORT_SLOTS[tenant_key] = asyncio.Semaphore(IMPORT_TENANT_CONCURRENCY)
+    return TENANT_IMPORT_SLOTS[tenant_key]
+
+async def import_in_chunks(
+    params: Dict,
+    excel_file_path: str,
+    total_rows: int,
+    chunk_count: int,
+    on_progress: Optional[Callable] = None,
+    on_checkpoint: Optional[Callable] = None,
+    source_row_numbers: Optional[List[int]] = None,
+    result_file_prefix: Optional[str] = None
+) -> Dict:
+    """
+    Import a large workbook as chunks imported concurrently (separate browsers, at most
+    IMPORT_TENANT_CONCURRENCY at a time on the tenant), then merge the chunk result files
+    source_row_numbers maps the rows of a reduced workbook (delta import) to the original file
+    The result file of each chunk is saved under result_file_prefix and the chunk number
+    """
+    result_file_prefix = result_file_prefix or uuid.uuid4().hex[:8]
+    async def report_progress(stage: str, progress: Optional[float] = None, detail: Optional[str] = None):
+        if on_progress:
+            await on_progress(stage, progress, detail)
+    
+    await report_progress("splitting")
+    key_indexes = await resolve_key_indexes(
+        params,
+        next(iter_excel_rows(excel_file_path))[1],
+        extract_key_fields(params['table_config'])
+    )
+    
+    chunk_files = await asyncio.to_thread(
+        split_workbook_in_chunks,
+        excel_file_path,
+        key_indexes,
+        chunk_count,
+        Path("/tmp/uploads") / f"{Path(excel_file_path).stem}_parties"
+    )
+    if source_row_numbers:
+        for chunk in chunk_files:
+            chunk['row_numbers'] = [source_row_numbers[row_number - 2] for row_number in chunk['row_numbers']]
+    logger.info(f"Import en {len(chunk_files)} parties ({[len(chunk['row_numbers']) for chunk in chunk_files]} lignes)")
+    
+    chunk_progress = [0.0] * len(chunk_files)
+    launched = []
+    
+    async def import_chunk(chunk_index: int, chunk: Dict) -> Dict:
+        label = f"partie {chunk_index + 1}/{len(chunk_files)}"
+        
+        async def chunk_on_progress(stage: str, progress: Optional[float] = None, detail: Optional[str] = None):
+            if stage == "importing" and progress is not None:
+                chunk_progress[chunk_index] = progress
+            await report_progress(
+                "importing",
+                round(sum(chunk_progress) / len(chunk_progress), 1),
+                f"{label}: {stage}" + (f" {detail}" if detail else "")
+            )
+        
+        async def chunk_on_checkpoint(name: str, data: Optional[Dict] = None):
+            # A chunk launched on Legisway must never be imported again
+            if name == "started" and not launched and on_checkpoint:
+                await on_checkpoint("started", {"chunked": True})
+            if name == "started":
+                launched.append(chunk_index)
+        
+        async with get_tenant_import_slot(params['site_url']):
+            result = await import_to_legisway(
+                site_url=params['site_url'],
+                login=params['login'],
+                password=params['password'],
+                selected_format=params['selected_format'],
+                excel_file_path=chunk['file_path'],
+                total_rows=len(chunk['row_numbers']),
+                table_config=params['table_config'],
+                on_progress=chunk_on_progress,
+                on_checkpoint=chunk_on_checkpoint,
+                result_file_prefix=f"{result_file_prefix}_partie{chunk_index + 1}"
+            )
+        chunk_progress[chunk_index] = 100.0
+        return {**result, "row_numbers": chunk['row_numbers']}
+    
+    chunk_results = await asyncio.gather(*(import_chunk(idx, chunk) for idx, chunk in enumerate(chunk_files)))
+    
+    failed_chunks = [
+        f"partie {idx + 1}: {result['message']}"
+        for idx, result in enumerate(chunk_results) if not result.get('success')
     ]
+    if failed_chunks:
+        return {
+            "success": False,
+            "message": "Import en plusieurs parties incomplet:\n" + "\n".join(failed_chunks)
+        }
     
-    for selector in selectors_to_try:
+    await report_progress("merging_results")
+    results_with_file = [result for result in chunk_results if result.get('result_file_path')]
+    if not results_with_file:
+        return {
+            "success": True,
+            "message": f"Import terminé en {len(chunk_files)} parties (pas de fichier de résultat disponible)",
+            "rows_imported": total_rows
+        }
+    
+    result_file_name = f"{Path(excel_file_path).stem}_resultat.xlsx"
+    downloads_dir = Path("/tmp/downloads")
+    downloads_dir.mkdir(exist_ok=True)
+    result_file_path = downloads_dir / result_file_name
+    await asyncio.to_thread(merge_chunk_results, results_with_file, str(result_file_path))
+    if on_checkpoint:
+        await on_checkpoint("result_downloaded", {
+            "result_file_path": str(result_file_path),
+            "result_file_name": result_file_name,
+            "rows_imported": total_rows
+        })
+    
+    return {
+        "success": True,
+        "message": f"Import terminé avec rollback en {len(chunk_files)} parties: {total_rows} lignes traitées",
+        "rows_imported": total_rows,
+        "result_file_path": str(result_file_path),
+        "result_file_name": result_file_name
+    }
+
+def resolve_import_fingerprints(file_path: str, key_indexes: List[int], previous_rows: Optional[Dict], target_path: str) -> Dict:
+    """
+    Fingerprint every row of a workbook: [key digest, row content hash, row number, unchanged]
+    With the fingerprints of the last successful import (previous_rows, key digest -> row hash),
+    also write to target_path a workbook with the header and only the new or changed rows,
+    and their original row numbers
+    """
+    source = load_workbook(filename=file_path, read_only=True)
+    target = None
+    if previous_rows is not None:
+        target = Workbook(write_only=True)
+        target_sheet = target.create_sheet()
+    
+    fingerprints = []
+    row_numbers = []
+    total_rows = 0
+    try:
+        for row_number, row in enumerate(source.active.iter_rows(values_only=True), start=1):
+            row_data = [str(cell) if cell is not None else "" for cell in row]
+            if row_number == 1:
+                if target is not None:
+                    target_sheet.append(list(row))
+                continue
+            if not any(row_data):
+                continue
+            total_rows += 1
+            
+            key_values = [row_data[idx].strip() if idx < len(row_data) else "" for idx in key_indexes]
+            row_hash = compute_row_hash(row_data)
+            if any(key_values):
+                key_digest = hashlib.blake2b("\x1f".join(key_values).encode("utf-8"), digest_size=8).hexdigest()
+                unchanged = previous_rows is not None and previous_rows.get(key_digest) == row_hash
+                fingerprints.append([key_digest, row_hash, row_number, unchanged])
+            else:
+                unchanged = False
+            
+            if target is not None and not unchanged:
+                target_sheet.append(list(row))
+                row_numbers.append(row_number)
+        
+        if target is not None:
+            target.save(target_path)
+    finally:
+        source.close()
+    
+    return {
+        "fingerprints": fingerprints,
+        "total_rows": total_rows,
+        "row_numbers": row_numbers if target is not None else None
+    }
+
+async def prepare_differential_import(job: Dict, params: Dict) -> Optional[Dict]:
+    """
+    Record the row fingerprints of the job file (committed when the import succeeds)
+    In delta mode, compare them to the last successful import of the workflow and return the
+    reduced workbook {"file_path", "row_numbers", "total_rows"}; None when the full file is imported
+    """
+    key_fields = extract_key_fields(params['table_config'])
+    if not key_fields:
+        return None
+    
+    workflow_key = get_workflow_key(params['site_url'], params['selected_format'])
+    excel_headers = next(iter_excel_rows(job['file_path']))[1]
+    key_indexes = await resolve_key_indexes(params, excel_headers, key_fields)
+    if len(key_indexes) != len(key_fields):
+        return None
+    
+    signature = {
+        "header_signature": compute_header_signature(excel_headers),
+        "key_fields": key_fields
+    }
+    previous_rows = None
+    if params.get('import_mode') == "delta":
+        previous = await db.import_fingerprints.find_one({"workflow_key": workflow_key, "status": "committed"}, {"_id": 0})
+        if previous and any(previous.get(name) != value for name, value in signature.items()):
+            logger.info("Import différentiel: en-têtes ou clés modifiés depuis le dernier import, import complet")
+        elif not previous:
+            logger.info("Import différentiel: aucun import précédent réussi pour ce format, import complet")
+        else:
+            previous_rows = await load_import_fingerprints(previous)
+            if previous_rows is None:
+                logger.info("Import différentiel: empreintes du dernier import incomplètes, import complet")
+    
+    delta_path = Path("/tmp/uploads") / f"{Path(job['file_path']).stem}_delta.xlsx"
+    delta = await asyncio.to_thread(
+        resolve_import_fingerprints,
+        job['file_path'],
+        key_indexes,
+        previous_rows,
+        str(delta_path)
+    )
+    
+    if delta['total_rows'] <= MAX_INCREMENTAL_ROWS:
+        await save_import_fingerprints(job['job_id'], workflow_key, signature, delta['fingerprints'])
+    
+    if delta['row_numbers'] is None:
+        return None
+    logger.info(
+        f"Import différentiel: {len(delta['row_numbers'])} lignes nouvelles ou modifiées "
+        f"sur {delta['total_rows']}"
+    )
+    return {
+        "file_path": str(delta_path),
+        "row_numbers": delta['row_numbers'],
+        "total_rows": delta['total_rows']
+    }
+
+async def save_import_fingerprints(job_id: str, workflow_key: str, signature: Dict, fingerprints: List[list]):
+    """
+    Record the row fingerprints of a job as pending, in chunks of import_fingerprint_rows
+    """
+    await db.import_fingerprint_rows.delete_many({"job_id": job_id})
+    chunk_count = 0
+    for chunk in split_in_size_bounded_chunks(fingerprints, lambda fingerprint: len(fingerprint[0]) + len(fingerprint[1]) + 48):
+        await db.import_fingerprint_rows.insert_one({"job_id": job_id, "chunk": chunk_count, "rows": chunk})
+        chunk_count += 1
+    await db.import_fingerprints.replace_one(
+        {"job_id": job_id},
+        {
+            "workflow_key": workflow_key,
+            "job_id": job_id,
+            "status": "pending",
+            **signature,
+            "row_count": len(fingerprints),
+            "row_chunks": chunk_count,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        },
+        upsert=True
+    )
+
+async def load_import_fingerprints(reference: Dict) -> Optional[Dict]:
+    """
+    Row fingerprints (key digest -> row hash) of the reference import of a workflow,
+    None when its chunks are incomplete
+    """
+    rows = {}
+    chunk_count = 0
+    async for chunk in db.import_fingerprint_rows.find({"job_id": reference['job_id']}, {"_id": 0, "rows": 1}):
+        chunk_count += 1
+        for key_digest, row_hash, *_ in chunk['rows']:
+            rows[key_digest] = row_hash
+    if chunk_count != reference.get('row_chunks'):
+        return None
+    return rows
+
+async def drop_import_fingerprints(job_id: str):
+    """
+    Delete the row fingerprints of a job (pending or former reference)
+    """
+    await db.import_fingerprints.delete_one({"job_id": job_id})
+    await db.import_fingerprint_rows.delete_many({"job_id": job_id})
+
+async def settle_import_fingerprints(job_id: str, succeeded: bool, result: Dict):
+    """
+    Once an import ends, the fingerprints of the rows Legisway accepted (per its result file)
+    become the reference of the workflow, with the unchanged rows a delta import did not send
+    Without result file, on failure or when the run was rolled back, they are all dropped and
+    the previous reference stays
+    """
+    pending = await db.import_fingerprints.find_one({"job_id": job_id, "status": "pending"}, {"_id": 0})
+    if not pending:
+        return
+    
+    accepted_rows = None
+    if succeeded and result.get('result_file_path') and Path(result['result_file_path']).exists():
         try:
-            await page.wait_for_selector(selector, timeout=3000)
-            logger.info(f"Bouton connexion trouvé avec: {selector}")
-            await asyncio.sleep(0.5)
-            await page.click(selector, timeout=5000)
+            accepted_rows = await asyncio.to_thread(read_accepted_source_rows, result['result_file_path'])
+        except Exception as e:
+            logger.error(f"Lecture des lignes acceptées échouée: {str(e)}")
+    if accepted_rows is None:
+        logger.info("Empreintes de l'import non conservées (échec, rollback ou pas de fichier de résultat)")
+        await drop_import_fingerprints(job_id)
+        return
+    
+    # Rows sent but not accepted are left out, the next delta import sends them again
+    kept_rows = 0
+    for chunk_number in range(pending['row_chunks']):
+        chunk = await db.import_fingerprint_rows.find_one({"job_id": job_id, "chunk": chunk_number})
+        if chunk is None:
+            await drop_import_fingerprints(job_id)
+            return
+        rows = [row for row in chunk['rows'] if row[3] or row[2] in accepted_rows]
+        kept_rows += len(rows)
+        await db.import_fingerprint_rows.update_one({"_id": chunk['_id']}, {"$set": {"rows": rows}})
+    
+    previous_references = await db.import_fingerprints.find(
+        {"workflow_key": pending['workflow_key'], "status": "committed"}, {"_id": 0, "job_id": 1}
+    ).to_list(None)
+    await db.import_fingerprints.update_one({"job_id": job_id}, {"$set": {"status": "committed", "row_count": kept_rows}})
+    for reference in previous_references:
+        await drop_import_fingerprints(reference['job_id'])
+    logger.info(f"Empreintes de l'import conservées: {kept_rows}/{pending['row_count']} lignes")
+
+async def run_batch_job(job: Dict):
+    """
+    Validate all the files of a batch job concurrently, then import the valid ones in one
+    Legisway session; the job result lists the result of each file
+    """
+    params = job['params']
+    items = job['items']
+    progress = ImportJobProgress(job['job_id'])
+    results = [None] * len(items)
+    
+    async def update_item(index: int, fields: Dict):
+        await db.import_jobs.update_one(
+            {"job_id": job['job_id']},
+            {"$set": {f"items.{index}.{name}": value for name, value in fields.items()}}
+        )
+    
+    try:
+        await progress("validation")
+        for item in items:
+            item['file_path'] = await ensure_local_file(item['file_path'], item.get('file_id'))
+        validations = await asyncio.gather(*(
+            validate_before_import(item['file_path'], {**params, **item['params']}) for item in items
+        ))
+        
+        to_import = []
+        for index, (report, current_token) in enumerate(validations):
+            if report['success']:
+                to_import.append(index)
+                await update_item(index, {"status": "validated", "total_rows": report['total_rows']})
+            else:
+                results[index] = build_validation_response(report, current_token)
+                await update_item(index, {"status": "failed", "result": results[index]})
+        logger.info(f"Import groupé: {len(to_import)}/{len(items)} fichiers valides")
+        
+        if to_import:
+            await progress("importing", 0.0)
+            started = []
+            
+            async def item_progress(position: int, stage: str, value: Optional[float] = None, detail: Optional[str] = None):
+                index = to_import[position]
+                await update_item(index, {"status": "running", "stage": stage, "progress": value})
+                await progress(
+                    "importing",
+                    round(100 * sum(result is not None for result in results) / len(items), 1),
+                    f"{items[index]['file_name']}: {stage}" + (f" {detail}" if detail else "")
+                )
+            
+            async def item_started(position: int):
+                # Some files are imported on Legisway: the job must never run again from the start
+                if not started:
+                    await progress.checkpoint("started", {"batch": True})
+                started.append(position)
+            
+            async def item_result(position: int, result: Dict):
+                index = to_import[position]
+                results[index] = await store_result_file(result)
+                await update_item(index, {
+                    "status": "succeeded" if result.get('success') else "failed",
+                    "result": results[index]
+                })
+            
+            await import_batch_in_session(
+                params['site_url'],
+                params['login'],
+                params['password'],
+                [
+                    {
+                        "selected_format": items[index]['params']['selected_format'],
+                        "file_path": items[index]['file_path'],
+                        "total_rows": validations[index][0]['total_rows']
+                    }
+                    for index in to_import
+                ],
+                lanes=params.get('lanes') or 1,
+                on_item_progress=item_progress,
+                on_item_started=item_started,
+                on_item_result=item_result,
+                result_file_prefix=job['job_id'][:8]
+            )
+        
+        succeeded = sum(1 for result in results if result and result.get('success'))
+        result = {
+            "success": succeeded == len(items),
+            "message": f"Import groupé: {succeeded}/{len(items)} fichiers importés",
+            "items": [
+                {"file_name": item['file_name'], **(results[index] or {"success": False, "message": "Non traité"})}
+                for index, item in enumerate(items)
+            ]
+        }
+    except Exception as e:
+        logger.error(f"Batch import error: {str(e)}")
+        result = {
+            "success": False,
+            "message": f"Erreur lors de l'import groupé: {str(e)}"
+        }
+    
+    await progress.finish("succeeded" if result.get('success') else "failed", result)
+
+def parse_cron_field(field: str, minimum: int, maximum: int) -> frozenset:
+    """
+    Values of one cron field: "*", "5", "1-5", "*/15", "0-30/10" and lists of those ("1,15,30")
+    """
+    values = set()
+    for part in field.split(","):
+        range_part, _, step_part = part.partition("/")
+        try:
+            step = int(step_part) if step_part else 1
+            if range_part == "*":
+                start, end = minimum, maximum
+            elif "-" in range_part:
+                start, end = (int(bound) for bound in range_part.split("-", 1))
+            else:
+                start = end = int(range_part)
+                if step_part:
+                    end = maximum
+        except ValueError:
+            raise ValueError(f"valeur non numérique '{part}'")
+        if step < 1 or start < minimum or end > maximum or start > end:
+            raise ValueError(f"valeur hors limites '{part}' (de {minimum} à {maximum})")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+def parse_cron_expression(expression: str) -> Dict:
+    """
+    Parse a 5-field cron expression (minute hour day month weekday, weekday 0 or 7 = Sunday)
+    or one of the aliases @hourly, @daily, @weekly, @monthly
+    Raises ValueError with a message for the user
+    """
+    fields = CRON_ALIASES.get(expression.strip().lower(), expression).split()
+    if len(fields) != 5:
+        raise ValueError(f"Expression cron invalide '{expression}': 5 champs attendus (minute heure jour mois jour_semaine)")
+    
+    try:
+        parsed = {
+            name: parse_cron_field(field, minimum, maximum)
+            for field, (name, minimum, maximum) in zip(fields, CRON_FIELDS)
+        }
+    except ValueError as e:
+        raise ValueError(f"Expression cron invalide '{expression}': {str(e)}")
+    # 7 is Sunday too
+    parsed['weekday'] = frozenset(value % 7 for value in parsed['weekday'])
+    # As in cron, when both day and weekday are restricted a day matching either one runs
+    parsed['day_restricted'] = fields[2] != "*"
+    parsed['weekday_restricted'] = fields[4] != "*"
+    return parsed
+
+def cron_matches_day(cron: Dict, moment: datetime) -> bool:
+    day_match = moment.day in cron['day']
+    # isoweekday: Monday 1 ... Sunday 7, cron: Sunday 0
+    weekday_match = moment.isoweekday() % 7 in cron['weekday']
+    if cron['day_restricted'] and cron['weekday_restricted']:
+        return day_match or weekday_match
+    return day_match and weekday_match
+
+def local_day_start(day: datetime) -> datetime:
+    """
+    UTC instant of midnight (wall clock) of an aware day
+    """
+    return day.replace(hour=0, minute=0, second=0, microsecond=0, fold=0).astimezone(timezone.utc)
+
+def cron_time_skipped_by_dst(cron: Dict, moment: datetime, local: datetime) -> bool:
+    """
+    True when a DST change just before `moment` skipped a wall-clock minute matching the cron
+    """
+    before = (moment - timedelta(minutes=1)).astimezone(local.tzinfo)
+    if local.utcoffset() <= before.utcoffset():
+        return False
+    skipped = before.replace(tzinfo=None) + timedelta(minutes=1)
+    while skipped < local.replace(tzinfo=None):
+        if cron_matches_day(cron, skipped) and skipped.hour in cron['hour'] and skipped.minute in cron['minute']:
             return True
+        skipped += timedelta(minutes=1)
+    return False
+
+def next_cron_time(cron: Dict, after: datetime) -> datetime:
+    """
+    First minute strictly after `after` (aware, in the scheduler time zone) matching the cron
+    Whole months, days and hours that cannot match are skipped
+    Around DST changes, as in cron: wall-clock times skipped by the change run right after it,
+    and wall-clock times repeated by the change run once, unless the cron runs every hour
+    """
+    zone = after.tzinfo
+    every_hour = len(cron['hour']) == 24
+    # Minutes are walked in UTC so that the result is always after `after`
+    moment = after.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = after.year + 5
+    while moment.year <= limit:
+        local = moment.astimezone(zone)
+        repeated = local.fold == 1 and local.replace(fold=0).utcoffset() != local.utcoffset()
+        if local.month not in cron['month']:
+            moment = local_day_start((local.replace(day=1) + timedelta(days=32)).replace(day=1))
+        elif not cron_matches_day(cron, local):
+            moment = local_day_start(local + timedelta(days=1))
+        elif cron_time_skipped_by_dst(cron, moment, local):
+            return local
+        elif local.hour not in cron['hour'] or (repeated and not every_hour):
+            moment += timedelta(minutes=60 - local.minute)
+        elif local.minute not in cron['minute']:
+            moment += timedelta(minutes=1)
+        else:
+            return local
+    raise ValueError("L'expression cron ne correspond à aucune date")
+
+def compute_next_run(cron_expression: str, after: float) -> float:
+    """
+    Timestamp of the next run of a schedule after the timestamp `after`
+    """
+    moment = datetime.fromtimestamp(after, SCHEDULER_TIMEZONE)
+    return next_cron_time(parse_cron_expression(cron_expression), moment).timestamp()
+
+async def check_schedule_limits(tenant: str) -> Optional[str]:
+    """
+    Reason to postpone a scheduled import on a tenant, None when it can be queued now:
+    at most IMPORT_TENANT_CONCURRENCY unfinished jobs and IMPORT_MAX_PER_HOUR jobs in the last hour
+    """
+    unfinished = await db.import_jobs.count_documents({
+        "tenant": tenant,
+        "status": {"$in": ["queued", "running", "detached"]}
+    })
+    if unfinished >= IMPORT_TENANT_CONCURRENCY:
+        return f"{unfinished} imports en cours sur {tenant}"
+    
+    if IMPORT_MAX_PER_HOUR:
+        since = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+        last_hour = await db.import_jobs.count_documents({"tenant": tenant, "created_at": {"$gte": since}})
+        if last_hour >= IMPORT_MAX_PER_HOUR:
+            return f"budget de {IMPORT_MAX_PER_HOUR} imports par heure atteint sur {tenant}"
+    return None
+
+async def trigger_schedule(schedule: Dict, now: float):
+    """
+    Queue the import of a due schedule, postpone it while the tenant limits are reached,
+    or skip the run when its time window is over; then plan the next run
+    """
+    missed = now > schedule['next_run_at'] + schedule['window_minutes'] * 60
+    if not missed:
+        postponed_reason = await check_schedule_limits(schedule['tenant'])
+        if postponed_reason:
+            # Still due: checked again at the next tick, until the end of the window
+            if schedule.get('last_status') != "postponed":
+                logger.info(f"Programmation {schedule['schedule_id']} reportée: {postponed_reason}")
+            await db.import_schedules.update_one(
+                {"schedule_id": schedule['schedule_id']},
+                {"$set": {"last_status": "postponed", "last_message": postponed_reason}}
+            )
+            return
+    
+    run_update = {"last_status": "missed" if missed else "queued", "last_message": None, "last_run_at": now}
+    if schedule['run_once']:
+        run_update.update({"enabled": False, "next_run_at": None})
+    else:
+        run_update['next_run_at'] = compute_next_run(schedule['cron'], max(now, schedule['next_run_at']))
+    
+    # Only the server that moves next_run_at runs the schedule
+    # A schedule run once hands its credentials over to the job and does not keep them
+    claimed = await db.import_schedules.update_one(
+        {"schedule_id": schedule['schedule_id'], "next_run_at": schedule['next_run_at']},
+        {"$set": run_update, **({"$unset": IMPORT_CREDENTIAL_FIELDS} if schedule['run_once'] else {})}
+    )
+    if not claimed.modified_count:
+        return
+    if missed:
+        logger.warning(f"Programmation {schedule['schedule_id']}: fenêtre d'exécution dépassée, exécution sautée")
+        return
+    
+    job = await create_import_job(
+        file_name=schedule['file_name'],
+        file_path=schedule['file_path'],
+        params=schedule['params'],
+        file_id=schedule['file_id'],
+        schedule_id=schedule['schedule_id']
+    )
+    await db.import_schedules.update_one({"schedule_id": schedule['schedule_id']}, {"$set": {"last_job_id": job['job_id']}})
+    logger.info(f"Programmation {schedule['schedule_id']}: job {job['job_id']} mis en file d'attente")
+
+async def run_import_scheduler():
+    """
+    Queue the imports of the due schedules every SCHEDULER_TICK_SECONDS
+    """
+    while True:
+        try:
+            now = time.time()
+            due_schedules = await db.import_schedules.find(
+                {"enabled": True, "next_run_at": {"$lte": now}},
+                {"_id": 0}
+            ).sort("next_run_at", 1).to_list(None)
+            for schedule in due_schedules:
+                try:
+                    await trigger_schedule(schedule, now)
+                except Exception as e:
+                    logger.error(f"Programmation {schedule['schedule_id']}: {str(e)}")
         except Exception as e:
-            continue
+            logger.error(f"Planificateur d'imports: {str(e)}")
+        await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+
+async def validate_before_import(file_path: str, params: Dict, on_rows: Optional[Callable] = None) -> tuple:
+    """
+    Validation report of a file before its import, reused from /import/validate when the
+    validation token still matches the file, the configuration, the reference lists and the options
+    """
+    options = ValidationOptions(**params['validation_options']) if params.get('validation_options') else None
+    validation_token = params.get('validation_token')
+    current_token = compute_validation_token(
+        file_hash=await asyncio.to_thread(compute_file_hash, file_path),
+        config_fingerprint=compute_config_fingerprint(params['selected_format'], params['table_config']),
+        lists_fingerprint=compute_lists_fingerprint(params.get('reference_lists')),
+        options_fingerprint=compute_options_fingerprint(options)
+    )
+    
+    if validation_token and validation_token == current_token:
+        report = await get_validation_report(validation_token)
+        if report and report['success']:
+            logger.info("Jeton de validation valide, validation ignorée")
+            return report, current_token
+    elif validation_token:
+        logger.info("Jeton de validation obsolète (fichier ou configuration modifiés), revalidation")
+    
+    report = await run_import_validation(
+        file_path=file_path,
+        file_format=params['file_format'],
+        selected_format=params['selected_format'],
+        table_config=params['table_config'],
+        site_url=params['site_url'],
+        login=params['login'],
+        system_password=params['system_password'],
+        reference_lists=params.get('reference_lists'),
+        options=options,
+        on_rows=on_rows
+    )
+    await save_validation_report(current_token, report, file_path)
+    return report, current_token
+
+async def find_import_history_entry(page, file_name: str, timeout: int = 10000):
+    """
+    Last row of the import history of the page showing the uploaded file name, None when not found
+    """
+    entries = page.locator(IMPORT_HISTORY_ROW_SELECTOR).filter(has_text=file_name)
+    try:
+        await entries.first.wait_for(state="attached", timeout=timeout)
+    except Exception:
+        return None
+    return entries.last
+
+async def reattach_import(
+    site_url: str,
+    login: str,
+    password: str,
+    import_state: Dict,
+    result_file_prefix: Optional[str] = None
+) -> Optional[Dict]:
+    """
+    Short browser session on the import page of Legisway to find a detached import in the
+    import history (by the unique name of the uploaded file) and collect its result
+    Returns None while the import is still running, or missing from the history for less than
+    IMPORT_HISTORY_MISSING_SECONDS
+    """
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
+        try:
+            context = await browser.new_context(
+                ignore_https_errors=True,
+                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+                accept_downloads=True
+            )
+            page = await context.new_page()
+            
+            error_message = await open_import_page(page, site_url, login, password)
+            if error_message:
+                return {"success": False, "message": error_message}
+            
+            entry = await find_import_history_entry(page, import_state['file_name'])
+            if entry is None:
+                launched_at = datetime.fromisoformat(import_state['launched_at'])
+                if (datetime.now(timezone.utc) - launched_at).total_seconds() > IMPORT_HISTORY_MISSING_SECONDS:
+                    return {
+                        "success": False,
+                        "message": f"Import {import_state['file_name']} introuvable dans l'historique Legisway: "
+                                   "vérifier son résultat dans Legisway avant de le relancer"
+                    }
+                logger.info(f"Import {import_state['file_name']} pas encore dans l'historique")
+                return None
+            
+            result_file_link = entry.locator('a[href*="result_file"]')
+            if not await result_file_link.count():
+                entry_text = " ".join((await entry.text_content() or "").split())
+                if "Échec" in entry_text:
+                    return {"success": False, "message": f"Import échoué: {entry_text}"}
+                return None
+            result_link = await read_result_link(page, result_file_link.first)
+        finally:
+            await browser.close()
     
-    logger.error("Aucun bouton de connexion trouvé")
-    return False
+    # Downloaded without the browser; an error leaves the job detached until the next check
+    return {
+        "success": True,
+        "message": f"Import terminé avec rollback: {import_state['total_rows']} lignes traitées",
+        "rows_imported": import_state['total_rows'],
+        **await download_result_over_http(result_link, result_file_prefix)
+    }
 
-async def click_import_de_donnees(page):
+async def check_detached_import(job: Dict):
     """
-    Helper function to click "Import de données" menu item
-    Returns True if successful, False otherwise
+    Look for the result of a detached import job and finish the job once the import is over
     """
-    selectors = [
-        'button[data-kind="vertical-menu-item"]:has-text("Import de données")',
-        'button:has-text("Import de données")',
-        'a:has-text("Import de données")',
-        '[data-kind="vertical-menu-item"]:has-text("Import de données")'
-    ]
+    params = job['params']
+    import_state = job['import_state']
+    progress = ImportJobProgress.from_job(job)
     
-    for selector in selectors:
-        try:
-            await page.wait_for_selector(selector, timeout=3000)
-            await page.click(selector, timeout=5000)
-            logger.info(f"Import de données cliqué avec: {selector}")
-            return True
-        except:
-            continue
+    result = await reattach_import(
+        params['site_url'], params['login'], params['password'], import_state, result_file_prefix=job['job_id'][:8]
+    )
     
-    logger.error("Bouton 'Import de données' non trouvé")
-    return False
+    if result is None:
+        launched_at = datetime.fromisoformat(import_state['launched_at'])
+        if (datetime.now(timezone.utc) - launched_at).total_seconds() > IMPORT_MAX_WAIT_SECONDS:
+            result = {"success": False, "message": "Timeout: l'import a pris plus d'1 heure"}
+        else:
+            await db.import_jobs.update_one(
+                {"job_id": job['job_id']},
+                {"$set": {"next_check_at": time.time() + IMPORT_REATTACH_INTERVAL_SECONDS}}
+            )
+            return
+    
+    if import_state.get('delta'):
+        # Delta import resumed from the history: its result rows are those of the reduced
+        # workbook, the next delta import sends the rows again
+        logger.warning(f"Job {job['job_id']}: import différentiel repris, empreintes non conservées")
+        await drop_import_fingerprints(job['job_id'])
+    
+    await progress.finish("succeeded" if result['success'] else "failed", result)
 
-async def click_user_icon_and_admin(page):
+async def resume_interrupted_jobs():
     """
-    Helper function to click user icon and then Administration menu
-    Returns True if successful, False otherwise
+    Resume the running jobs whose lease expired (their server stopped), from their last checkpoint:
+    an import already launched on Legisway is followed from the import history, never run again
+    Each job is claimed first, so it is resumed by a single server
     """
-    # Click user icon
-    user_icon_selectors = [
-        '.icon-user',
-        '.icon-user-administration-dashboard',
-        'span.icon-user',
-        '[class*="icon-user"]'
-    ]
-    
-    user_icon_clicked = False
-    for selector in user_icon_selectors:
-        try:
-            await page.wait_for_selector(selector, timeout=3000)
-            await page.click(selector, timeout=5000)
-            logger.info(f"Icône utilisateur cliquée avec: {selector}")
-            user_icon_clicked = True
-            await asyncio.sleep(1)
-            break
-        except:
+    expired_lease = {
+        "status": "running",
+        "$or": [{"lease_expires_at": {"$lt": time.time()}}, {"lease_expires_at": None}]
+    }
+    interrupted_jobs = await db.import_jobs.find(expired_lease, {"_id": 0, "job_id": 1}).to_list(None)
+    resumed_jobs = 0
+    for interrupted_job in interrupted_jobs:
+        job = await db.import_jobs.find_one_and_update(
+            {"job_id": interrupted_job['job_id'], **expired_lease},
+            {"$set": {"worker_id": WORKER_ID, "lease_expires_at": time.time() + IMPORT_JOB_LEASE_SECONDS}},
+            projection={"_id": 0}
+        )
+        if job is None:
             continue
+        resumed_jobs += 1
+        checkpoints = job.get('checkpoints') or {}
+        progress = ImportJobProgress.from_job(job)
+        
+        if 'result_downloaded' in checkpoints:
+            # Only the end of the job was lost
+            downloaded = {name: value for name, value in checkpoints['result_downloaded'].items() if name != "at"}
+            if downloaded.get('rows_imported') is not None:
+                message = f"Import terminé avec rollback: {downloaded['rows_imported']} lignes traitées"
+            else:
+                # Checkpoint recorded before the row count was kept in it
+                downloaded.pop('rows_imported', None)
+                message = "Import terminé avec rollback (nombre de lignes traitées inconnu après le redémarrage)"
+            await progress.finish("succeeded", {"success": True, "message": message, **downloaded})
+            logger.info(f"Job {job['job_id']}: résultat déjà téléchargé, job terminé")
+        elif 'started' in checkpoints and (checkpoints['started'].get('chunked') or checkpoints['started'].get('batch')):
+            # Some parts or files may already be imported: running them again would duplicate data
+            await progress.finish("failed", {
+                "success": False,
+                "message": ("Import groupé" if checkpoints['started'].get('batch') else "Import en plusieurs parties")
+                           + " interrompu par un redémarrage du serveur: "
+                           "vérifier l'historique des imports Legisway avant de relancer"
+            })
+            logger.warning(f"Job {job['job_id']}: import en plusieurs parties interrompu, job en échec")
+        elif 'started' in checkpoints:
+            await progress.detach(checkpoints['started']['import_state'], next_check_in=0)
+            logger.info(f"Job {job['job_id']}: import lancé avant le redémarrage, reprise depuis l'historique Legisway")
+        else:
+            # Nothing launched on Legisway yet: the job can safely run again from the start
+            await db.import_jobs.update_one(
+                {"job_id": job['job_id']},
+                {"$set": {"status": "queued"}, "$unset": {"checkpoints": "", "worker_id": "", "lease_expires_at": ""}}
+            )
+            await import_queue.put(job['job_id'])
+            logger.info(f"Job {job['job_id']}: import non lancé avant le redémarrage, remis en file d'attente")
     
-    if not user_icon_clicked:
-        logger.error("Icône utilisateur non trouvée")
-        return False
-    
-    # Click Administration menu item
-    admin_selectors = [
-        'span[data-dropdown-menu-item]:has-text("Administration")',
-        'span.cg-dropdown-list-item:has-text("Administration")',
-        'button[mat-menu-item]:has-text("Administration")',
-        'button.user-menu-item:has-text("Administration")',
-        '[data-e2e="cg-dropdown-list-item"]:has-text("Administration")'
-    ]
-    
-    for selector in admin_selectors:
+    if resumed_jobs:
+        reattach_requested.set()
+
+async def maintain_job_leases():
+    """
+    Every IMPORT_JOB_HEARTBEAT_SECONDS, renew the lease of the jobs run by this server and
+    resume the jobs of servers that stopped renewing theirs
+    """
+    while True:
+        await asyncio.sleep(IMPORT_JOB_HEARTBEAT_SECONDS)
         try:
-            await page.wait_for_selector(selector, timeout=3000)
-            await page.click(selector, timeout=5000)
-            logger.info(f"Administration cliqué avec: {selector}")
-            return True
-        except:
+            if running_job_ids:
+                await db.import_jobs.update_many(
+                    {"job_id": {"$in": list(running_job_ids)}, "status": "running", "worker_id": WORKER_ID},
+                    {"$set": {"lease_expires_at": time.time() + IMPORT_JOB_LEASE_SECONDS}}
+                )
+            await resume_interrupted_jobs()
+        except Exception as e:
+            logger.error(f"Baux des jobs d'import: erreur: {str(e)}")
+
+async def collect_detached_imports():
+    """
+    Scheduler of the detached imports: every IMPORT_REATTACH_INTERVAL_SECONDS, or when notified,
+    check the imports whose next check is due
+    """
+    while True:
+        try:
+            await asyncio.wait_for(reattach_requested.wait(), timeout=IMPORT_REATTACH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        reattach_requested.clear()
+        
+        try:
+            due_jobs = await db.import_jobs.find(
+                {"status": "detached", "next_check_at": {"$lte": time.time()}},
+                {"_id": 0}
+            ).to_list(None)
+        except Exception as e:
+            logger.error(f"Imports détachés: erreur de lecture des jobs: {str(e)}")
             continue
-    
-    logger.error("Bouton Administration non trouvé")
-    return False
+        
+        for job in due_jobs:
+            try:
+                # Claim the check, another server may see the same job due
+                claimed = await db.import_jobs.update_one(
+                    {"job_id": job['job_id'], "status": "detached", "next_check_at": job['next_check_at']},
+                    {"$set": {"next_check_at": time.time() + IMPORT_JOB_LEASE_SECONDS}}
+                )
+                if claimed.modified_count == 0:
+                    continue
+                logger.info(f"Vérification de l'import détaché du job {job['job_id']}")
+                await check_detached_import(job)
+            except Exception as e:
+                logger.error(f"Imports détachés: erreur job {job['job_id']}: {str(e)}")
+                await db.import_jobs.update_one(
+                    {"job_id": job['job_id']},
+                    {"$set": {"next_check_at": time.time() + IMPORT_REATTACH_INTERVAL_SECONDS}}
+                )
 
 async def import_to_legisway(
     site_url: str,
@@ -1762,228 +5829,55 @@ async def import_to_legisway(
     password: str,
     selected_format: Dict,
     excel_file_path: str,
-    excel_data: Dict,
-    table_config: Dict
+    total_rows: int,
+    table_config: Dict,
+    on_progress: Optional[Callable] = None,
+    detach: bool = False,
+    on_checkpoint: Optional[Callable] = None,
+    result_file_prefix: Optional[str] = None
 ) -> Dict:
     """
     Import Excel data to Legisway using Playwright automation with rollback test option
-    Returns the result file for user download
+    Returns the result file for user download, saved under a name starting with result_file_prefix
+    on_progress(stage, progress, detail) is awaited at each stage and progress change
+    With detach, the browser is closed once the import is launched and the returned
+    import_state lets reattach_import find the import again to collect its result
+    on_checkpoint(name, data) is awaited when the import reaches a point it can be resumed from
+    (uploaded, options_set, started, completed, result_downloaded)
     """
+    async def report_progress(stage: str, progress: Optional[float] = None, detail: Optional[str] = None):
+        if on_progress:
+            await on_progress(stage, progress, detail)
+    
     try:
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-setuid-sandbox'])
-            context = await browser.new_context(
-                ignore_https_errors=True,
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                accept_downloads=True
-            )
-            page = await context.new_page()
-            
             try:
-                # Step 1: Navigate and login
-                logger.info("Connexion à Legisway pour import...")
-                await page.goto(site_url, timeout=30000, wait_until="load")
-                await asyncio.sleep(2)
-                
-                # Check if already logged in
-                already_logged_in = await page.query_selector('.icon-user')
-                
-                if not already_logged_in:
-                    logger.info("Connexion requise...")
-                    await page.fill('input[name="j_username"]', login, timeout=5000)
-                    await asyncio.sleep(0.5)
-                    await page.fill('input[name="j_password"]', password, timeout=5000)
-                    await asyncio.sleep(1)
-                    
-                    if not await click_login_button(page):
-                        await browser.close()
-                        return {
-                            "success": False,
-                            "message": "Bouton de connexion non trouvé"
-                        }
-                    
-                    await page.wait_for_load_state("load", timeout=30000)
-                    await asyncio.sleep(3)
-                else:
-                    logger.info("Déjà connecté")
-                
-                # Step 2: Navigate to Import section
-                logger.info("Navigation vers Import de données...")
-                if not await click_user_icon_and_admin(page):
-                    await browser.close()
-                    return {
-                        "success": False,
-                        "message": "Impossible d'accéder au menu Administration"
-                    }
-                await page.wait_for_load_state("load", timeout=30000)
-                await asyncio.sleep(3)
-                
-                if not await click_import_de_donnees(page):
-                    await browser.close()
-                    return {
-                        "success": False,
-                        "message": "Impossible d'accéder à Import de données"
-                    }
-                await page.wait_for_load_state("load", timeout=30000)
-                await asyncio.sleep(3)
-                
-                # Step 3: Select format in combobox
-                logger.info(f"Sélection du format: {selected_format['name']}")
-                await page.wait_for_selector('kendo-combobox input.k-input-inner', timeout=10000)
-                await page.click('kendo-combobox input.k-input-inner')
-                await asyncio.sleep(1)
-                await page.fill('kendo-combobox input.k-input-inner', selected_format['name'])
-                await asyncio.sleep(1)
-                await page.keyboard.press('Enter')
-                await asyncio.sleep(2)
-                
-                # Step 4: Upload Excel file
-                logger.info("Upload du fichier Excel...")
-                # Find the file input (usually hidden in dropzone)
-                file_input = await page.query_selector('input[type="file"]')
-                if file_input:
-                    await file_input.set_input_files(excel_file_path)
-                    logger.info("Fichier uploadé via input")
-                else:
-                    logger.warning("Input file non trouvé, essai avec dropzone")
-                    # Alternative: try to trigger file input via dropzone click
-                    await page.click('.dropzone')
-                    await asyncio.sleep(1)
-                    file_input = await page.query_selector('input[type="file"]')
-                    if file_input:
-                        await file_input.set_input_files(excel_file_path)
-                
-                await asyncio.sleep(2)
-                
-                # Step 5: Open Advanced Options and select rollback
-                logger.info("Configuration du mode rollback...")
-                await page.wait_for_selector('button[aria-label*="Options Avancées"]', timeout=10000)
-                await page.click('button[aria-label*="Options Avancées"]')
-                await asyncio.sleep(1)
-                
-                # Select rollback radio button
-                # Try clicking on the mat-radio-button itself instead of the input
-                rollback_selectors = [
-                    'mat-radio-button[value="with.rollback"]',
-                    'mat-radio-button[value="with.rollback"] label',
-                    'mat-radio-button[value="with.rollback"] .mat-radio-label'
-                ]
-                
-                rollback_clicked = False
-                for selector in rollback_selectors:
-                    try:
-                        await page.wait_for_selector(selector, timeout=3000)
-                        await page.click(selector, force=True)
-                        rollback_clicked = True
-                        logger.info(f"Mode rollback activé avec: {selector}")
-                        break
-                    except:
-                        continue
-                
-                if not rollback_clicked:
-                    logger.warning("Impossible de cliquer sur rollback, tentative avec force sur input")
-                    await page.click('mat-radio-button[value="with.rollback"] input', force=True)
-                
-                await asyncio.sleep(1)
-                
-                # Step 6: Click Import button
-                logger.info("Lancement de l'import...")
-                await page.wait_for_selector('button:has-text("Importer"):not([disabled])', timeout=10000)
-                await page.click('button:has-text("Importer")')
-                await asyncio.sleep(2)
-                
-                # Step 7: Wait for progress bar to complete
-                logger.info("Attente de la fin de l'import...")
-                # Wait for progress bar to appear
-                await page.wait_for_selector('mat-progress-bar', timeout=10000)
-                await asyncio.sleep(2)
-                
-                # Wait for progress to reach 100% or import to finish
-                # Check for completion message (success or failure)
-                max_wait_time = 3600  # 1 hour max
-                check_interval = 5
-                elapsed = 0
-                
-                while elapsed < max_wait_time:
-                    # Check if import finished (look for result file link or completion message)
-                    result_file = await page.query_selector('a[href*="result_file"]')
-                    completion_message = await page.query_selector('div:has-text("Import terminé"), div:has-text("Échec de l\'import")')
-                    
-                    if result_file or completion_message:
-                        logger.info("Import terminé!")
-                        break
-                    
-                    # Check progress percentage
-                    progress_label = await page.query_selector('mat-progress-bar + label')
-                    if progress_label:
-                        progress_text = await progress_label.text_content()
-                        logger.info(f"Progression: {progress_text}")
-                    
-                    await asyncio.sleep(check_interval)
-                    elapsed += check_interval
+                context = await browser.new_context(
+                    ignore_https_errors=True,
+                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+                )
+                page = await context.new_page()
                 
-                if elapsed >= max_wait_time:
-                    await browser.close()
+                # Steps 1-2: Login and open the import page
+                error_message = await open_import_page(page, site_url, login, password, report_progress)
+                if error_message:
                     return {
                         "success": False,
-                        "message": "Timeout: l'import a pris plus d'1 heure"
-                    }
-                
-                await asyncio.sleep(2)
-                
-                # Step 8: Get result file
-                logger.info("Récupération du fichier de résultat...")
-                result_file_link = await page.query_selector('a[href*="result_file"]')
-                
-                if result_file_link:
-                    result_file_name = await result_file_link.text_content()
-                    result_file_href = await result_file_link.get_attribute('href')
-                    
-                    logger.info(f"Fichier de résultat: {result_file_name}")
-                    
-                    # Download the result file
-                    async with page.expect_download() as download_info:
-                        await result_file_link.click()
-                    download = await download_info.value
-                    
-                    # Save to downloads directory
-                    downloads_dir = Path("/tmp/downloads")
-                    downloads_dir.mkdir(exist_ok=True)
-                    result_file_path = downloads_dir / result_file_name.strip()
-                    
-                    await download.save_as(str(result_file_path))
-                    logger.info(f"Fichier de résultat sauvegardé: {result_file_path}")
-                    
-                    await browser.close()
-                    
-                    return {
-                        "success": True,
-                        "message": f"Import terminé avec rollback: {excel_data['total_rows']} lignes traitées",
-                        "rows_imported": excel_data['total_rows'],
-                        "result_file_path": str(result_file_path),
-                        "result_file_name": result_file_name.strip()
+                        "message": error_message
                     }
-                else:
-                    # No result file found - check for error message
-                    error_message = await page.query_selector('div:has-text("Échec")')
-                    if error_message:
-                        error_text = await error_message.text_content()
-                        await browser.close()
-                        return {
-                            "success": False,
-                            "message": f"Import échoué: {error_text}"
-                        }
-                    else:
-                        await browser.close()
-                        return {
-                            "success": True,
-                            "message": f"Import terminé (pas de fichier de résultat disponible)"
-                        }
                 
+                outcome = await run_import_on_page(
+                    page, selected_format, excel_file_path, total_rows, on_progress, detach, on_checkpoint
+                )
             except Exception as e:
                 logger.error(f"Erreur pendant l'import: {str(e)}")
-                await browser.close()
                 raise e
+            finally:
+                # The result file is downloaded without the browser
+                await browser.close()
+        
+        return await collect_import_result(outcome, total_rows, on_checkpoint, result_file_prefix)
                 
     except Exception as e:
         logger.error(f"Legisway import error: {str(e)}")
@@ -1992,6 +5886,205 @@ async def import_to_legisway(
             "message": f"Erreur import Legisway: {str(e)}"
         }
 
+async def run_import_on_page(
+    page,
+    selected_format: Dict,
+    excel_file_path: str,
+    total_rows: int,
+    on_progress: Optional[Callable] = None,
+    detach: bool = False,
+    on_checkpoint: Optional[Callable] = None,
+    watch: Optional[ImportPageWatch] = None
+) -> Dict:
+    """
+    Steps 3-8 of an import on a page already open on "Import de données": select the format,
+    upload the file with the rollback option, launch the import and wait for its end
+    The result file is not downloaded: the returned result_link is passed to collect_import_result
+    watch is the ImportPageWatch of a page reused for several imports
+    """
+    async def report_progress(stage: str, progress: Optional[float] = None, detail: Optional[str] = None):
+        if on_progress:
+            await on_progress(stage, progress, detail)
+    
+    async def report_checkpoint(name: str, data: Optional[Dict] = None):
+        if on_checkpoint:
+            await on_checkpoint(name, data)
+    
+    # Step 3: Select format in combobox
+    logger.info(f"Sélection du format: {selected_format['name']}")
+    await report_progress("format_selection")
+    await page.wait_for_selector('kendo-combobox input.k-input-inner', timeout=10000)
+    await page.click('kendo-combobox input.k-input-inner')
+    await asyncio.sleep(1)
+    await page.fill('kendo-combobox input.k-input-inner', selected_format['name'])
+    await asyncio.sleep(1)
+    await page.keyboard.press('Enter')
+    await asyncio.sleep(2)
+    
+    # Step 4: Upload Excel file
+    logger.info("Upload du fichier Excel...")
+    await report_progress("upload")
+    # Find the file input (usually hidden in dropzone)
+    file_input = await page.query_selector('input[type="file"]')
+    if file_input:
+        await file_input.set_input_files(excel_file_path)
+        logger.info("Fichier uploadé via input")
+    else:
+        logger.warning("Input file non trouvé, essai avec dropzone")
+        # Alternative: try to trigger file input via dropzone click
+        await page.click('.dropzone')
+        await asyncio.sleep(1)
+        file_input = await page.query_selector('input[type="file"]')
+        if file_input:
+            await file_input.set_input_files(excel_file_path)
+    
+    await asyncio.sleep(2)
+    await report_checkpoint("uploaded")
+    
+    # Step 5: Open Advanced Options and select rollback
+    logger.info("Configuration du mode rollback...")
+    await report_progress("rollback_option")
+    await page.wait_for_selector('button[aria-label*="Options Avancées"]', timeout=10000)
+    await page.click('button[aria-label*="Options Avancées"]')
+    await asyncio.sleep(1)
+    
+    # Select rollback radio button
+    # Try clicking on the mat-radio-button itself instead of the input
+    rollback_selectors = [
+        'mat-radio-button[value="with.rollback"]',
+        'mat-radio-button[value="with.rollback"] label',
+        'mat-radio-button[value="with.rollback"] .mat-radio-label'
+    ]
+    
+    rollback_clicked = False
+    for selector in rollback_selectors:
+        try:
+            await page.wait_for_selector(selector, timeout=3000)
+            await page.click(selector, force=True)
+            rollback_clicked = True
+            logger.info(f"Mode rollback activé avec: {selector}")
+            break
+        except:
+            continue
+    
+    if not rollback_clicked:
+        logger.warning("Impossible de cliquer sur rollback, tentative avec force sur input")
+        await page.click('mat-radio-button[value="with.rollback"] input', force=True)
+    
+    await asyncio.sleep(1)
+    await report_checkpoint("options_set")
+    
+    # Step 6: Click Import button
+    logger.info("Lancement de l'import...")
+    await report_progress("importing", 0)
+    await page.wait_for_selector('button:has-text("Importer"):not([disabled])', timeout=10000)
+    await page.click('button:has-text("Importer")')
+    
+    # From now on the import runs in Legisway: this state finds it again in the import history
+    import_state = {
+        "format_name": selected_format['name'],
+        "file_name": Path(excel_file_path).name,
+        "total_rows": total_rows,
+        "launched_at": datetime.now(timezone.utc).isoformat()
+    }
+    await report_checkpoint("started", {"import_state": import_state})
+    await asyncio.sleep(2)
+    
+    # Step 7: Wait for progress bar to complete
+    logger.info("Attente de la fin de l'import...")
+    # Wait for progress bar to appear
+    await page.wait_for_selector('mat-progress-bar', timeout=10000)
+    await asyncio.sleep(2)
+    
+    if detach:
+        # The import goes on in Legisway without us, the browser can be released once the
+        # import is found in the history, where reattach_import looks for it
+        if await find_import_history_entry(page, import_state['file_name']):
+            return {
+                "success": True,
+                "detached": True,
+                "message": "Import lancé sur Legisway, résultat récupéré en arrière-plan",
+                "import_state": import_state
+            }
+        logger.warning(f"Import {import_state['file_name']} absent de l'historique de la page, suivi dans le navigateur")
+    
+    # Wait for progress to reach 100% or import to finish
+    # Progress and completion (success or failure) are pushed by the page
+    async def report_progress_text(progress_text: Optional[str]):
+        logger.info(f"Progression: {progress_text}")
+        percent_match = PROGRESS_PERCENT_PATTERN.search(progress_text or "")
+        await report_progress(
+            "importing",
+            float(percent_match.group(1).replace(",", ".")) if percent_match else None,
+            progress_text
+        )
+    
+    if await wait_for_import_completion(page, report_progress_text, watch=watch):
+        logger.info("Import terminé!")
+        await report_checkpoint("completed")
+    else:
+        return {
+            "success": False,
+            "message": "Timeout: l'import a pris plus d'1 heure"
+        }
+    
+    await asyncio.sleep(2)
+    
+    # Step 8: Get result file
+    logger.info("Récupération du fichier de résultat...")
+    await report_progress("downloading_result")
+    result_file_link = await page.query_selector('a[href*="result_file"]')
+    
+    if result_file_link:
+        return {"result_link": await read_result_link(page, result_file_link)}
+    else:
+        # No result file found - check for error message
+        error_message = await page.query_selector('div:has-text("Échec")')
+        if error_message:
+            error_text = await error_message.text_content()
+            return {
+                "success": False,
+                "message": f"Import échoué: {error_text}"
+            }
+        else:
+            return {
+                "success": True,
+                "message": f"Import terminé (pas de fichier de résultat disponible)"
+            }
+
+async def collect_import_result(
+    outcome: Dict,
+    total_rows: int,
+    on_checkpoint: Optional[Callable] = None,
+    result_file_prefix: Optional[str] = None
+) -> Dict:
+    """
+    Download the result file of a finished import (outcome of run_import_on_page) over HTTP
+    A failed download keeps the import successful, without result file
+    """
+    if 'result_link' not in outcome:
+        return outcome
+    
+    try:
+        downloaded = await download_result_over_http(outcome['result_link'], result_file_prefix)
+    except Exception as e:
+        logger.error(f"Téléchargement du fichier de résultat échoué: {str(e)}")
+        return {
+            "success": True,
+            "message": f"Import terminé avec rollback: {total_rows} lignes traitées "
+                       f"(fichier de résultat non récupéré: {str(e)})",
+            "rows_imported": total_rows
+        }
+    if on_checkpoint:
+        await on_checkpoint("result_downloaded", {**downloaded, "rows_imported": total_rows})
+    
+    return {
+        "success": True,
+        "message": f"Import terminé avec rollback: {total_rows} lignes traitées",
+        "rows_imported": total_rows,
+        **downloaded
+    }
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -2010,6 +6103,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    await db.validation_reports.create_index("token", unique=True)
+    await db.validation_error_groups.create_index("token")
+    await db.validation_runs.create_index("workflow_key", unique=True)
+    await db.validation_run_verdicts.create_index([("run_id", 1), ("chunk", 1)])
+    await db.reference_lists.create_index([("tenant", 1), ("list_type", 1)], unique=True)
+    await db.reference_lists.create_index("fingerprint")
+    await db.reference_list_values.create_index([("fingerprint", 1), ("chunk", 1)])
+    await db.header_mappings.create_index([("workflow_key", 1), ("header_signature", 1), ("mapping_signature", 1)])
+    await db.import_jobs.create_index("job_id", unique=True)
+    await db.import_jobs.create_index([("status", 1), ("created_at", 1)])
+    await db.import_fingerprints.create_index("job_id", unique=True)
+    await db.import_fingerprint_rows.create_index([("job_id", 1), ("chunk", 1)])
+    await db[f"{FILE_STORE_BUCKET}.files"].create_index("metadata.last_used_at")
+    await drop_duplicate_stored_files()
+    await db[f"{FILE_STORE_BUCKET}.files"].create_index("filename", unique=True)
+    await db.result_summaries.create_index("result_file_id", unique=True)
+    await db.import_schedules.create_index("schedule_id", unique=True)
+    await db.import_schedules.create_index([("enabled", 1), ("next_run_at", 1)])
+    await db.import_jobs.create_index([("tenant", 1), ("status", 1)])
+    await db.import_jobs.create_index([("tenant", 1), ("created_at", 1)])
+    await db.import_fingerprints.create_index([("workflow_key", 1), ("status", 1)])
+
+@app.on_event("startup")
+async def start_import_workers():
+    """
+    Start the worker pool, queue again the jobs still waiting and resume the jobs interrupted
+    by the restart (then, periodically, those of any server that stopped renewing its leases)
+    """
+    # Credentials left on jobs finished by earlier versions
+    await db.import_jobs.update_many(
+        {"status": {"$in": ["succeeded", "failed"]}, "params.password": {"$exists": True}},
+        {"$unset": IMPORT_CREDENTIAL_FIELDS}
+    )
+    queued_jobs = await db.import_jobs.find({"status": "queued"}, {"_id": 0, "job_id": 1}).sort("created_at", 1).to_list(None)
+    for job in queued_jobs:
+        await import_queue.put(job['job_id'])
+    # Jobs put back in the queue are queued by resume_interrupted_jobs itself
+    await resume_interrupted_jobs()
+    
+    for worker_id in range(IMPORT_WORKERS):
+        import_workers.append(asyncio.create_task(import_worker(worker_id)))
+    # Detached imports survive restarts: their result is collected by the scheduler
+    import_workers.append(asyncio.create_task(collect_detached_imports()))
+    import_workers.append(asyncio.create_task(run_file_retention()))
+    import_workers.append(asyncio.create_task(run_import_scheduler()))
+    import_workers.append(asyncio.create_task(maintain_job_leases()))
+    logger.info(f"{IMPORT_WORKERS} workers d'import démarrés ({len(queued_jobs)} jobs en attente)")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for worker in import_workers:
+        worker.cancel()
+    if http_client is not None:
+        await http_client.aclose()
     client.close()
\ No newline at end of file
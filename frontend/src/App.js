@@ -5,6 +5,7 @@ import axios from "axios";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Label } from "@/components/ui/label";
+import { Checkbox } from "@/components/ui/checkbox";
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/components/ui/card";
 import { Alert, AlertDescription } from "@/components/ui/alert";
 import { Loader2, CheckCircle2, XCircle, Link2, FileText, Search, Table, Upload, FileSpreadsheet } from "lucide-react";
@@ -28,12 +29,19 @@ const Home = () => {
   const [showFormats, setShowFormats] = useState(false);
   const [tableData, setTableData] = useState(null);
   const [referenceLists, setReferenceLists] = useState(null);
+  const [listSearch, setListSearch] = useState({});
   const [showFormatChoice, setShowFormatChoice] = useState(false);
   const [fileFormat, setFileFormat] = useState(null);
   const [uploadedFile, setUploadedFile] = useState(null);
   const [uploading, setUploading] = useState(false);
   const [validationError, setValidationError] = useState(null);
+  const [validationToken, setValidationToken] = useState(null);
   const [importResult, setImportResult] = useState(null);
+  const [importJob, setImportJob] = useState(null);
+  const [importChunks, setImportChunks] = useState(1);
+  const [deltaImport, setDeltaImport] = useState(false);
+  const [resultSummary, setResultSummary] = useState(null);
+  const [scheduleCron, setScheduleCron] = useState("");
 
   const handleInputChange = (e) => {
     const { name, value} = e.target;
@@ -69,6 +77,23 @@ const Home = () => {
     }
   };
 
+  const searchListValues = async (listType, query) => {
+    setListSearch(prev => ({ ...prev, [listType]: { ...prev[listType], query } }));
+
+    try {
+      const response = await axios.get(`${API}/lists/${encodeURIComponent(listType)}/search`, {
+        params: { site_url: formData.site_url, q: query, limit: 20 }
+      });
+      setListSearch(prev => (
+        prev[listType]?.query === query
+          ? { ...prev, [listType]: { query, values: response.data.values, total: response.data.total } }
+          : prev
+      ));
+    } catch (error) {
+      console.error("Error searching list values:", error);
+    }
+  };
+
   const handleSelectFormat = (format) => {
     setSelectedFormat(format);
     toast.success(`Format sélectionné: ${format.name}`);
@@ -152,17 +177,126 @@ const Home = () => {
     setUploadedFile(null);
     setValidationError(null);
     setImportResult(null);
+    setResultSummary(null);
     toast.info("Prêt pour un nouveau fichier");
   };
 
+  // Stored files are downloaded by their id, older results by their name
+  const getResultFileUrl = (result) => (
+    result.result_file_id
+      ? `${API}/files/${result.result_file_id}?name=${encodeURIComponent(result.result_file_name)}`
+      : `${API}/import/download-result/${encodeURIComponent(result.result_file_name)}`
+  );
+
   const downloadResultFile = () => {
     if (importResult && importResult.result_file_name) {
-      const downloadUrl = `${API}/import/download-result/${encodeURIComponent(importResult.result_file_name)}`;
+      const downloadUrl = getResultFileUrl(importResult);
       window.open(downloadUrl, '_blank');
       toast.success("Téléchargement du fichier de résultat...");
     }
   };
 
+  const downloadAnnotatedFile = async () => {
+    if (!validationToken) {
+      return;
+    }
+
+    try {
+      const response = await axios.post(`${API}/import/validation-report/${validationToken}/annotated`);
+      if (response.data.success) {
+        const downloadUrl = getResultFileUrl(response.data);
+        window.open(downloadUrl, '_blank');
+        toast.success("Téléchargement du fichier annoté...");
+      } else {
+        toast.error(response.data.message);
+      }
+    } catch (error) {
+      console.error("Error downloading annotated file:", error);
+      toast.error("Erreur lors de la génération du fichier annoté");
+    }
+  };
+
+  const pollImportJob = async (jobId) => {
+    while (true) {
+      const jobResponse = await axios.get(`${API}/import/jobs/${jobId}`);
+      const job = jobResponse.data;
+      setImportJob(job);
+      if (job.status === 'succeeded' || job.status === 'failed') {
+        return job;
+      }
+      await new Promise(resolve => setTimeout(resolve, 3000));
+    }
+  };
+
+  const waitForImportJob = (jobId) => new Promise((resolve, reject) => {
+    // Live progress pushed by the server, polling only if the event stream is unavailable
+    const events = new EventSource(`${API}/import/jobs/${jobId}/events`);
+
+    events.addEventListener('snapshot', (e) => setImportJob(JSON.parse(e.data)));
+    events.addEventListener('progress', (e) => {
+      const update = JSON.parse(e.data);
+      setImportJob(prev => ({
+        ...prev,
+        status: update.stage === 'waiting_result' ? 'detached' : 'running',
+        stage: update.stage,
+        progress: update.progress,
+        progress_text: update.detail
+      }));
+    });
+    events.addEventListener('done', (e) => {
+      events.close();
+      resolve(JSON.parse(e.data));
+    });
+    events.onerror = () => {
+      events.close();
+      pollImportJob(jobId).then(resolve, reject);
+    };
+  });
+
+  // Fields shared by /import/execute and /import/schedules
+  const buildImportFormData = () => {
+    const formDataUpload = new FormData();
+    formDataUpload.append('file', uploadedFile);
+    formDataUpload.append('file_format', fileFormat);
+    formDataUpload.append('site_url', formData.site_url);
+    formDataUpload.append('login', formData.login);
+    formDataUpload.append('password', formData.password);
+    formDataUpload.append('system_password', formData.system_password);
+    formDataUpload.append('selected_format', JSON.stringify(selectedFormat));
+    formDataUpload.append('table_config', JSON.stringify(tableData));
+    formDataUpload.append('reference_lists', JSON.stringify(referenceLists));
+    if (importChunks > 1) {
+      formDataUpload.append('import_chunks', importChunks);
+    }
+    formDataUpload.append('import_mode', deltaImport ? 'delta' : 'full');
+    return formDataUpload;
+  };
+
+  const scheduleImport = async () => {
+    if (!uploadedFile || !scheduleCron.trim()) {
+      toast.error("Veuillez sélectionner un fichier et indiquer l'horaire (cron)");
+      return;
+    }
+
+    try {
+      const formDataUpload = buildImportFormData();
+      formDataUpload.append('cron', scheduleCron.trim());
+      const response = await axios.post(`${API}/import/schedules`, formDataUpload, {
+        headers: {
+          'Content-Type': 'multipart/form-data'
+        }
+      });
+      if (response.data.success) {
+        toast.success(response.data.message);
+      } else {
+        toast.error(response.data.message);
+      }
+    } catch (error) {
+      console.error("Error scheduling import:", error);
+      toast.error("Erreur lors de la programmation de l'import");
+    }
+  };
+
   const submitImport = async () => {
     if (!uploadedFile) {
       toast.error("Veuillez sélectionner un fichier");
@@ -178,27 +312,37 @@ const Home = () => {
     setValidationError(null);
 
     try {
-      const formDataUpload = new FormData();
-      formDataUpload.append('file', uploadedFile);
-      formDataUpload.append('file_format', fileFormat);
-      formDataUpload.append('site_url', formData.site_url);
-      formDataUpload.append('login', formData.login);
-      formDataUpload.append('password', formData.password);
-      formDataUpload.append('system_password', formData.system_password);
-      formDataUpload.append('selected_format', JSON.stringify(selectedFormat));
-      formDataUpload.append('table_config', JSON.stringify(tableData));
-      formDataUpload.append('reference_lists', JSON.stringify(referenceLists));
-
-      const response = await axios.post(`${API}/import/execute`, formDataUpload, {
+      const formDataUpload = buildImportFormData();
+
+      const queued = await axios.post(`${API}/import/execute`, formDataUpload, {
         headers: {
           'Content-Type': 'multipart/form-data'
         }
       });
 
+      if (!queued.data.success) {
+        toast.error(queued.data.message);
+        return;
+      }
+
+      // The import runs in the background: follow the job until it is finished
+      toast.info("Import en file d'attente...");
+      const job = await waitForImportJob(queued.data.job_id);
+      const response = { data: job.result };
+
       if (response.data.success) {
         toast.success(response.data.message);
         setValidationError(null);
         setImportResult(response.data);
+        setResultSummary(null);
+        if (response.data.result_file_id) {
+          try {
+            const summaryResponse = await axios.get(`${API}/import/jobs/${queued.data.job_id}/result-summary`);
+            setResultSummary(summaryResponse.data);
+          } catch (summaryError) {
+            console.error("Error loading result summary:", summaryError);
+          }
+        }
         
         // If there's a result file, show download option
         if (response.data.result_file_name) {
@@ -210,14 +354,15 @@ const Home = () => {
         // Show detailed error message
         const errorMsg = response.data.message;
         setValidationError(errorMsg);
+        setValidationToken(response.data.validation_token || null);
         setImportResult(null);
         toast.error("Validation échouée - Voir les détails ci-dessous", {
           duration: 5000,
         });
         
-        // If there are missing keys, log them
-        if (response.data.missing_keys) {
-          console.error("Missing keys:", response.data.missing_keys);
+        // If there are validation errors, log them (grouped by column, rule and value)
+        if (response.data.errors && response.data.errors.length > 0) {
+          console.error("Validation errors:", response.data.errors);
         }
       }
     } catch (error) {
@@ -225,6 +370,7 @@ const Home = () => {
       toast.error("Erreur lors de l'import");
     } finally {
       setUploading(false);
+      setImportJob(null);
     }
   };
 
@@ -469,28 +615,40 @@ const Home = () => {
                               <div className="flex items-start gap-2 mb-2">
                                 <span className="font-semibold text-gray-900">{listField.field_path}</span>
                                 <span className="text-xs bg-blue-100 text-blue-700 px-2 py-1 rounded-full">
-                                  {listField.values.length} valeurs
+                                  {listField.total_count ?? listField.values.length} valeurs
                                 </span>
                               </div>
                               <details className="text-sm text-gray-600">
                                 <summary className="cursor-pointer hover:text-blue-600">
                                   Voir les valeurs autorisées
                                 </summary>
+                                <Input
+                                  type="text"
+                                  placeholder="Rechercher une valeur..."
+                                  value={listSearch[listField.list_type]?.query || ""}
+                                  onChange={(e) => searchListValues(listField.list_type, e.target.value)}
+                                  className="mt-2 h-8 text-xs"
+                                />
                                 <div className="mt-2 max-h-40 overflow-y-auto bg-gray-50 p-2 rounded">
-                                  {listField.values.length > 0 ? (
-                                    <ul className="list-disc list-inside space-y-1">
-                                      {listField.values.slice(0, 20).map((value, vIdx) => (
-                                        <li key={vIdx} className="text-xs">{value}</li>
-                                      ))}
-                                      {listField.values.length > 20 && (
-                                        <li className="text-xs text-gray-500 italic">
-                                          ... et {listField.values.length - 20} autres
-                                        </li>
-                                      )}
-                                    </ul>
-                                  ) : (
-                                    <p className="text-xs text-gray-500 italic">Aucune valeur disponible</p>
-                                  )}
+                                  {(() => {
+                                    const search = listSearch[listField.list_type];
+                                    const shownValues = search?.values && search.query ? search.values : listField.values;
+                                    const totalValues = search?.values && search.query ? search.total : (listField.total_count ?? listField.values.length);
+                                    return shownValues.length > 0 ? (
+                                      <ul className="list-disc list-inside space-y-1">
+                                        {shownValues.map((value, vIdx) => (
+                                          <li key={vIdx} className="text-xs">{value}</li>
+                                        ))}
+                                        {totalValues > shownValues.length && (
+                                          <li className="text-xs text-gray-500 italic">
+                                            ... et {totalValues - shownValues.length} autres
+                                          </li>
+                                        )}
+                                      </ul>
+                                    ) : (
+                                      <p className="text-xs text-gray-500 italic">Aucune valeur disponible</p>
+                                    );
+                                  })()}
                                 </div>
                               </details>
                             </div>
@@ -560,6 +718,56 @@ const Home = () => {
                   </div>
                 )}
 
+                {/* Number of parts imported in parallel */}
+                {uploadedFile && fileFormat && (
+                  <div className="space-y-2">
+                    <Label htmlFor="import_chunks" className="text-gray-700 font-medium">Nombre de parties importées en parallèle</Label>
+                    <Input
+                      id="import_chunks"
+                      type="number"
+                      min={1}
+                      max={10}
+                      value={importChunks}
+                      onChange={(e) => setImportChunks(Math.max(1, parseInt(e.target.value, 10) || 1))}
+                      className="h-11 max-w-xs"
+                      data-testid="import-chunks-input"
+                    />
+                    <div className="flex items-center gap-2 pt-2">
+                      <Checkbox
+                        id="delta_import"
+                        checked={deltaImport}
+                        onCheckedChange={(checked) => setDeltaImport(checked === true)}
+                        data-testid="delta-import-checkbox"
+                      />
+                      <Label htmlFor="delta_import" className="text-gray-700">
+                        Importer uniquement les lignes nouvelles ou modifiées depuis le dernier import
+                      </Label>
+                    </div>
+                    <Label htmlFor="schedule_cron" className="text-gray-700 font-medium block pt-2">
+                      Programmer l'import en heures creuses (cron : minute heure jour mois jour_semaine)
+                    </Label>
+                    <div className="flex gap-2">
+                      <Input
+                        id="schedule_cron"
+                        placeholder="0 22 * * 1-5"
+                        value={scheduleCron}
+                        onChange={(e) => setScheduleCron(e.target.value)}
+                        className="h-11 max-w-xs"
+                        data-testid="schedule-cron-input"
+                      />
+                      <Button
+                        onClick={scheduleImport}
+                        disabled={uploading || !scheduleCron.trim()}
+                        variant="outline"
+                        className="h-11"
+                        data-testid="schedule-import-button"
+                      >
+                        Programmer l'import
+                      </Button>
+                    </div>
+                  </div>
+                )}
+
                 {/* Submit Button */}
                 {uploadedFile && fileFormat && (
                   <Button
@@ -571,7 +779,11 @@ const Home = () => {
                     {uploading ? (
                       <>
                         <Loader2 className="w-5 h-5 mr-2 animate-spin" />
-                        Vérification en cours...
+                        {importJob && importJob.status === 'detached'
+                          ? "Import lancé sur Legisway, en attente du résultat..."
+                          : importJob && importJob.status === 'running'
+                          ? `Import en cours (${importJob.stage}${importJob.progress != null ? ` ${importJob.progress}%` : importJob.progress_text ? ` - ${importJob.progress_text}` : ''})...`
+                          : "Vérification en cours..."}
                       </>
                     ) : (
                       "Vérifier fichier client"
@@ -589,7 +801,7 @@ const Home = () => {
                         <pre className="text-xs whitespace-pre-wrap font-mono bg-red-100 p-3 rounded mb-3">
                           {validationError}
                         </pre>
-                        <div className="mt-3">
+                        <div className="mt-3 flex flex-wrap gap-2">
                           <Button
                             onClick={() => {
                               setValidationError(null);
@@ -599,6 +811,15 @@ const Home = () => {
                           >
                             📄 Uploader un fichier corrigé
                           </Button>
+                          {validationToken && (
+                            <Button
+                              onClick={downloadAnnotatedFile}
+                              variant="outline"
+                              className="border-red-300 text-red-700 hover:bg-red-100"
+                            >
+                              📥 Télécharger le fichier annoté
+                            </Button>
+                          )}
                         </div>
                       </AlertDescription>
                     </Alert>
@@ -630,6 +851,29 @@ const Home = () => {
                           </p>
                         </div>
                       )}
+
+                      {resultSummary && (
+                        <div className="space-y-2 mt-3" data-testid="result-summary">
+                          <p className="text-sm font-semibold">
+                            Résultat par ligne : {resultSummary.outcomes.success} réussies, {resultSummary.outcomes.warning} avec avertissement, {resultSummary.outcomes.error} en erreur
+                          </p>
+                          {resultSummary.error_groups.length > 0 && (
+                            <ul className="text-xs bg-white border border-green-200 rounded p-3 space-y-1">
+                              {resultSummary.error_groups.slice(0, 10).map((group, index) => (
+                                <li key={index}>
+                                  <span className={group.outcome === 'error' ? 'text-red-700' : 'text-amber-700'}>
+                                    {group.message || '(sans message)'}
+                                  </span>
+                                  {` : ${group.count} ligne${group.count > 1 ? 's' : ''} (${group.rows.slice(0, 10).join(', ')}${group.count > 10 ? ', ...' : ''})`}
+                                </li>
+                              ))}
+                              {resultSummary.error_groups_total > 10 && (
+                                <li className="text-gray-500">... (+{resultSummary.error_groups_total - 10} autres messages)</li>
+                              )}
+                            </ul>
+                          )}
+                        </div>
+                      )}
                     </AlertDescription>
                   </Alert>
                 )}
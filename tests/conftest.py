@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+# server.py reads its MongoDB settings at import; the client only connects on first use
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'legisway_import_tests')
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
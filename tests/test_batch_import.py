@@ -0,0 +1,147 @@
+import asyncio
+
+import server
+
+
+class FakeElement:
+    def __init__(self, text: str = "", href: str = ""):
+        self.text = text
+        self.href = href
+
+    async def text_content(self):
+        return self.text
+
+    async def get_attribute(self, name):
+        return self.href
+
+    async def set_input_files(self, path):
+        pass
+
+
+class FakeKeyboard:
+    async def press(self, key):
+        pass
+
+
+class FakeContext:
+    async def cookies(self, urls):
+        return [{"name": "JSESSIONID", "value": "s1"}]
+
+
+class FakePage:
+    """Import page finishing each import as soon as the watcher is injected"""
+
+    def __init__(self):
+        self.url = "https://client.legisway.com/admin/import"
+        self.context = FakeContext()
+        self.keyboard = FakeKeyboard()
+        self.bindings = {}
+        self.imported_files = []
+
+    async def expose_binding(self, name, callback):
+        # Same error as Playwright on a second registration
+        if name in self.bindings:
+            raise RuntimeError(f'Function "{name}" has been already registered')
+        self.bindings[name] = callback
+
+    async def evaluate(self, script):
+        if script == server.IMPORT_WATCHER_SCRIPT:
+            self.bindings["autoImportNotify"](None, "progress", "100 %")
+            self.bindings["autoImportNotify"](None, "done", "result_file")
+        return "Mozilla/5.0"
+
+    async def query_selector(self, selector):
+        if selector == 'input[type="file"]':
+            return FakeElement()
+        if selector == 'a[href*="result_file"]':
+            name = f"result_{len(self.imported_files)}.xlsx"
+            return FakeElement(name, f"/result_file/{name}")
+        return None
+
+    async def set_input_files(self, selector, path):
+        pass
+
+    async def wait_for_selector(self, selector, timeout=None):
+        return FakeElement()
+
+    async def click(self, selector, **kwargs):
+        if selector == 'button:has-text("Importer")':
+            self.imported_files.append(selector)
+
+    async def fill(self, selector, value, **kwargs):
+        pass
+
+
+class FakeBrowserContext:
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def new_page(self):
+        page = FakePage()
+        self.pages.append(page)
+        return page
+
+
+class FakeBrowser:
+    def __init__(self, pages):
+        self.pages = pages
+
+    async def new_context(self, **kwargs):
+        return FakeBrowserContext(self.pages)
+
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    def __init__(self, pages):
+        self.chromium = self
+        self.pages = pages
+
+    async def launch(self, **kwargs):
+        return FakeBrowser(self.pages)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+def test_files_imported_on_the_same_lane_all_succeed(monkeypatch, tmp_path):
+    pages = []
+    real_sleep = asyncio.sleep
+
+    async def no_wait(delay, *args):
+        await real_sleep(0)
+
+    async def open_import_page(page, site_url, login, password, report_progress=None):
+        return None
+
+    async def reopen_import_page(page, report_progress=None):
+        return None
+
+    async def download_result_over_http(result_link, file_prefix=None):
+        file_name = f"{file_prefix}_{result_link['file_name']}"
+        return {"result_file_path": str(tmp_path / file_name), "result_file_name": file_name}
+
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    monkeypatch.setattr(server, "async_playwright", lambda: FakePlaywright(pages))
+    monkeypatch.setattr(server, "open_import_page", open_import_page)
+    monkeypatch.setattr(server, "reopen_import_page", reopen_import_page)
+    monkeypatch.setattr(server, "download_result_over_http", download_result_over_http)
+
+    items = [
+        {"selected_format": {"name": "Personnes"}, "file_path": str(tmp_path / f"file_{index}.xlsx"), "total_rows": 3}
+        for index in range(3)
+    ]
+    results = asyncio.run(server.import_batch_in_session(
+        "https://client.legisway.com", "user", "secret", items, lanes=1, result_file_prefix="job1"
+    ))
+
+    assert len(pages) == 1
+    assert len(pages[0].imported_files) == 3
+    assert [result['success'] for result in results] == [True, True, True]
+    assert [result['result_file_name'] for result in results] == [
+        "job1_fichier1_result_1.xlsx", "job1_fichier2_result_2.xlsx", "job1_fichier3_result_3.xlsx"
+    ]
@@ -0,0 +1,82 @@
+from openpyxl import Workbook, load_workbook
+
+import server
+
+
+def write_workbook(path, rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def read_rows(path):
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = [list(row) for row in workbook.active.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+    # Rows are read padded to the widest row
+    for row in rows:
+        while row and row[-1] is None:
+            row.pop()
+    return rows
+
+
+def test_rows_are_split_evenly_with_the_header(tmp_path):
+    source = write_workbook(tmp_path / "contacts.xlsx", [["externalRef", "name"]] + [[f"C{n}", f"Nom {n}"] for n in range(1, 8)])
+
+    chunks = server.split_workbook_in_chunks(source, [0], 3, tmp_path / "chunks")
+
+    assert [chunk['row_numbers'] for chunk in chunks] == [[2, 3, 4], [5, 6, 7], [8]]
+    assert [chunk['file_path'].rsplit("/", 1)[1] for chunk in chunks] == [
+        "contacts_partie1.xlsx", "contacts_partie2.xlsx", "contacts_partie3.xlsx"
+    ]
+    assert read_rows(chunks[1]['file_path']) == [["externalRef", "name"], ["C4", "Nom 4"], ["C5", "Nom 5"], ["C6", "Nom 6"]]
+
+
+def test_rows_sharing_a_key_stay_in_one_chunk(tmp_path):
+    rows = [["C1", 1], ["C2", 2], ["C1", 3], ["C3", 4], [" C1 ", 5], ["C4", 6], ["C2", 7], [None, 8], [None, 9]]
+    source = write_workbook(tmp_path / "contacts.xlsx", [["externalRef", "order"]] + rows)
+
+    chunks = server.split_workbook_in_chunks(source, [0], 3, tmp_path / "chunks")
+
+    assert [chunk['row_numbers'] for chunk in chunks] == [[2, 3, 4, 6, 8], [5, 7, 9], [10]]
+
+
+def test_blank_rows_are_dropped_and_chunks_never_empty(tmp_path):
+    source = write_workbook(tmp_path / "contacts.xlsx", [["externalRef"], ["C1"], [None], [""], ["C2"]])
+
+    chunks = server.split_workbook_in_chunks(source, [0], 5, tmp_path / "chunks")
+
+    assert [chunk['row_numbers'] for chunk in chunks] == [[2], [5]]
+
+
+def test_chunk_results_are_merged_in_the_original_order(tmp_path):
+    header = ["externalRef", "Statut", "Message"]
+    chunks = [
+        {
+            "row_numbers": [2, 4, 5],
+            "result_file_path": write_workbook(tmp_path / "result1.xlsx", [
+                header, ["C1", "OK"], ["C3", "Erreur", "Société inconnue"], ["C1", "OK"], ["Total: 3"]
+            ])
+        },
+        {
+            "row_numbers": [3, 6],
+            "result_file_path": write_workbook(tmp_path / "result2.xlsx", [header, ["C2", "OK"], ["C4", "OK"]])
+        },
+    ]
+    target = str(tmp_path / "merged.xlsx")
+
+    server.merge_chunk_results(chunks, target)
+
+    assert read_rows(target) == [
+        [server.RESULT_ORIGIN_HEADER] + header,
+        [2, "C1", "OK"],
+        [3, "C2", "OK"],
+        [4, "C3", "Erreur", "Société inconnue"],
+        [5, "C1", "OK"],
+        [5, "Total: 3"],
+        [6, "C4", "OK"],
+    ]
@@ -0,0 +1,72 @@
+import asyncio
+
+import mongomock_motor
+import pytest
+
+import server
+
+SYNONYMS = {"civility": ["civilite"], "department": ["departement", "direction"]}
+
+
+@pytest.mark.parametrize("header, field, expected", [
+    ("Civility.title.fr", "civility.title.fr", 100),
+    ("  CIVILITY.TITLE.FR ", "civility.title.fr", 100),
+    ("Civilité (civility.title.fr)", "civility.title.fr", 80),
+    ("Civilité (title.fr)", "civility.title.fr", 70),
+    ("Civilité", "civility.title.fr", 60),
+    ("Direction", "department.name", 60),
+    ("Département", "department.name", 60),
+    ("Civility", "civility.title.fr", 50),
+    ("Titre", "civility.title.fr", 0),
+    ("Nom", "name", 0),
+])
+def test_header_scores(header, field, expected):
+    assert server.score_header(server.normalize_text(header), server.normalize_text(field), SYNONYMS) == expected
+
+
+def test_each_column_goes_to_its_best_field():
+    mapping = server.compute_column_mapping(
+        ["Référence", "Civilité", "externalRef", "Direction"],
+        ["externalRef", "civility.title.fr", "department.name", "company.name"],
+        SYNONYMS
+    )
+
+    assert mapping['columns'] == {"externalRef": 2, "civility.title.fr": 1, "department.name": 3}
+    assert mapping['scores'] == {"externalRef": 100, "civility.title.fr": 60, "department.name": 60}
+    assert mapping['unmapped'] == ["company.name"]
+    assert mapping['ambiguous'] == []
+
+
+def test_a_column_is_used_once_and_ties_are_reported():
+    mapping = server.compute_column_mapping(
+        ["Civilité", "Civilité"],
+        ["civility.title.fr", "civility.title.en"],
+        SYNONYMS
+    )
+
+    # Same score: fields in configuration order, columns in header order
+    assert mapping['columns'] == {"civility.title.fr": 0, "civility.title.en": 1}
+    assert [item['headers'] for item in mapping['ambiguous']] == [["Civilité", "Civilité"]] * 2
+
+
+def test_an_exact_match_wins_over_an_earlier_field():
+    mapping = server.compute_column_mapping(["civility.title.en"], ["civility.title.fr", "civility.title.en"], SYNONYMS)
+
+    assert mapping['columns'] == {"civility.title.en": 0}
+    assert mapping['unmapped'] == ["civility.title.fr"]
+
+
+def test_mapping_is_cached_per_header_layout(monkeypatch):
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["column_mapping"])
+    headers = ["Civilité", "Référence"]
+
+    async def scenario():
+        first = await server.resolve_column_mapping(headers, ["civility.title.fr"], "client|contacts", "Contacts")
+        second = await server.resolve_column_mapping(headers, ["civility.title.fr"], "client|contacts", "Contacts")
+        other_fields = await server.resolve_column_mapping(headers, ["civility.title.fr", "externalRef"], "client|contacts", "Contacts")
+        return first, second, other_fields
+
+    first, second, other_fields = asyncio.run(scenario())
+
+    assert (first['cached'], second['cached'], other_fields['cached']) == (False, True, False)
+    assert second['columns'] == first['columns'] == {"civility.title.fr": 0}
@@ -0,0 +1,196 @@
+import asyncio
+
+import mongomock_motor
+import pytest
+from openpyxl import Workbook
+
+import server
+
+
+def write_workbook(path, rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def test_fingerprints_mark_the_rows_unchanged_since_the_previous_import(tmp_path):
+    source = write_workbook(tmp_path / "people.xlsx", [["externalRef", "Nom"], ["A1", "Martin"], ["A2", "Durand"], [None, "Sans clé"]])
+    first = server.resolve_import_fingerprints(source, [0], None, str(tmp_path / "first.xlsx"))
+    previous_rows = {key_digest: row_hash for key_digest, row_hash, _, _ in first['fingerprints']}
+
+    source = write_workbook(tmp_path / "people.xlsx", [["externalRef", "Nom"], ["A1", "Martin"], ["A2", "Dupont"], [None, "Sans clé"]])
+    second = server.resolve_import_fingerprints(source, [0], previous_rows, str(tmp_path / "delta.xlsx"))
+
+    assert first['row_numbers'] is None
+    assert [(row_number, unchanged) for _, _, row_number, unchanged in second['fingerprints']] == [(2, True), (3, False)]
+    assert second['row_numbers'] == [3, 4]
+    assert second['total_rows'] == 3
+
+
+def test_accepted_rows_come_from_the_origin_column(tmp_path):
+    result = write_workbook(tmp_path / "result.xlsx", [
+        [server.RESULT_ORIGIN_HEADER, "Référence", "Statut", "Message"],
+        [12, "A10", "Créé", ""],
+        [32, "A30", "Avertissement", "Fonction ignorée"],
+    ])
+
+    assert server.read_accepted_source_rows(result) == {12, 32}
+
+
+def test_no_row_is_accepted_when_the_import_was_rolled_back(tmp_path):
+    result = write_workbook(tmp_path / "result.xlsx", [
+        ["Référence", "Statut", "Message"],
+        ["A1", "Créé", ""],
+        ["A2", "Erreur", "Civilité inconnue"],
+    ])
+
+    assert server.read_accepted_source_rows(result) is None
+
+
+def settle(db, tmp_path, result_rows, succeeded=True):
+    """Import two rows in full mode, then settle the job with a result workbook"""
+    source = write_workbook(tmp_path / "people.xlsx", [["externalRef", "Nom"], ["A1", "Martin"], ["A2", "Durand"]])
+    fingerprints = server.resolve_import_fingerprints(source, [0], None, str(tmp_path / "unused.xlsx"))['fingerprints']
+    result = {"result_file_path": write_workbook(tmp_path / "result.xlsx", result_rows)} if result_rows else {}
+
+    async def scenario():
+        await server.save_import_fingerprints("job-1", "workflow", {"key_fields": ["externalRef"]}, fingerprints)
+        await server.settle_import_fingerprints("job-1", succeeded, result)
+        reference = await db.import_fingerprints.find_one({"workflow_key": "workflow", "status": "committed"})
+        return reference and await server.load_import_fingerprints(reference)
+
+    return asyncio.run(scenario()), fingerprints
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["delta_import"]
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def test_only_accepted_rows_become_the_reference(db, tmp_path):
+    committed, fingerprints = settle(db, tmp_path, [["Référence", "Statut"], ["A1", "Créé"]])
+
+    assert committed == {fingerprints[0][0]: fingerprints[0][1]}
+
+
+def test_nothing_is_committed_when_the_import_was_rolled_back(db, tmp_path):
+    committed, _ = settle(db, tmp_path, [["Référence", "Statut"], ["A1", "Créé"], ["A2", "Erreur"]])
+
+    assert committed is None
+    assert asyncio.run(db.import_fingerprint_rows.count_documents({})) == 0
+
+
+def test_nothing_is_committed_without_result_file(db, tmp_path):
+    committed, _ = settle(db, tmp_path, None)
+
+    assert committed is None
+
+
+class ServerStopped(BaseException):
+    """Server stopped in the middle of a job"""
+
+
+def interrupted_delta_job(db, tmp_path, monkeypatch, stop_at):
+    """
+    Delta import of a file where A2 changed and A4 is new since the last import,
+    stopped by a server restart at stop_at ("import" or "finish")
+    """
+    header = ["externalRef", "Nom"]
+    previous = write_workbook(tmp_path / "previous.xlsx", [header, ["A1", "Martin"], ["A2", "Durand"], ["A3", "Petit"]])
+    previous_rows = {
+        key_digest: row_hash
+        for key_digest, row_hash, _, _ in server.resolve_import_fingerprints(previous, [0], None, str(tmp_path / "unused.xlsx"))['fingerprints']
+    }
+    source = write_workbook(tmp_path / "people.xlsx", [header, ["A1", "Martin"], ["A2", "Dupont"], ["A3", "Petit"], ["A4", "Neuf"]])
+    delta = server.resolve_import_fingerprints(source, [0], previous_rows, str(tmp_path / "people_delta.xlsx"))
+    assert delta['row_numbers'] == [3, 5]
+
+    async def validate_before_import(file_path, params, on_rows=None):
+        return {"success": True, "total_rows": 4}, "token"
+
+    async def prepare_differential_import(job, params):
+        await server.save_import_fingerprints(job['job_id'], "workflow", {}, delta['fingerprints'])
+        return {"file_path": str(tmp_path / "people_delta.xlsx"), "row_numbers": delta['row_numbers'], "total_rows": 4}
+
+    async def import_to_legisway(on_checkpoint=None, result_file_prefix=None, **kwargs):
+        await on_checkpoint("started", {"import_state": {"file_name": "people_delta.xlsx", "total_rows": 2, "launched_at": "2026-01-01T00:00:00+00:00"}})
+        # Raw result of the reduced workbook: its rows 2 and 3 are rows 3 and 5 of the original file
+        raw_result = write_workbook(tmp_path / "raw_result.xlsx", [header + ["Statut"], ["A2", "Dupont", "Modifié"], ["A4", "Neuf", "Créé"]])
+        await on_checkpoint("result_downloaded", {"result_file_path": raw_result, "result_file_name": "raw_result.xlsx"})
+        if stop_at == "import":
+            raise ServerStopped()
+        return {"success": True, "message": "Import terminé", "rows_imported": 2, "result_file_path": raw_result, "result_file_name": "raw_result.xlsx"}
+
+    real_finish = server.ImportJobProgress.finish
+
+    async def finish(self, status, result):
+        if stop_at == "finish":
+            raise ServerStopped()
+        await real_finish(self, status, result)
+
+    async def store_result_file(result):
+        return result
+
+    monkeypatch.setattr(server, "validate_before_import", validate_before_import)
+    monkeypatch.setattr(server, "prepare_differential_import", prepare_differential_import)
+    monkeypatch.setattr(server, "import_to_legisway", import_to_legisway)
+    monkeypatch.setattr(server, "store_result_file", store_result_file)
+    monkeypatch.setattr(server.ImportJobProgress, "finish", finish)
+    monkeypatch.setattr(server, "import_queue", asyncio.Queue())
+    job = {
+        "job_id": "job-delta",
+        "kind": "single",
+        "status": "running",
+        "file_path": source,
+        "params": {"site_url": "https://client.legisway.com", "login": "user", "password": "secret", "selected_format": {"name": "Personnes"}, "table_config": {}, "import_mode": "delta"},
+        "lease_expires_at": 0
+    }
+
+    async def scenario():
+        await db.import_jobs.insert_one(dict(job))
+        with pytest.raises(ServerStopped):
+            await server.run_import_job(job)
+        monkeypatch.setattr(server.ImportJobProgress, "finish", real_finish)
+        return await db.import_jobs.find_one({"job_id": "job-delta"})
+
+    return asyncio.run(scenario()), delta['fingerprints']
+
+
+async def committed_fingerprints(db):
+    reference = await db.import_fingerprints.find_one({"workflow_key": "workflow", "status": "committed"})
+    return reference and await server.load_import_fingerprints(reference)
+
+
+def test_a_delta_job_resumed_after_its_result_keeps_the_original_rows(db, tmp_path, monkeypatch):
+    job, fingerprints = interrupted_delta_job(db, tmp_path, monkeypatch, stop_at="finish")
+    assert job['checkpoints']['result_downloaded']['result_file_name'] == "people_resultat.xlsx"
+
+    async def scenario():
+        await server.resume_interrupted_jobs()
+        return await committed_fingerprints(db)
+
+    # Rows 3 and 5 accepted, rows 2 and 4 unchanged
+    assert asyncio.run(scenario()) == {key_digest: row_hash for key_digest, row_hash, _, _ in fingerprints}
+
+
+def test_a_delta_job_resumed_from_the_history_keeps_no_fingerprints(db, tmp_path, monkeypatch):
+    job, _ = interrupted_delta_job(db, tmp_path, monkeypatch, stop_at="import")
+    assert 'result_downloaded' not in job['checkpoints']
+    assert job['checkpoints']['started']['import_state']['delta']
+
+    async def reattach_import(site_url, login, password, import_state, result_file_prefix=None):
+        raw_result = write_workbook(tmp_path / "raw_result.xlsx", [["externalRef", "Statut"], ["A2", "Modifié"], ["A4", "Créé"]])
+        return {"success": True, "message": "Import terminé", "result_file_path": raw_result}
+
+    monkeypatch.setattr(server, "reattach_import", reattach_import)
+
+    async def scenario():
+        await server.resume_interrupted_jobs()
+        await server.check_detached_import(await db.import_jobs.find_one({"job_id": "job-delta"}, {"_id": 0}))
+        return await committed_fingerprints(db), await db.import_fingerprint_rows.count_documents({})
+
+    assert asyncio.run(scenario()) == (None, 0)
@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+
+from .test_batch_import import FakeElement, FakePage, FakePlaywright
+
+
+class FakeHistory:
+    """Locator of the import history rows, holding the rows showing a file name"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, has_text):
+        return FakeHistory([row for row in self.rows if has_text in row.text])
+
+    @property
+    def first(self):
+        return self
+
+    @property
+    def last(self):
+        return self.rows[-1]
+
+    async def wait_for(self, state=None, timeout=None):
+        if not self.rows:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+
+
+class HistoryPage(FakePage):
+    def __init__(self, history_rows=()):
+        super().__init__()
+        self.history_rows = list(history_rows)
+
+    def locator(self, selector):
+        assert selector == server.IMPORT_HISTORY_ROW_SELECTOR
+        return FakeHistory(self.history_rows)
+
+
+@pytest.fixture(autouse=True)
+def no_wait(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_wait(delay, *args):
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+
+
+def run_detached(page):
+    return asyncio.run(server.run_import_on_page(page, {"name": "Personnes"}, "/tmp/uploads/abc_contacts.xlsx", 3, detach=True))
+
+
+def test_an_import_found_in_the_history_is_detached():
+    outcome = run_detached(HistoryPage([FakeElement("abc_contacts.xlsx En cours")]))
+
+    assert outcome['detached']
+    assert outcome['import_state']['file_name'] == "abc_contacts.xlsx"
+
+
+def test_an_import_missing_from_the_history_is_followed_in_the_browser():
+    outcome = run_detached(HistoryPage([FakeElement("other.xlsx Terminé")]))
+
+    assert 'detached' not in outcome
+    assert outcome['result_link']['file_name'] == "result_1.xlsx"
+
+
+class ReattachPlaywright(FakePlaywright):
+    """Browser whose new context opens the given page"""
+
+    def __init__(self, page):
+        super().__init__([])
+        self.page = page
+
+    async def launch(self, **kwargs):
+        return self
+
+    async def new_context(self, **kwargs):
+        return self
+
+    async def new_page(self):
+        return self.page
+
+    async def close(self):
+        pass
+
+
+def reattach(monkeypatch, page, launched_minutes_ago):
+    async def open_import_page(page, site_url, login, password, report_progress=None):
+        return None
+
+    monkeypatch.setattr(server, "async_playwright", lambda: ReattachPlaywright(page))
+    monkeypatch.setattr(server, "open_import_page", open_import_page)
+    import_state = {
+        "file_name": "abc_contacts.xlsx",
+        "total_rows": 3,
+        "launched_at": (datetime.now(timezone.utc) - timedelta(minutes=launched_minutes_ago)).isoformat()
+    }
+    return asyncio.run(server.reattach_import("https://client.legisway.com", "user", "secret", import_state))
+
+
+def test_a_missing_history_entry_is_waited_for_then_failed(monkeypatch):
+    assert reattach(monkeypatch, HistoryPage(), launched_minutes_ago=2) is None
+
+    result = reattach(monkeypatch, HistoryPage(), launched_minutes_ago=server.IMPORT_HISTORY_MISSING_SECONDS / 60 + 1)
+
+    assert not result['success']
+    assert "introuvable dans l'historique" in result['message']
@@ -0,0 +1,55 @@
+import server
+
+KEY_COLUMNS = [(0, "externalRef"), (1, "company.name")]
+
+
+def numbered(rows):
+    return list(enumerate(rows, start=2))
+
+
+def duplicates(rows, key_columns=KEY_COLUMNS, **options):
+    return [
+        (row_number, error['value'], error['first_row'])
+        for row_number, error in server.iter_validation_errors(
+            numbered(rows), key_columns, [], options=server.ValidationOptions(**options)
+        )
+        if error['rule'] == "duplicate_key"
+    ]
+
+
+def test_both_rows_of_a_duplicate_key_are_reported():
+    rows = [["C1", "Acme"], ["C2", "Acme"], ["C1", "Acme"], ["C3", "Acme"], [" C1 ", "Acme"]]
+
+    assert duplicates(rows) == [(2, "C1 | Acme", 2), (4, "C1 | Acme", 2), (6, "C1 | Acme", 2)]
+
+
+def test_keys_are_composite():
+    rows = [["C1", "Acme"], ["C1", "Globex"], ["Acme", "C1"]]
+
+    assert duplicates(rows) == []
+    assert duplicates(rows, key_columns=KEY_COLUMNS[:1]) == [(2, "C1", 2), (3, "C1", 2)]
+
+
+def test_incomplete_keys_are_missing_not_duplicate():
+    rows = [["C1", ""], ["C1", ""], ["C1"]]
+    errors = list(server.iter_validation_errors(numbered(rows), KEY_COLUMNS, []))
+
+    assert [(row_number, error['rule']) for row_number, error in errors] == [(2, "missing_key"), (3, "missing_key")]
+
+
+def test_duplicates_are_aggregated_in_one_group():
+    rows = [["C1", "Acme"]] * 3 + [["C2", "Acme"]] * 2
+
+    groups = server.validate_excel_rows(numbered(rows), KEY_COLUMNS, [])['errors'].to_list()
+
+    assert [(group['value'], group['count'], group['rows'], group['first_row']) for group in groups] == [
+        ("C1 | Acme", 3, "2-4", 2),
+        ("C2 | Acme", 2, "5-6", 5),
+    ]
+
+
+def test_duplicates_follow_the_error_budget():
+    rows = [["C1", "Acme"]] * 10
+
+    assert len(duplicates(rows, max_errors_per_column=4)) == 4
+    assert len(duplicates(rows, max_errors=3)) == 3
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock_motor
+import pytest
+from gridfs.errors import FileExists
+from pymongo.errors import DuplicateKeyError
+
+import server
+
+
+class FakeFileStore:
+    """GridFS bucket over the mocked database: chunks first, then the file document"""
+
+    def __init__(self, db):
+        self.files = db[f"{server.FILE_STORE_BUCKET}.files"]
+        self.chunks = db[f"{server.FILE_STORE_BUCKET}.chunks"]
+
+    async def upload_from_stream_with_id(self, file_id, filename, source, chunk_size_bytes=None, metadata=None):
+        for n, data in enumerate(iter(lambda: source.read(4), b"")):
+            await self.chunks.insert_one({"files_id": file_id, "n": n, "data": data})
+            await asyncio.sleep(0)
+        try:
+            await self.files.insert_one({"_id": file_id, "filename": filename, "uploadDate": datetime.now(timezone.utc), "metadata": metadata})
+        except DuplicateKeyError:
+            raise FileExists(f"file with _id {file_id!r} already exists")
+
+    async def delete(self, file_id):
+        await self.files.delete_one({"_id": file_id})
+        await self.chunks.delete_many({"files_id": file_id})
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["file_store"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "get_file_store", lambda: FakeFileStore(db))
+    return db
+
+
+def test_the_same_content_uploaded_at_the_same_time_is_stored_once(db, tmp_path):
+    paths = []
+    for name in ("a.xlsx", "b.xlsx"):
+        (tmp_path / name).write_bytes(b"same content, two uploads")
+        paths.append(str(tmp_path / name))
+
+    async def scenario():
+        await db[f"{server.FILE_STORE_BUCKET}.files"].create_index("filename", unique=True)
+        file_ids = await asyncio.gather(*(server.store_file(path, "upload") for path in paths))
+        files = await db[f"{server.FILE_STORE_BUCKET}.files"].find().to_list(None)
+        chunk_owners = await db[f"{server.FILE_STORE_BUCKET}.chunks"].distinct("files_id")
+        return file_ids, files, chunk_owners
+
+    file_ids, files, chunk_owners = asyncio.run(scenario())
+
+    assert file_ids[0] == file_ids[1]
+    assert [stored['filename'] for stored in files] == [file_ids[0]]
+    assert chunk_owners == [files[0]['_id']]
+
+
+def test_duplicates_stored_before_the_unique_index_are_dropped(db):
+    files = db[f"{server.FILE_STORE_BUCKET}.files"]
+    chunks = db[f"{server.FILE_STORE_BUCKET}.chunks"]
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        for file_id, filename, uploaded_days_ago, used_days_ago in [(1, "d1", 3, 0), (2, "d1", 1, 2), (3, "d2", 5, 5)]:
+            await files.insert_one({
+                "_id": file_id, "filename": filename, "uploadDate": now - timedelta(days=uploaded_days_ago),
+                "metadata": {"last_used_at": now - timedelta(days=used_days_ago)}
+            })
+            await chunks.insert_one({"files_id": file_id, "n": 0, "data": b"x"})
+        await server.drop_duplicate_stored_files()
+        await files.create_index("filename", unique=True)
+        return await files.find().sort("_id").to_list(None), await chunks.distinct("files_id")
+
+    kept_files, chunk_owners = asyncio.run(scenario())
+
+    # The latest upload of d1 is kept, with the latest use of its copies
+    assert [(stored['_id'], stored['filename']) for stored in kept_files] == [(2, "d1"), (3, "d2")]
+    assert kept_files[0]['metadata']['last_used_at'].replace(tzinfo=timezone.utc) >= now - timedelta(seconds=1)
+    assert sorted(chunk_owners) == [2, 3]
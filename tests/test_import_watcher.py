@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+class FakeLabel:
+    def __init__(self, text):
+        self.text = text
+
+    async def text_content(self):
+        return self.text
+
+
+class PolledPage:
+    """Import page finishing after three checks, whose watcher never reports anything"""
+
+    def __init__(self, evaluate_error=None):
+        self.evaluate_error = evaluate_error
+        self.bindings = {}
+        self.checks = 0
+
+    async def expose_binding(self, name, callback):
+        self.bindings[name] = callback
+
+    async def evaluate(self, script):
+        if self.evaluate_error:
+            raise self.evaluate_error
+
+    async def query_selector(self, selector):
+        if selector == 'a[href*="result_file"]':
+            self.checks += 1
+            return FakeLabel("result.xlsx") if self.checks > 3 else None
+        if selector == 'mat-progress-bar + label':
+            return FakeLabel(f"{self.checks * 25} %")
+        return None
+
+
+@pytest.fixture
+def no_wait(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def no_wait(delay, *args):
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    monkeypatch.setattr(server, "IMPORT_WATCHER_START_SECONDS", 0.01)
+
+
+def wait(page, **kwargs):
+    progress = []
+
+    async def on_progress_text(text):
+        progress.append(text)
+
+    finished = asyncio.run(server.wait_for_import_completion(page, on_progress_text, **kwargs))
+    return finished, progress
+
+
+@pytest.mark.parametrize("evaluate_error", [None, RuntimeError("Refused to evaluate a string as JavaScript")])
+def test_the_page_is_polled_when_the_watcher_does_not_start(no_wait, evaluate_error):
+    finished, progress = wait(PolledPage(evaluate_error))
+
+    assert finished
+    assert progress == ["25 %", "50 %", "75 %"]
+
+
+def test_the_watcher_can_be_disabled(no_wait, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_WATCHER", False)
+    page = PolledPage()
+
+    assert wait(page)[0]
+    assert page.bindings == {}
+
+
+def test_polling_stops_at_the_time_limit(no_wait):
+    class NeverFinishingPage(PolledPage):
+        async def query_selector(self, selector):
+            return None
+
+    assert wait(NeverFinishingPage(), max_wait_time=0.05) == (False, [])
+
+
+def test_pushed_events_are_followed_once_the_watcher_is_ready(no_wait):
+    class WatchedPage(PolledPage):
+        async def evaluate(self, script):
+            notify = self.bindings["autoImportNotify"]
+            notify(None, "ready", None)
+            notify(None, "progress", "40 %")
+            notify(None, "done", "Import terminé")
+
+    page = WatchedPage()
+
+    assert wait(page) == (True, ["40 %"])
+    assert page.checks == 0
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import mongomock_motor
+import pytest
+
+import server
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["job_credentials"]
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+PARAMS = {"site_url": "https://client.legisway.com", "login": "user", "password": "secret", "system_password": "system"}
+
+
+def test_a_finished_job_keeps_no_credentials(db):
+    async def scenario():
+        await db.import_jobs.insert_one({"job_id": "job-1", "status": "running", "params": dict(PARAMS), "timings": {}})
+        await server.ImportJobProgress("job-1").finish("failed", {"success": False, "message": "Erreur"})
+        return await db.import_jobs.find_one({"job_id": "job-1"})
+
+    job = asyncio.run(scenario())
+
+    assert job['status'] == "failed"
+    assert job['params'] == {"site_url": "https://client.legisway.com", "login": "user"}
+
+
+def test_a_schedule_run_once_hands_its_credentials_to_the_job(db, monkeypatch):
+    created_jobs = []
+
+    async def create_import_job(**kwargs):
+        created_jobs.append(kwargs)
+        return {"job_id": "job-1"}
+
+    async def check_schedule_limits(tenant):
+        return None
+
+    monkeypatch.setattr(server, "create_import_job", create_import_job)
+    monkeypatch.setattr(server, "check_schedule_limits", check_schedule_limits)
+    now = time.time()
+    schedule = {
+        "schedule_id": "schedule-1", "cron": "0 2 * * *", "window_minutes": 60, "run_once": True, "enabled": True,
+        "tenant": "client.legisway.com", "file_name": "people.xlsx", "file_path": "/tmp/people.xlsx", "file_id": "f1",
+        "params": dict(PARAMS), "next_run_at": now - 10
+    }
+
+    async def scenario():
+        await db.import_schedules.insert_one(dict(schedule))
+        await server.trigger_schedule(schedule, now)
+        return await db.import_schedules.find_one({"schedule_id": "schedule-1"})
+
+    stored = asyncio.run(scenario())
+
+    assert created_jobs[0]['params']['password'] == "secret"
+    assert "password" not in stored['params']
+    assert "system_password" not in stored['params']
+    assert stored['enabled'] is False
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import mongomock_motor
+import pytest
+
+import server
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["job_leases"]
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def running_job(job_id, lease_expires_at, checkpoints=None):
+    return {
+        "job_id": job_id,
+        "kind": "single",
+        "status": "running",
+        "stage": "upload",
+        "worker_id": "other-server",
+        "lease_expires_at": lease_expires_at,
+        "checkpoints": checkpoints or {},
+        "params": {},
+        "timings": {}
+    }
+
+
+def test_only_jobs_with_an_expired_lease_are_resumed(db, monkeypatch):
+    monkeypatch.setattr(server, "import_queue", asyncio.Queue())
+    launched = {"started": {"import_state": {"file_name": "people.xlsx", "launched_at": "2024-01-01T00:00:00+00:00"}}}
+
+    async def scenario():
+        await db.import_jobs.insert_many([
+            running_job("alive", time.time() + 60),
+            running_job("expired", time.time() - 1),
+            running_job("expired-launched", time.time() - 1, launched),
+            {**running_job("before-leases", None), "lease_expires_at": None},
+        ])
+        await server.resume_interrupted_jobs()
+        jobs = {job['job_id']: job async for job in db.import_jobs.find({}, {"_id": 0})}
+        queued = [server.import_queue.get_nowait() for _ in range(server.import_queue.qsize())]
+        return jobs, queued
+
+    jobs, queued = asyncio.run(scenario())
+
+    assert jobs['alive']['status'] == "running"
+    assert jobs['alive']['worker_id'] == "other-server"
+    assert jobs['expired']['status'] == "queued"
+    assert "worker_id" not in jobs['expired']
+    assert jobs['expired-launched']['status'] == "detached"
+    assert jobs['before-leases']['status'] == "queued"
+    assert sorted(queued) == ["before-leases", "expired"]
+
+
+def test_a_resumed_job_is_claimed_by_a_single_server(db, monkeypatch):
+    monkeypatch.setattr(server, "import_queue", asyncio.Queue())
+
+    async def scenario():
+        await db.import_jobs.insert_one(running_job("expired", time.time() - 1))
+        await asyncio.gather(server.resume_interrupted_jobs(), server.resume_interrupted_jobs())
+        return server.import_queue.qsize()
+
+    assert asyncio.run(scenario()) == 1
+
+
+@pytest.mark.parametrize("downloaded, message, rows_imported", [
+    ({"rows_imported": 40}, "Import terminé avec rollback: 40 lignes traitées", 40),
+    ({}, "Import terminé avec rollback (nombre de lignes traitées inconnu après le redémarrage)", None),
+])
+def test_a_job_resumed_after_its_result_keeps_its_row_count(db, monkeypatch, downloaded, message, rows_imported):
+    async def store_result_file(result):
+        return result
+
+    monkeypatch.setattr(server, "store_result_file", store_result_file)
+    checkpoints = {
+        "started": {"chunked": True},
+        "result_downloaded": {"result_file_path": "/tmp/downloads/people_resultat.xlsx", "result_file_name": "people_resultat.xlsx", **downloaded}
+    }
+
+    async def scenario():
+        await db.import_jobs.insert_one(running_job("chunked", time.time() - 1, checkpoints))
+        await server.resume_interrupted_jobs()
+        return await db.import_jobs.find_one({"job_id": "chunked"})
+
+    job = asyncio.run(scenario())
+
+    assert job['status'] == "succeeded"
+    assert job['result']['message'] == message
+    assert job['result'].get('rows_imported') == rows_imported
+    assert job['result']['result_file_name'] == "people_resultat.xlsx"
@@ -0,0 +1,61 @@
+import asyncio
+
+import mongomock_motor
+import pytest
+
+import server
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["reference_lists"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "REFERENCE_LISTS", {})
+    return db
+
+
+def fetch_on_another_server(tenant_key, values):
+    """Fetch a list on one server, then forget it as a server that never fetched it"""
+    async def scenario():
+        await server.persist_reference_list(tenant_key, server.store_reference_list(tenant_key, "civilityList", values))
+        server.REFERENCE_LISTS.clear()
+    asyncio.run(scenario())
+
+
+def test_a_list_fetched_by_another_server_can_be_searched(db, monkeypatch):
+    monkeypatch.setattr(server, "ROW_CACHE_CHUNK_BYTES", 64)
+    values = [f"Civilité {index:03d}" for index in range(100)]
+    fetch_on_another_server("client.legisway.com", values)
+
+    reference_list = asyncio.run(server.get_reference_list("client.legisway.com", "civilityList"))
+
+    assert asyncio.run(db.reference_list_values.count_documents({})) > 1
+    assert list(reference_list) == sorted(values)
+    assert reference_list.search("civilite 042") == ["Civilité 042"]
+
+
+def test_a_list_is_found_by_the_fingerprint_sent_to_the_frontend(db):
+    fingerprint = server.ReferenceList("civilityList", ["M.", "Mme"]).fingerprint
+    fetch_on_another_server("client.legisway.com", ["M.", "Mme"])
+
+    assert asyncio.run(server.get_reference_list("client.legisway.com", "civilityList", fingerprint)).fingerprint == fingerprint
+    assert asyncio.run(server.get_reference_list("client.legisway.com", "civilityList", "stale")) is None
+    assert asyncio.run(server.get_reference_list("other.legisway.com", "civilityList")) is None
+
+
+def test_replacing_a_list_drops_the_values_no_tenant_uses(db):
+    fetch_on_another_server("client.legisway.com", ["M.", "Mme"])
+    fetch_on_another_server("other.legisway.com", ["M.", "Mme"])
+    fetch_on_another_server("client.legisway.com", ["M.", "Mme", "Dr"])
+    fetch_on_another_server("other.legisway.com", ["M."])
+
+    stored_values = asyncio.run(db.reference_list_values.distinct("values"))
+
+    assert sorted(stored_values) == ["Dr", "M.", "Mme"]
+    assert list(asyncio.run(server.get_reference_list("other.legisway.com", "civilityList"))) == ["M."]
+
+
+def test_an_empty_list_is_kept(db):
+    fetch_on_another_server("client.legisway.com", [])
+
+    assert len(asyncio.run(server.get_reference_list("client.legisway.com", "civilityList"))) == 0
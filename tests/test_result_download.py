@@ -0,0 +1,67 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+import pytest
+
+import server
+
+
+def test_concurrent_chunks_with_the_same_result_name_keep_their_own_file(monkeypatch):
+    async def handler(request):
+        await asyncio.sleep(0)
+        return httpx.Response(200, content=request.url.path.encode("utf-8"), headers={"content-type": "application/octet-stream"})
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(server, "get_http_client", lambda: http_client)
+    links = [
+        {"file_name": "resultat.xlsx", "url": f"https://client.legisway.com/result_file/{part}", "cookie_header": "", "user_agent": ""}
+        for part in (1, 2)
+    ]
+
+    async def scenario():
+        try:
+            return await asyncio.gather(
+                server.download_result_over_http(links[0], "job1_partie1"),
+                server.download_result_over_http(links[1], "job1_partie2")
+            )
+        finally:
+            await http_client.aclose()
+
+    downloads = asyncio.run(scenario())
+    try:
+        assert [download['result_file_name'] for download in downloads] == ["job1_partie1_resultat.xlsx", "job1_partie2_resultat.xlsx"]
+        assert [Path(download['result_file_path']).read_bytes() for download in downloads] == [b"/result_file/1", b"/result_file/2"]
+    finally:
+        for download in downloads:
+            Path(download['result_file_path']).unlink(missing_ok=True)
+
+
+@pytest.mark.parametrize("range_header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=-", None),
+    ("items=0-10", None),
+    ("bytes=0-1,5-6", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=10-", (10, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=999-999", (999, 999)),
+])
+def test_range_headers(range_header, expected):
+    assert server.parse_range_header(range_header, 1000) == expected
+
+
+@pytest.mark.parametrize("range_header", ["bytes=1000-", "bytes=1000-2000", "bytes=50-10", "bytes=-0"])
+def test_unsatisfiable_ranges(range_header):
+    with pytest.raises(ValueError):
+        server.parse_range_header(range_header, 1000)
+
+
+def test_no_range_of_an_empty_file():
+    with pytest.raises(ValueError):
+        server.parse_range_header("bytes=-100", 0)
+    with pytest.raises(ValueError):
+        server.parse_range_header("bytes=0-", 0)
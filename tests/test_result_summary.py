@@ -0,0 +1,78 @@
+import pytest
+from openpyxl import Workbook
+
+import server
+
+
+def write_workbook(path, rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize("status, message, expected", [
+    ("OK", "", "success"),
+    ("Succès", "Créé", "success"),
+    ("Validé", "", "success"),
+    ("Créé", "", "success"),
+    ("Erreur", "", "error"),
+    ("ERREUR : ligne rejetée", "", "error"),
+    ("Échec", "", "error"),
+    ("Échoué", "", "error"),
+    ("KO", "", "error"),
+    ("Rejeté", "", "error"),
+    ("Invalide", "", "error"),
+    ("failed", "", "error"),
+    ("Avertissement", "Valeur tronquée", "warning"),
+    ("Warning", "", "warning"),
+    ("", "Société inconnue", "error"),
+    ("", "", "success"),
+    ("  ", "", "success"),
+])
+def test_result_statuses(status, message, expected):
+    assert server.classify_result_status(status, message) == expected
+
+
+def test_result_workbook_summary(tmp_path):
+    result = write_workbook(tmp_path / "result.xlsx", [
+        ["Référence", "Statut de l'import", "Message d'erreur"],
+        ["C1", "OK", None],
+        ["C2", "Erreur", "Société inconnue"],
+        [None, None, None],
+        ["C3", "Erreur", "Société inconnue"],
+        ["C4", "Avertissement", "Valeur tronquée"],
+        ["C5", None, "Civilité invalide"],
+        ["C6", "OK", None],
+    ])
+
+    summary = server.summarize_result_workbook(result)
+
+    assert summary['total_rows'] == 6
+    assert summary['outcomes'] == {"success": 2, "warning": 1, "error": 3}
+    assert summary['status_counts'] == [
+        {"status": "OK", "count": 2}, {"status": "Erreur", "count": 2},
+        {"status": "Avertissement", "count": 1}, {"status": "(vide)", "count": 1}
+    ]
+    assert [(group['outcome'], group['message'], group['count'], group['rows']) for group in summary['error_groups']] == [
+        ("error", "Société inconnue", 2, [3, 5]),
+        ("error", "Civilité invalide", 1, [7]),
+        ("warning", "Valeur tronquée", 1, [6]),
+    ]
+    assert summary['columns'] == {"status": "Statut de l'import", "message": "Message d'erreur", "source_row": None}
+
+
+def test_merged_results_report_the_original_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "RESULT_SUMMARY_MAX_ROWS", 2)
+    result = write_workbook(tmp_path / "result.xlsx", [
+        [server.RESULT_ORIGIN_HEADER, "Status", "Message"],
+        [12, "Error", "Unknown company"],
+        [40, "Error", "Unknown company"],
+        [41, "Error", "Unknown company"],
+    ])
+
+    summary = server.summarize_result_workbook(result)
+
+    assert summary['error_groups'] == [{"outcome": "error", "message": "Unknown company", "count": 3, "rows": [12, 40]}]
+    assert summary['columns']['source_row'] == server.RESULT_ORIGIN_HEADER
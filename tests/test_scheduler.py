@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def next_runs(cron_expression, after, count):
+    runs = []
+    for _ in range(count):
+        after = server.compute_next_run(cron_expression, after)
+        runs.append(datetime.fromtimestamp(after, timezone.utc).strftime("%Y-%m-%d %H:%M"))
+    return runs
+
+
+@pytest.mark.parametrize("field, minimum, maximum, expected", [
+    ("*", 0, 6, set(range(7))),
+    ("5", 0, 59, {5}),
+    ("1-5", 0, 59, {1, 2, 3, 4, 5}),
+    ("*/15", 0, 59, {0, 15, 30, 45}),
+    ("0-30/10", 0, 59, {0, 10, 20, 30}),
+    ("50/5", 0, 59, {50, 55}),
+    ("1,15,30", 1, 31, {1, 15, 30}),
+])
+def test_cron_fields_are_parsed(field, minimum, maximum, expected):
+    assert server.parse_cron_field(field, minimum, maximum) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *",
+    "60 * * * *",
+    "0 24 * * *",
+    "0 0 0 * *",
+    "0 0 * 13 *",
+    "*/0 * * * *",
+    "5-1 * * * *",
+    "a * * * *",
+    "@yearly",
+])
+def test_invalid_cron_expressions_are_rejected(expression):
+    with pytest.raises(ValueError, match="Expression cron invalide"):
+        server.parse_cron_expression(expression)
+
+
+def test_aliases_and_sunday_as_seven():
+    assert server.parse_cron_expression("@daily") == server.parse_cron_expression("0 0 * * *")
+    assert server.parse_cron_expression("0 0 * * 7")['weekday'] == {0}
+
+
+def test_next_run_is_in_the_scheduler_time_zone():
+    # 22:00 in Paris is 20:00 UTC in summer and 21:00 UTC in winter
+    assert next_runs("0 22 * * *", utc(2026, 6, 1, 12, 0), 1) == ["2026-06-01 20:00"]
+    assert next_runs("0 22 * * *", utc(2026, 12, 1, 12, 0), 1) == ["2026-12-01 21:00"]
+
+
+def test_next_run_is_strictly_after():
+    assert next_runs("*/15 * * * *", utc(2026, 6, 1, 12, 15), 2) == ["2026-06-01 12:30", "2026-06-01 12:45"]
+
+
+def test_day_or_weekday_as_in_cron():
+    # The 13th of the month or a Friday; 2026-11-06 is a Friday
+    assert next_runs("0 12 13 * 5", utc(2026, 11, 1, 0, 0), 3) == [
+        "2026-11-06 11:00", "2026-11-13 11:00", "2026-11-20 11:00"
+    ]
+
+
+def test_months_without_the_day_are_skipped():
+    assert next_runs("0 0 29 2 *", utc(2026, 3, 1, 0, 0), 1) == ["2028-02-28 23:00"]
+
+
+def test_impossible_expression():
+    with pytest.raises(ValueError):
+        server.compute_next_run("0 0 31 2 *", utc(2026, 1, 1, 0, 0))
+
+
+def test_time_skipped_by_dst_runs_right_after_the_change():
+    # 2026-03-29: in Paris 02:00 becomes 03:00 (01:00 UTC)
+    assert next_runs("30 2 * * *", utc(2026, 3, 28, 23, 50), 3) == [
+        "2026-03-29 01:00", "2026-03-30 00:30", "2026-03-31 00:30"
+    ]
+    assert next_runs("0 * * * *", utc(2026, 3, 28, 23, 30), 3) == [
+        "2026-03-29 00:00", "2026-03-29 01:00", "2026-03-29 02:00"
+    ]
+
+
+def test_time_repeated_by_dst_runs_once():
+    # 2026-10-25: in Paris 03:00 becomes 02:00 again (01:00 UTC)
+    assert next_runs("30 2 * * *", utc(2026, 10, 24, 12, 0), 3) == [
+        "2026-10-25 00:30", "2026-10-26 01:30", "2026-10-27 01:30"
+    ]
+    # From the repeated hour, the run of the first 02:30 is not returned again
+    assert next_runs("30 2 * * *", utc(2026, 10, 25, 1, 10), 1) == ["2026-10-26 01:30"]
+
+
+def test_hourly_cron_runs_in_both_repeated_hours():
+    assert next_runs("10 * * * *", utc(2026, 10, 24, 23, 50), 4) == [
+        "2026-10-25 00:10", "2026-10-25 01:10", "2026-10-25 02:10", "2026-10-25 03:10"
+    ]
@@ -0,0 +1,117 @@
+import asyncio
+
+import mongomock_motor
+import pytest
+from openpyxl import Workbook
+
+import server
+
+
+@pytest.mark.parametrize("type_value, expected", [
+    ("Date", "date"),
+    ("Date et heure", "date"),
+    ("Entier", "integer"),
+    ("Entier long", "integer"),
+    ("Long", "integer"),
+    ("Int64", "integer"),
+    ("Décimal", "number"),
+    ("Decimal(10,2)", "number"),
+    ("Montant", "number"),
+    ("Booléen", "boolean"),
+    ("Texte", None),
+    ("Texte long", None),
+    ("Chaîne longue", None),
+    ("String(255)", None),
+    ("Liste", None),
+])
+def test_config_types_are_matched_on_whole_words(type_value, expected):
+    assert server.parse_config_type(type_value) == expected
+
+
+def test_lengths_are_only_read_from_text_types():
+    table_config = {
+        "headers": ["Chemin", "Clé", "Type", "Longueur"],
+        "rows": [
+            {"cells": ["externalRef", "Oui", "String(20)", ""]},
+            {"cells": ["comment", "Non", "Texte long", "500"]},
+            {"cells": ["count", "Non", "Int64", ""]},
+            {"cells": ["amount", "Non", "Decimal(10,2)", ""]},
+            {"cells": ["civility.title.fr", "Non", "Liste", ""]},
+        ]
+    }
+
+    assert server.extract_type_rules(table_config) == [
+        {"field_path": "externalRef", "type": None, "max_length": 20},
+        {"field_path": "comment", "type": None, "max_length": 500},
+        {"field_path": "count", "type": "integer", "max_length": None},
+        {"field_path": "amount", "type": "number", "max_length": None},
+    ]
+
+
+def test_no_type_rules_without_type_or_length_column():
+    assert server.extract_type_rules({"headers": ["Chemin", "Clé"], "rows": [{"cells": ["externalRef", "Oui"]}]}) == []
+
+
+@pytest.mark.parametrize("value, valid", [
+    ("2024-01-31", True),
+    ("2024-01-31 00:00:00", True),
+    ("31/01/2024", True),
+    ("1/2/2024", True),
+    ("31/02/2024", False),
+    ("2024-13-01", False),
+    ("demain", False),
+])
+def test_date_validator(value, valid):
+    assert server.is_valid_date(value) is valid
+
+
+@pytest.mark.parametrize("value, valid", [("12", True), ("-3", True), ("12.0", True), ("12.5", False), ("abc", False)])
+def test_integer_validator(value, valid):
+    assert server.is_valid_integer(value) is valid
+
+
+@pytest.mark.parametrize("value, valid", [("12", True), ("12,5", True), ("-0.5", True), (".5", True), ("1e3", True), ("1,2,3", False), ("abc", False)])
+def test_number_validator(value, valid):
+    assert server.is_valid_number(value) is valid
+
+
+@pytest.mark.parametrize("value, valid", [("Oui", True), ("non", True), ("VRAI", True), ("0", True), ("peut-être", False)])
+def test_boolean_validator(value, valid):
+    assert server.is_valid_boolean(value) is valid
+
+
+def test_type_errors_are_reported_per_cell():
+    type_columns = [
+        {"col_idx": 1, "field_path": "count", "type": "integer", "check": server.is_valid_integer, "max_length": None},
+        {"col_idx": 2, "field_path": "label", "type": None, "check": None, "max_length": 5},
+    ]
+
+    errors = server.check_row(["A1", "douze", "trop long"], [], [], type_columns)
+
+    assert [(error['rule'], error['column']) for error in errors] == [("invalid_type", "count"), ("too_long", "label")]
+    assert server.check_row(["A1", "12", ""], [], [], type_columns) == []
+
+
+def test_fail_fast_ignores_a_missing_optional_typed_column(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["type_validation"])
+    workbook = Workbook()
+    workbook.active.append(["externalRef"])
+    workbook.active.append(["A1"])
+    file_path = tmp_path / "people.xlsx"
+    workbook.save(file_path)
+    table_config = {
+        "headers": ["Chemin", "Clé", "Filtre", "Type"],
+        "rows": [
+            {"cells": ["externalRef", "Oui", "", "String(20)"]},
+            {"cells": ["birthDate", "Non", "", "Date"]},
+        ]
+    }
+    options = server.ValidationOptions(fail_fast_on_missing_columns=True)
+
+    report = asyncio.run(server.run_import_validation(
+        str(file_path), "excel", {"name": "Personnes"}, table_config,
+        "https://client.legisway.com", "user", "secret", incremental=False, options=options
+    ))
+
+    assert report['success'] is True
+    assert report['column_mapping']['unmapped'] == ["birthDate"]
@@ -0,0 +1,110 @@
+import asyncio
+
+import mongomock_motor
+from openpyxl import Workbook
+
+import server
+
+
+def missing_key(column="externalRef"):
+    return {"rule": "missing_key", "column": column, "column_index": 1}
+
+
+def invalid_value(value, column="civility.title.fr"):
+    return {"rule": "invalid_list_value", "column": column, "column_index": 2, "value": value, "list_type": "civilityList"}
+
+
+def test_row_ranges_are_formatted():
+    assert server.format_row_ranges([]) == ""
+    assert server.format_row_ranges([[2, 2]]) == "2"
+    assert server.format_row_ranges([[2, 1500], [1502, 1502], [1504, 1505]]) == "2-1500, 1502, 1504-1505"
+
+
+def test_errors_are_grouped_by_column_rule_and_value():
+    aggregator = server.ValidationErrorAggregator()
+    for row_number in [2, 3, 4, 7]:
+        aggregator.add(row_number, missing_key())
+    aggregator.add(3, invalid_value("Mr"))
+    aggregator.add(5, invalid_value("Mr"))
+    aggregator.add(6, invalid_value("Madame"))
+
+    groups = aggregator.to_list()
+
+    assert aggregator.error_count == 7
+    assert [(group['column'], group['rule'], group['value'], group['count'], group['rows']) for group in groups] == [
+        ("externalRef", "missing_key", "", 4, "2-4, 7"),
+        ("civility.title.fr", "invalid_list_value", "Mr", 2, "3, 5"),
+        ("civility.title.fr", "invalid_list_value", "Madame", 1, "6"),
+    ]
+    assert groups[1]['list_type'] == "civilityList"
+
+
+def test_a_row_added_twice_is_counted_but_kept_in_its_range():
+    aggregator = server.ValidationErrorAggregator()
+    for row_number in [2, 2, 3]:
+        aggregator.add(row_number, missing_key())
+
+    group = aggregator.to_list()[0]
+
+    assert group['count'] == 3
+    assert group['ranges'] == [[2, 3]]
+
+
+def test_group_rows_are_expanded_back():
+    aggregator = server.ValidationErrorAggregator()
+    for row_number in [2, 3, 5]:
+        aggregator.add(row_number, invalid_value("Mr"))
+
+    rows = list(server.iter_group_rows(aggregator.to_list()[0]))
+
+    assert [row_number for row_number, _ in rows] == [2, 3, 5]
+    assert rows[0][1] == {
+        "row": 2, "column": "civility.title.fr", "rule": "invalid_list_value", "value": "Mr",
+        "list_type": "civilityList", "column_index": 2
+    }
+
+
+def test_allowed_values_are_sent_once_per_list(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "db", mongomock_motor.AsyncMongoMockClient()["validation_errors"])
+    monkeypatch.setattr(server, "REFERENCE_LISTS", {})
+    workbook = Workbook()
+    for row in [
+        ["externalRef", "civility.title.fr", "spouseCivility.title.fr", "country.name"],
+        ["A1", "Mr", "Madame", "France"],
+        ["A2", "M.", "Mr", "Frances"],
+        ["A3", "Mme", "Mme", "Belgique"],
+    ]:
+        workbook.active.append(row)
+    file_path = tmp_path / "people.xlsx"
+    workbook.save(file_path)
+    table_config = {
+        "headers": ["Chemin", "Clé", "Filtre"],
+        "rows": [
+            {"cells": ["externalRef", "Oui", ""]},
+            {"cells": ["civility.title.fr", "Non", "type.name='civilityList'"]},
+            {"cells": ["spouseCivility.title.fr", "Non", "type.name='civilityList'"]},
+            {"cells": ["country.name", "Non", "type.name='countryList'"]},
+        ]
+    }
+    countries = [f"Pays {index:02d}" for index in range(20)] + ["Belgique", "France"]
+    reference_lists = {"success": True, "list_fields": [
+        {"list_type": "civilityList", "values": ["M.", "Mme"], "total_count": 2},
+        {"list_type": "countryList", "values": countries, "total_count": len(countries)},
+    ]}
+
+    report = asyncio.run(server.run_import_validation(
+        str(file_path), "excel", {"name": "Personnes"}, table_config,
+        "https://client.legisway.com", "user", "secret", reference_lists=reference_lists, incremental=False
+    ))
+
+    assert [(group['column'], group['rule'], group['value'], group['rows']) for group in report['errors']] == [
+        ("civility.title.fr", "invalid_list_value", "Mr", "2"),
+        ("country.name", "invalid_list_value", "Frances", "3"),
+        ("spouseCivility.title.fr", "invalid_list_value", "Madame", "2"),
+        ("spouseCivility.title.fr", "invalid_list_value", "Mr", "3"),
+    ]
+    assert report['errors'][1]['suggestions'][0] == "France"
+    assert report['allowed_samples'] == {
+        "civilityList": {"values": ["M.", "Mme"], "total": 2},
+        "countryList": {"values": sorted(countries)[:10], "total": len(countries)},
+    }
@@ -0,0 +1,44 @@
+import asyncio
+
+import mongomock_motor
+
+import server
+
+
+def test_chunks_stay_under_the_byte_budget():
+    entries = [("h" * 64, [{"rule": "missing_key", "column": "externalRef"}] * (index % 3)) for index in range(1000)]
+    size = lambda entry: len(entry[0]) + len(str(entry[1]))
+
+    chunks = list(server.split_in_size_bounded_chunks(entries, size, max_bytes=5000))
+
+    assert [entry for chunk in chunks for entry in chunk] == entries
+    assert len(chunks) > 1
+    assert all(sum(size(entry) for entry in chunk) <= 5000 for chunk in chunks)
+
+
+def test_an_entry_larger_than_the_budget_gets_its_own_chunk():
+    chunks = list(server.split_in_size_bounded_chunks(["a", "b" * 10, "c"], len, max_bytes=5))
+
+    assert chunks == [["a"], ["b" * 10], ["c"]]
+
+
+def test_verdicts_are_stored_in_chunks_and_read_back(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["validation_runs"]
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "ROW_CACHE_CHUNK_BYTES", 2000)
+    signature = {"header_signature": "h", "config_fingerprint": "c", "lists_fingerprint": "l", "mapping_fingerprint": "m"}
+    valid_hashes = [f"{index:064d}" for index in range(100)]
+    row_errors = {f"e{index:063d}": [{"rule": "missing_key", "column": "externalRef", "column_index": 1}] for index in range(50)}
+
+    async def scenario():
+        await server.save_validation_run("workflow", signature, valid_hashes[:10], {})
+        await server.save_validation_run("workflow", signature, valid_hashes, row_errors)
+        run = await db.validation_runs.find_one({"workflow_key": "workflow"}, {"_id": 0})
+        return run, await server.load_validation_run_verdicts(run), await db.validation_run_verdicts.count_documents({})
+
+    run, loaded, stored_chunks = asyncio.run(scenario())
+
+    assert run['verdict_chunks'] > 1
+    assert stored_chunks == run['verdict_chunks']
+    assert loaded['valid_hashes'] == set(valid_hashes)
+    assert loaded['row_errors'] == row_errors
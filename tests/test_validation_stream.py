@@ -0,0 +1,35 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+FORM = {
+    "file_format": "xlsx",
+    "site_url": "https://client.legisway.com",
+    "login": "user",
+    "system_password": "secret",
+    "selected_format": json.dumps({"name": "Personnes"}),
+    "table_config": json.dumps({"headers": [], "rows": []}),
+}
+
+
+@pytest.mark.parametrize("form", [
+    {"selected_format": "{not json"},
+    {"validation_options": json.dumps({"max_errors": "many"})},
+])
+def test_invalid_input_is_reported_in_the_summary_line(form):
+    # Started without the startup events: nothing is written
+    response = TestClient(server.app).post(
+        "/api/import/validate/stream",
+        data={**FORM, **form},
+        files={"file": ("people.xlsx", b"", "application/octet-stream")}
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200
+    assert len(lines) == 1
+    assert lines[0]['type'] == "summary"
+    assert not lines[0]['success']
+    assert lines[0]['message'].startswith("Erreur lors de la validation")
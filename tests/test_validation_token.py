@@ -0,0 +1,25 @@
+import server
+
+
+def token(options=None):
+    return server.compute_validation_token(
+        file_hash="file",
+        config_fingerprint="config",
+        lists_fingerprint="lists",
+        options_fingerprint=server.compute_options_fingerprint(options)
+    )
+
+
+def test_default_options_share_the_token_of_a_run_without_options():
+    assert token(server.ValidationOptions()) == token(None)
+
+
+def test_truncated_and_fail_fast_runs_have_their_own_token():
+    tokens = {
+        token(None),
+        token(server.ValidationOptions(max_errors=100)),
+        token(server.ValidationOptions(max_errors_per_column=10)),
+        token(server.ValidationOptions(fail_fast_on_missing_columns=True)),
+    }
+
+    assert len(tokens) == 4